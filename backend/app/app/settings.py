@@ -11,6 +11,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 import os
+import sys
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -39,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'user',
     'resort',
@@ -48,11 +51,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # After AuthenticationMiddleware, so that staff logged in to the admin
+    # can profile requests as well.
+    'core.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -87,10 +95,54 @@ DATABASES = {
         'NAME': os.getenv('SQL_DATABASE'),
         'USER': os.getenv('SQL_USER'),
         'PASSWORD': os.getenv('SQL_PASSWORD'),
-        'PORT': os.getenv('SQL_PORT')
+        'PORT': os.getenv('SQL_PORT'),
+        # Seconds a connection is kept for the next request of its thread.
+        'CONN_MAX_AGE': int(os.getenv('SQL_CONN_MAX_AGE', 0)),
     }
 }
 
+# Read replicas, as comma separated hosts in SQL_REPLICA_HOSTS. Read-only
+# API actions are served from them by core.routing.ReplicaRouter. In tests
+# every replica mirrors the test database, and without replicas the test
+# runner still gets a "replica_1" alias to the primary, with routing off,
+# so that tests can turn routing on against it.
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.getenv('SQL_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{index}')
+if not DATABASE_REPLICAS and sys.argv[1:2] == ['test']:
+    DATABASES['replica_1'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['core.routing.ReplicaRouter']
+
+# Seconds a user reads from the primary after writing, which must cover
+# the replication lag.
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Use a shared backend (e.g. memcached or redis) when running several
+# workers, so that invalidation reaches every process.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Seconds a cached cottage or amenity response is kept.
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 300))
+
+# Number of token lookups kept by CachedTokenAuthentication, and for how
+# many seconds.
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 60))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -136,6 +188,79 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
 
+# Number of days covered by the per-cottage occupancy bitmaps.
+OCCUPANCY_HORIZON_DAYS = int(os.getenv('OCCUPANCY_HORIZON_DAYS', 730))
+
+# Seconds between runs of the worker job moving the start of the occupancy
+# bitmaps to today.
+OCCUPANCY_ROLL_SECONDS = int(os.getenv('OCCUPANCY_ROLL_SECONDS', 3600))
+
+# Days before and after unavailable dates searched for free stays, and
+# the number of similar cottages suggested instead.
+AVAILABILITY_SUGGESTION_DAYS = int(os.getenv('AVAILABILITY_SUGGESTION_DAYS', 90))
+AVAILABILITY_SIMILAR_LIMIT = int(os.getenv('AVAILABILITY_SIMILAR_LIMIT', 3))
+
+# Largest number of stays priced by one quote request, and the most days
+# between the earliest check-in and the latest check-out among them.
+QUOTE_MAX_STAYS = int(os.getenv('QUOTE_MAX_STAYS', 1000))
+QUOTE_MAX_SPAN_DAYS = int(os.getenv('QUOTE_MAX_SPAN_DAYS', 1096))
+
+# Largest number of bookings accepted by one bulk create request.
+BOOKING_BULK_MAX_SIZE = int(os.getenv('BOOKING_BULK_MAX_SIZE', 500))
+
+# Report query count and SQL, serialization and render time of every
+# request in a Server-Timing header and a log line.
+REQUEST_TIMING = int(os.getenv('REQUEST_TIMING', 0))
+
+# Identical statements per request from which an N+1 pattern is reported.
+REQUEST_TIMING_REPEATED_QUERIES = int(os.getenv('REQUEST_TIMING_REPEATED_QUERIES', 5))
+
+# Keep request, error, latency and database metrics and serve them on
+# /metrics in the Prometheus text format.
+METRICS_ENABLED = int(os.getenv('METRICS_ENABLED', 1))
+
+# Let staff users profile a request with ?profile=1 or an X-Profile: 1
+# header. Profiles are kept in PROFILE_DIR, newest PROFILE_KEEP only.
+REQUEST_PROFILING = int(os.getenv('REQUEST_PROFILING', 1))
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'profiles'))
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', 100))
+PROFILE_TOP_N = int(os.getenv('PROFILE_TOP_N', 30))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core': {
+            'handlers': ['console'],
+            'level': os.getenv('CORE_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
+# Background jobs: worker threads per `manage.py worker`, seconds between
+# polls of an empty queue, attempts before a job is marked failed, the
+# first retry delay (doubled on every attempt up to the maximum), how
+# long finished jobs are kept for `manage.py job_stats` and how often one
+# worker thread deletes older ones.
+JOB_WORKER_CONCURRENCY = int(os.getenv('JOB_WORKER_CONCURRENCY', 4))
+JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', 1))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 5))
+JOB_RETRY_BACKOFF_SECONDS = int(os.getenv('JOB_RETRY_BACKOFF_SECONDS', 10))
+JOB_RETRY_MAX_SECONDS = int(os.getenv('JOB_RETRY_MAX_SECONDS', 3600))
+JOB_KEEP_SECONDS = int(os.getenv('JOB_KEEP_SECONDS', 86400))
+JOB_PRUNE_SECONDS = int(os.getenv('JOB_PRUNE_SECONDS', 300))
+
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'bookings@localhost')
+
+# Rows fetched per server-side cursor round trip by streaming exports.
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema'
 }
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf.urls.static import static
 from django.conf import settings
 from drf_spectacular.views import (
@@ -7,8 +7,22 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
 )
 
+from core import views as core_views
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', core_views.metrics, name='metrics'),
+    path('api/profiles/', core_views.ProfileListView.as_view(), name='profile-list'),
+    re_path(
+        r'^api/profiles/(?P<profile_id>[0-9]{20}-[0-9a-f]{8})/$',
+        core_views.ProfileDetailView.as_view(),
+        name='profile-detail'
+    ),
+    re_path(
+        r'^api/profiles/(?P<profile_id>[0-9]{20}-[0-9a-f]{8})/download/$',
+        core_views.ProfileDownloadView.as_view(),
+        name='profile-download'
+    ),
     path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
     path(
         'api/docs/',
@@ -46,3 +46,6 @@ admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Amenities)
 admin.site.register(models.Cottage)
 admin.site.register(models.Booking)
+admin.site.register(models.SeasonalRate)
+admin.site.register(models.WeekdayRate)
+admin.site.register(models.Job)
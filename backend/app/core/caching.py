@@ -0,0 +1,44 @@
+"""
+Versioning of cached cottage and amenity data.
+
+Cached reads embed the catalogue version in their keys, so bumping the
+version on any Cottage or Amenities write invalidates all of them at once.
+Writers bump it with transaction.on_commit(): a read racing an uncommitted
+write would otherwise cache the old rows under the new version.
+"""
+from django.core.cache import cache
+
+from core import routing
+
+CATALOGUE_VERSION_KEY = 'core:catalogue-version'
+
+
+def catalogue_version():
+    """Return the current catalogue version."""
+    version = cache.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOGUE_VERSION_KEY, 1, timeout=None)
+        version = cache.get(CATALOGUE_VERSION_KEY, 1)
+    return version
+
+
+async def acatalogue_version():
+    """Async catalogue_version() for async views."""
+    version = await cache.aget(CATALOGUE_VERSION_KEY)
+    if version is None:
+        await cache.aadd(CATALOGUE_VERSION_KEY, 1, timeout=None)
+        version = await cache.aget(CATALOGUE_VERSION_KEY, 1)
+    return version
+
+
+def bump_catalogue_version():
+    """Invalidate every cached read of cottages and amenities.
+
+    The catalogue is read from the primary for a while, so that responses
+    cached under the new version are not built from a lagging replica.
+    """
+    routing.pin('catalogue')
+    try:
+        cache.incr(CATALOGUE_VERSION_KEY)
+    except ValueError:
+        cache.add(CATALOGUE_VERSION_KEY, 2, timeout=None)
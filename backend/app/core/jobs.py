@@ -0,0 +1,151 @@
+"""
+Background jobs stored in PostgreSQL.
+
+Jobs are rows of the Job table, queued in the same transaction as the
+write that needs them, so a rolled back request leaves no job behind.
+Workers claim due jobs with SELECT ... FOR UPDATE SKIP LOCKED and run each
+one inside the transaction holding its row lock: a worker that dies mid-job
+rolls back and the job becomes due again. Jobs may therefore run more than
+once and should be safe to repeat.
+
+Recurring jobs are queued when a worker starts, and each run queues the
+next one.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from core.models import Job
+
+logger = logging.getLogger(__name__)
+
+JOBS = {}
+
+# Seconds between runs of the recurring jobs, by name.
+RECURRING = {}
+
+# Longest wait between attempts to reach an unavailable queue.
+ERROR_BACKOFF_MAX_SECONDS = 60
+
+
+def job(name, every=None):
+    """Register a function as the job run for name, every seconds if given."""
+    def decorator(func):
+        JOBS[name] = func
+        if every is not None:
+            RECURRING[name] = every
+        return func
+    return decorator
+
+
+def enqueue(name, **payload):
+    """Queue a job for name with JSON serializable keyword arguments."""
+    if name not in JOBS:
+        raise KeyError(f'Unknown job {name!r}.')
+    return Job.objects.create(name=name, payload=payload)
+
+
+def enqueue_many(name, payloads):
+    """Queue one job for name per payload in a single insert."""
+    if name not in JOBS:
+        raise KeyError(f'Unknown job {name!r}.')
+    return Job.objects.bulk_create(Job(name=name, payload=payload) for payload in payloads)
+
+
+def queue_recurring():
+    """Queue a run, due now, of every recurring job without a queued one."""
+    queued = set(Job.objects.filter(name__in=RECURRING, status=Job.QUEUED).values_list('name', flat=True))
+    return Job.objects.bulk_create(Job(name=name) for name in RECURRING if name not in queued)
+
+
+def queue_next_run(finished):
+    """Queue the next run of a recurring job unless another one is queued.
+
+    Runs queued twice, e.g. by two workers starting at once, thereby
+    collapse into one.
+    """
+    others = Job.objects.filter(name=finished.name, status=Job.QUEUED).exclude(pk=finished.pk)
+    if not others.exists():
+        Job.objects.create(
+            name=finished.name,
+            payload=finished.payload,
+            run_at=timezone.now() + timedelta(seconds=RECURRING[finished.name]),
+        )
+
+
+def retry_delay(attempts):
+    """Return how long to wait before another attempt, doubling each time."""
+    seconds = settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.JOB_RETRY_MAX_SECONDS))
+
+
+def run_next():
+    """Run the next due job and return it, or None when no job is due.
+
+    A failed job is queued again after retry_delay() until it has been
+    tried JOB_MAX_ATTEMPTS times; the writes of a failed attempt are
+    rolled back. A recurring job queues its next run once it is done or
+    has failed for good.
+    """
+    with transaction.atomic():
+        queued = Job.objects.claim()
+        if queued is None:
+            return None
+        queued.attempts += 1
+        queued.started_at = timezone.now()
+        try:
+            with transaction.atomic():
+                JOBS[queued.name](**queued.payload)
+        except Exception as error:
+            logger.exception('Job %s #%s failed on attempt %s', queued.name, queued.pk, queued.attempts)
+            queued.last_error = f'{type(error).__name__}: {error}'
+            if queued.attempts >= settings.JOB_MAX_ATTEMPTS:
+                queued.status = Job.FAILED
+                queued.finished_at = timezone.now()
+            else:
+                queued.run_at = timezone.now() + retry_delay(queued.attempts)
+        else:
+            queued.status = Job.DONE
+            queued.finished_at = timezone.now()
+        if queued.name in RECURRING and queued.status != Job.QUEUED:
+            queue_next_run(queued)
+        queued.save()
+    return queued
+
+
+def work(stop, poll_seconds, burst=False, prune_seconds=None):
+    """Run due jobs until stop is set and return how many were run.
+
+    When no job is due the worker waits poll_seconds, or returns in burst
+    mode, and prunes old jobs if it has not for prune_seconds. Errors
+    reaching the queue, e.g. while the database restarts, are logged and
+    retried after a growing delay instead of ending the worker.
+    """
+    count = 0
+    failures = 0
+    pruned = None
+    while not stop.is_set():
+        try:
+            done = run_next()
+            if done is None and prune_seconds is not None and (
+                    pruned is None or time.monotonic() - pruned >= prune_seconds):
+                Job.objects.prune()
+                pruned = time.monotonic()
+        except Exception:
+            failures += 1
+            logger.exception('Worker cannot reach the job queue, attempt %s', failures)
+            close_old_connections()
+            stop.wait(min(poll_seconds * 2 ** failures, ERROR_BACKOFF_MAX_SECONDS))
+            continue
+        failures = 0
+        if done is not None:
+            count += 1
+        elif burst:
+            break
+        else:
+            stop.wait(poll_seconds)
+    return count
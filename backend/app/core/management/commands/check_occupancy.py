@@ -0,0 +1,21 @@
+"""
+Django command to check cottage occupancy bitmaps against bookings.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import CottageOccupancy
+
+
+class Command(BaseCommand):
+    """Django command to check occupancy bitmaps"""
+    help = 'Compare every occupancy bitmap with the bookings it was built from.'
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        mismatched = CottageOccupancy.objects.inconsistent()
+        if mismatched:
+            raise CommandError(
+                'Occupancy is inconsistent for cottages: '
+                + ', '.join(str(cottage_id) for cottage_id in mismatched)
+            )
+        self.stdout.write(self.style.SUCCESS('Occupancy is consistent.'))
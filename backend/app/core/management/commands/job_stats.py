@@ -0,0 +1,39 @@
+"""
+Django command to print throughput and latency of background jobs.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Job
+
+
+class Command(BaseCommand):
+    """Django command to print background job stats"""
+    help = 'Print one line per job name with its throughput and latency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--minutes',
+            type=int,
+            default=60,
+            help='Only count jobs finished in the last minutes.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        seconds = options['minutes'] * 60
+        stats = Job.objects.stats(timezone.now() - timedelta(seconds=seconds))
+        for name, item in sorted(stats.items()):
+            row = {
+                'job': name,
+                'done': item['done'],
+                'failed': item['failed'],
+                'queued': item['queued'],
+                'per_s': f'{item["done"] / seconds:.3f}',
+            }
+            for key in ('latency_avg_ms', 'latency_p95_ms', 'run_avg_ms', 'run_p95_ms'):
+                if key in item:
+                    row[key] = f'{item[key]:.1f}'
+            self.stdout.write(' '.join(f'{key}={value}' for key, value in row.items()))
@@ -0,0 +1,16 @@
+"""
+Django command to rebuild cottage occupancy bitmaps from bookings.
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import CottageOccupancy
+
+
+class Command(BaseCommand):
+    """Django command to rebuild occupancy bitmaps"""
+    help = 'Rebuild every cottage occupancy bitmap from scratch, anchored at today.'
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        count = CottageOccupancy.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt occupancy for {count} cottages.'))
@@ -0,0 +1,16 @@
+"""
+Django command to rebuild the daily cottage summary from bookings.
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import DailyCottageStats
+
+
+class Command(BaseCommand):
+    """Django command to rebuild daily cottage stats"""
+    help = 'Rebuild the daily occupancy and revenue summary from every booking.'
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        count = DailyCottageStats.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt daily stats with {count} booked nights.'))
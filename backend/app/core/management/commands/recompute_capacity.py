@@ -0,0 +1,16 @@
+"""
+Django command to recompute the total capacity and amenity ids of every cottage.
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import Cottage
+
+
+class Command(BaseCommand):
+    """Django command to recompute cottage capacity"""
+    help = 'Recompute total capacity and amenity ids of all cottages in a single statement.'
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        count = Cottage.objects.refresh_amenities()
+        self.stdout.write(self.style.SUCCESS(f'Recomputed capacity of {count} cottages.'))
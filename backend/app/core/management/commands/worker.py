@@ -0,0 +1,86 @@
+"""
+Django command to run background jobs.
+"""
+import logging
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.jobs import queue_recurring, work
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Django command to run background jobs"""
+    help = 'Run queued background jobs with a pool of worker threads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=settings.JOB_WORKER_CONCURRENCY,
+            help='Number of jobs run at the same time, each on its own connection.',
+        )
+        parser.add_argument(
+            '--poll',
+            type=float,
+            default=settings.JOB_POLL_SECONDS,
+            help='Seconds to wait before looking again when no job is due.',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit once no job is due instead of waiting for more.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        queue_recurring()
+        stop = threading.Event()
+        counts = []
+        died = []
+
+        def run(prune_seconds):
+            try:
+                counts.append(work(stop, options['poll'], options['burst'], prune_seconds))
+            except BaseException:
+                logger.exception('Worker thread died')
+                died.append(threading.current_thread().name)
+                stop.set()
+            finally:
+                connections.close_all()
+
+        # Running jobs are finished on SIGTERM or Ctrl-C, then the threads exit.
+        previous = signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        start = time.perf_counter()
+        # One thread prunes finished jobs, the others only run jobs.
+        threads = [
+            threading.Thread(target=run, args=(settings.JOB_PRUNE_SECONDS if index == 0 else None,))
+            for index in range(max(options['concurrency'], 1))
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+        elapsed = time.perf_counter() - start
+        if died:
+            # Exit non-zero so that the process supervisor restarts the worker.
+            raise CommandError(f'Worker threads died: {", ".join(died)}.')
+
+        total = sum(counts)
+        self.stdout.write(self.style.SUCCESS(
+            f'Ran {total} jobs in {elapsed:.1f}s ({total / elapsed:.1f} jobs/s).'
+        ))
@@ -0,0 +1,180 @@
+"""
+In-process metrics exposed in the Prometheus text format.
+
+Each process keeps its own registry; run one scrape target per worker
+or aggregate them in Prometheus.
+"""
+import bisect
+import math
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class of labelled metrics guarded by their own lock."""
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _check(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {labels}.')
+
+    def _snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def expose(self):
+        """Return the text format lines of the metric."""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        for labels, value in sorted(self._snapshot().items()):
+            lines += self._samples(labels, value)
+        return lines
+
+
+class Counter(Metric):
+    """Monotonically increasing count per label set."""
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        self._check(labels)
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def _samples(self, labels, value):
+        return [f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}']
+
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed buckets per label set."""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        self._check(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def count(self, *labels):
+        with self._lock:
+            state = self._values.get(labels)
+            return sum(state[0]) if state else 0
+
+    def _snapshot(self):
+        with self._lock:
+            return {labels: (list(counts), total) for labels, (counts, total) in self._values.items()}
+
+    def _samples(self, labels, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, math.inf), counts):
+            cumulative += count
+            le = _labels(self.labelnames, labels, [('le', _number(float(bound)))])
+            lines.append(f'{self.name}_bucket{le} {cumulative}')
+        lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}')
+        lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+class Registry:
+    """Ordered collection of metrics."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def expose(self):
+        """Return every metric in the Prometheus text format."""
+        lines = []
+        for metric in self._metrics:
+            lines += metric.expose()
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(Counter(
+    'http_requests_total', 'HTTP requests handled.', ('view', 'method', 'status'),
+))
+REQUEST_ERRORS = REGISTRY.register(Counter(
+    'http_request_errors_total', 'HTTP requests answered with a server error.', ('view', 'status'),
+))
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    'http_request_duration_seconds', 'Time to produce the HTTP response.', ('view',),
+))
+DB_CONNECTIONS = REGISTRY.register(Counter(
+    'db_connections_opened_total', 'Database connections opened.', ('alias',),
+))
+DB_QUERIES = REGISTRY.register(Histogram(
+    'db_query_duration_seconds', 'Time spent running database queries.', ('alias',),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+))
+
+
+def view_name(view_func, method):
+    """Return the label of a view, e.g. BookingViewSet.create."""
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return getattr(view_func, '__name__', type(view_func).__name__)
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{view_class.__name__}.{actions.get(method.lower(), method.lower())}'
+
+
+def _time_query(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        DB_QUERIES.observe(time.perf_counter() - start, context['connection'].alias)
+
+
+def instrument_connection(connection):
+    """Count a new database connection and time its queries from now on."""
+    DB_CONNECTIONS.inc(connection.alias)
+    if _time_query not in connection.execute_wrappers:
+        # Kept first so that wrappers added and popped by execute_wrapper()
+        # blocks around it are unaffected.
+        connection.execute_wrappers.insert(0, _time_query)
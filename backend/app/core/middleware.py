@@ -0,0 +1,189 @@
+"""
+Middleware for core request handling.
+"""
+import asyncio
+import json
+import logging
+import time
+
+from asgiref.sync import async_to_sync, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.urls import reverse
+
+from core import metrics, profiling, timing
+
+logger = logging.getLogger(__name__)
+
+
+class SyncAndAsyncMiddleware:
+    """Base of middleware serving WSGI and ASGI requests alike.
+
+    Under ASGI Django passes an async get_response, and __call__ must then
+    return a coroutine; subclasses do so by returning self.__acall__().
+    Sync only middleware would instead be adapted with a thread hop per
+    request.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+
+class RequestTimingMiddleware(SyncAndAsyncMiddleware):
+    """Report SQL, serialization and render time of every request.
+
+    Enabled by the REQUEST_TIMING setting. Timings are sent in a
+    Server-Timing header and logged as one JSON line; requests running the
+    same statement REQUEST_TIMING_REPEATED_QUERIES times or more are logged
+    as warnings, since that usually means an N+1 query pattern.
+    """
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.REQUEST_TIMING:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with timing.recording() as timings:
+            response = self.get_response(request)
+        return self.report(request, response, timings, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if not settings.REQUEST_TIMING:
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        with timing.recording() as timings:
+            response = await self.get_response(request)
+        return self.report(request, response, timings, time.perf_counter() - start)
+
+    def report(self, request, response, timings, total):
+        """Add the Server-Timing header and log the timings."""
+        repeated = timings.repeated_queries(settings.REQUEST_TIMING_REPEATED_QUERIES)
+        response['Server-Timing'] = self.server_timing(timings, total, repeated)
+        self.log(request, response, timings, total, repeated)
+        return response
+
+    def process_template_response(self, request, response):
+        """Render DRF responses here so that rendering is timed on its own."""
+        if settings.REQUEST_TIMING:
+            with timing.measure('render'):
+                response.render()
+        return response
+
+    @staticmethod
+    def server_timing(timings, total, repeated):
+        """Return the Server-Timing header value."""
+        metrics = [f'db;dur={timings.sql * 1000:.2f};desc="{timings.query_count} queries"']
+        metrics += [
+            f'{name};dur={timings.spans[name] * 1000:.2f}'
+            for name in ('serialize', 'render') if name in timings.spans
+        ]
+        metrics.append(f'total;dur={total * 1000:.2f}')
+        if repeated:
+            metrics.append(f'n-plus-one;desc="{repeated[0][1]} identical queries"')
+        return ', '.join(metrics)
+
+    @staticmethod
+    def log(request, response, timings, total, repeated):
+        """Log the timings of the request as one JSON line."""
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': timings.query_count,
+            'db_ms': round(timings.sql * 1000, 2),
+            'serialize_ms': round(timings.spans.get('serialize', 0) * 1000, 2),
+            'render_ms': round(timings.spans.get('render', 0) * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        }
+        if repeated:
+            record['repeated_queries'] = [{'sql': sql, 'count': count} for sql, count in repeated]
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
+
+
+class MetricsMiddleware(SyncAndAsyncMiddleware):
+    """Count and time requests per DRF view and action.
+
+    Enabled by the METRICS_ENABLED setting; the numbers are served by the
+    metrics view in the Prometheus text format.
+    """
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    @staticmethod
+    def record(request, response, elapsed):
+        """Count the request against the view that handled it."""
+        # The resolver match is read here rather than in process_view(),
+        # which ASGI requests would have to call from a thread.
+        match = getattr(request, 'resolver_match', None)
+        view = metrics.view_name(match.func, request.method) if match else 'unmatched'
+        status = str(response.status_code)
+        metrics.REQUESTS.inc(view, request.method, status)
+        if response.status_code >= 500:
+            metrics.REQUEST_ERRORS.inc(view, status)
+        metrics.REQUEST_LATENCY.observe(elapsed, view)
+
+
+class ProfilingMiddleware(SyncAndAsyncMiddleware):
+    """Profile requests of staff users that ask for it.
+
+    A request is profiled when it carries ``?profile=1`` or an
+    ``X-Profile: 1`` header. The profile id and summary URL are returned in
+    X-Profile-Id and X-Profile-Url headers. Other requests only pay for the
+    flag lookup.
+    """
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not (settings.REQUEST_PROFILING and profiling.requested(request)):
+            return self.get_response(request)
+        if not profiling.is_staff(request):
+            return self.get_response(request)
+
+        return self.add_headers(*profiling.run(self.get_response, request))
+
+    async def __acall__(self, request):
+        if not (settings.REQUEST_PROFILING and profiling.requested(request)):
+            return await self.get_response(request)
+        if not await sync_to_async(profiling.is_staff)(request):
+            return await self.get_response(request)
+
+        # cProfile only sees its own thread, so the profiled request is run
+        # from a thread, where sync views called through it run as well.
+        return self.add_headers(
+            *await sync_to_async(profiling.run)(async_to_sync(self.get_response), request)
+        )
+
+    @staticmethod
+    def add_headers(response, profile_id):
+        if profile_id is not None:
+            response['X-Profile-Id'] = profile_id
+            response['X-Profile-Url'] = reverse('profile-detail', args=[profile_id])
+        return response
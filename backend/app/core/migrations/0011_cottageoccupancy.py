@@ -0,0 +1,22 @@
+# Generated by Django 4.0.10 on 2026-10-18 15:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_booking_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CottageOccupancy',
+            fields=[
+                ('cottage', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='occupancy', serialize=False, to='core.cottage')),
+                ('start', models.DateField()),
+                ('bitmap', models.BinaryField()),
+            ],
+        ),
+    ]
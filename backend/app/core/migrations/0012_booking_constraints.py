@@ -0,0 +1,30 @@
+# Generated by Django 4.0.10 on 2026-10-18 15:20
+
+import core.models
+import django.contrib.postgres.constraints
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_cottageoccupancy'),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.CheckConstraint(check=models.Q(('check_in__lt', django.db.models.expressions.F('check_out'))), name='booking_check_out_after_check_in'),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(expressions=[('cottage', '='), (core.models.DateRange('check_in', 'check_out'), '&&')], name='booking_no_overlapping_cottage'),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(expressions=[('customer_email', '='), (core.models.DateRange('check_in', 'check_out'), '&&')], name='booking_no_overlapping_customer'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.0.10 on 2026-10-18 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_booking_constraints'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['cottage', 'check_out'], include=('check_in',), name='booking_cottage_dates_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['customer_email', 'check_out'], include=('check_in',), name='booking_customer_dates_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['-check_in', '-id'], name='booking_check_in_id_idx'),
+        ),
+    ]
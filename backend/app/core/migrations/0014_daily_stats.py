@@ -0,0 +1,58 @@
+# Generated by Django 4.0.10 on 2026-10-18 16:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_booking_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyResortStats',
+            fields=[
+                ('date', models.DateField(primary_key=True, serialize=False)),
+                ('occupied_nights', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyCottageStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('cottage', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='core.cottage')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailycottagestats',
+            constraint=models.UniqueConstraint(fields=('cottage', 'date'), name='daily_stats_cottage_date_unique'),
+        ),
+        migrations.RunSQL(
+            sql=[
+                """
+                INSERT INTO core_dailycottagestats (cottage_id, date, revenue)
+                SELECT booking.cottage_id, night::date, cottage.price_per_night
+                FROM core_booking booking
+                JOIN core_cottage cottage ON cottage.id = booking.cottage_id
+                CROSS JOIN LATERAL generate_series(
+                    booking.check_in::timestamp,
+                    (booking.check_out - 1)::timestamp,
+                    interval '1 day'
+                ) AS night
+                ON CONFLICT (cottage_id, date) DO NOTHING
+                """,
+                """
+                INSERT INTO core_dailyresortstats (date, occupied_nights, revenue)
+                SELECT date, COUNT(*), SUM(revenue)
+                FROM core_dailycottagestats
+                GROUP BY date
+                """,
+            ],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.0.10 on 2026-10-18 16:26
+
+import core.models
+import django.contrib.postgres.constraints
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_daily_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeekdayRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('adjustment_percent', models.SmallIntegerField()),
+                ('cottage', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekday_rates', to='core.cottage')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SeasonalRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateField()),
+                ('end', models.DateField()),
+                ('price_per_night', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('cottage', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seasonal_rates', to='core.cottage')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='weekdayrate',
+            constraint=models.UniqueConstraint(fields=('cottage', 'weekday'), name='weekday_rate_cottage_weekday_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='weekdayrate',
+            constraint=models.CheckConstraint(check=models.Q(('adjustment_percent__gt', -100), ('weekday__lte', 6)), name='weekday_rate_valid'),
+        ),
+        migrations.AddConstraint(
+            model_name='seasonalrate',
+            constraint=models.CheckConstraint(check=models.Q(('start__lt', django.db.models.expressions.F('end'))), name='seasonal_rate_end_after_start'),
+        ),
+        migrations.AddConstraint(
+            model_name='seasonalrate',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(expressions=[('cottage', '='), (core.models.DateRange('start', 'end'), '&&')], name='seasonal_rate_no_overlap'),
+        ),
+    ]
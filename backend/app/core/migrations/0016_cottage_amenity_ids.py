@@ -0,0 +1,41 @@
+# Generated by Django 4.0.10 on 2026-10-18 16:28
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_rates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cottage',
+            name='amenity_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE core_cottage cottage
+                SET amenity_ids = links.ids
+                FROM (
+                    SELECT cottage_id, array_agg(amenities_id ORDER BY amenities_id) AS ids
+                    FROM core_cottage_amenities
+                    GROUP BY cottage_id
+                ) links
+                WHERE links.cottage_id = cottage.id
+                """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='cottage',
+            index=models.Index(fields=['category', '-name', '-id'], name='cottage_category_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cottage',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['amenity_ids'], name='cottage_amenity_ids_gin'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.0.10 on 2026-10-18 16:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_cottage_amenity_ids'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cottage',
+            index=models.Index(fields=['category', 'total_capacity', 'price_per_night'], name='cottage_category_capacity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cottage',
+            index=models.Index(fields=['price_per_night', 'id'], include=('total_capacity',), name='cottage_price_id_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.0.10 on 2026-10-18 16:33
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_cottage_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='amenities',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='cottage',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(
+            sql=[
+                """
+                CREATE TRIGGER cottage_search_vector_update
+                BEFORE INSERT OR UPDATE OF name, category, search_vector ON core_cottage
+                FOR EACH ROW EXECUTE FUNCTION
+                tsvector_update_trigger(search_vector, 'pg_catalog.simple', name, category)
+                """,
+                """
+                CREATE TRIGGER amenities_search_vector_update
+                BEFORE INSERT OR UPDATE OF name, search_vector ON core_amenities
+                FOR EACH ROW EXECUTE FUNCTION
+                tsvector_update_trigger(search_vector, 'pg_catalog.simple', name)
+                """,
+                # Rewriting the names fires the triggers for existing rows.
+                'UPDATE core_cottage SET name = name',
+                'UPDATE core_amenities SET name = name',
+            ],
+            reverse_sql=[
+                'DROP TRIGGER cottage_search_vector_update ON core_cottage',
+                'DROP TRIGGER amenities_search_vector_update ON core_amenities',
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='amenities',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='amenities_search_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='cottage',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='cottage_search_gin'),
+        ),
+    ]
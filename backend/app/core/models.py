@@ -1,12 +1,26 @@
-from django.db import models
+import heapq
+from datetime import timedelta
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import ArrayField, DateRangeField, RangeOperators
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Count, Exists, F, Func, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin
 )
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
 from rest_framework.exceptions import ValidationError
 
+from core.caching import bump_catalogue_version
+
 
 class UserManager(BaseUserManager):
     """Manager for users."""
@@ -47,15 +61,85 @@ class Amenities(models.Model):
     """Amenities for cottages and hotel."""
     name = models.CharField(max_length=100)
     additional_capacity = models.IntegerField(default=0)
+    # Written by a database trigger whenever the name changes.
+    search_vector = SearchVectorField(null=True, editable=False)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='amenities_search_gin'),
+        ]
+
     def __str__(self):
         return f"{self.name} (+{self.additional_capacity})"
 
 
+AMENITY_IDS_FIELD = ArrayField(models.BigIntegerField(), default=list, blank=True, editable=False)
+
+
+class CottageQuerySet(models.QuerySet):
+    """Queryset for cottages."""
+
+    def available(self, check_in, check_out, guests=None):
+        """Return cottages with no booking overlapping the given dates."""
+        overlapping_bookings = Booking.objects.filter(
+            cottage=OuterRef('pk'),
+            check_in__lt=check_out,
+            check_out__gt=check_in,
+        )
+        queryset = self.filter(~Exists(overlapping_bookings))
+        if guests is not None:
+            queryset = queryset.filter(total_capacity__gte=guests)
+        return queryset
+
+    def refresh_total_capacity(self):
+        """Recompute total capacity of the cottages in a single UPDATE."""
+        additional_capacity = Amenities.objects.filter(
+            cottage=OuterRef('pk')
+        ).order_by().values('cottage').annotate(
+            total=Sum('additional_capacity')
+        ).values('total')
+        count = self.update(
+            total_capacity=F('base_capacity') + Coalesce(Subquery(additional_capacity), 0)
+        )
+        transaction.on_commit(bump_catalogue_version)
+        return count
+
+    def refresh_amenities(self):
+        """Recompute total capacity and amenity ids of the cottages at once."""
+        links = Cottage.amenities.through.objects.filter(
+            cottage=OuterRef('pk')
+        ).order_by().values('cottage')
+        additional_capacity = links.annotate(
+            total=Sum('amenities__additional_capacity')
+        ).values('total')
+        amenity_ids = links.annotate(
+            ids=ArrayAgg('amenities_id', ordering='amenities_id')
+        ).values('ids')
+        count = self.update(
+            total_capacity=F('base_capacity') + Coalesce(Subquery(additional_capacity), 0),
+            amenity_ids=Coalesce(Subquery(amenity_ids), Value([]), output_field=AMENITY_IDS_FIELD),
+        )
+        transaction.on_commit(bump_catalogue_version)
+        return count
+
+    def with_amenities(self, amenity_ids):
+        """Return the cottages offering every one of the amenities."""
+        return self.filter(amenity_ids__contains=sorted(set(amenity_ids)))
+
+    def lock(self, ids):
+        """Lock the rows of the given cottages until the transaction ends."""
+        return list(
+            self.select_for_update()
+            .filter(pk__in=set(ids))
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+
+
 class Cottage(models.Model):
     """Cottage object."""
     CATEGORY_CHOICES = [
@@ -68,25 +152,195 @@ class Cottage(models.Model):
     amenities = models.ManyToManyField(Amenities)
     price_per_night = models.DecimalField(max_digits=10, decimal_places=2)
     total_capacity = models.IntegerField(editable=False, default=0)
+    # Sorted ids of the amenities, kept with the m2m links so that "has all
+    # of these amenities" is one GIN-indexed containment test.
+    amenity_ids = AMENITY_IDS_FIELD.clone()
+    # Written by a database trigger whenever the name or category changes.
+    search_vector = SearchVectorField(null=True, editable=False)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
 
+    objects = CottageQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Category filters keep the list ordering of the API.
+            models.Index(fields=['category', '-name', '-id'], name='cottage_category_name_idx'),
+            # Party size and price searches within a category, and the
+            # price-sorted list whose pages start at their keyset position.
+            models.Index(
+                fields=['category', 'total_capacity', 'price_per_night'],
+                name='cottage_category_capacity_idx',
+            ),
+            models.Index(
+                fields=['price_per_night', 'id'],
+                include=['total_capacity'],
+                name='cottage_price_id_idx',
+            ),
+            GinIndex(fields=['amenity_ids'], name='cottage_amenity_ids_gin'),
+            GinIndex(fields=['search_vector'], name='cottage_search_gin'),
+        ]
+
     def calculate_total_capacity(self):
         """Calculate the total capacity of the cottage including amenities."""
-        base_capacity = self.base_capacity
-        additional_capacity = sum(amenity.additional_capacity for amenity in self.amenities.all())
-        total_capacity = base_capacity + additional_capacity
+        additional_capacity = self.amenities.aggregate(
+            total=Coalesce(Sum('additional_capacity'), 0)
+        )['total']
 
-        return total_capacity
+        return self.base_capacity + additional_capacity
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'base_capacity' in update_fields:
+            if self._state.adding:
+                self.total_capacity = self.base_capacity
+            else:
+                self.total_capacity = self.calculate_total_capacity()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'total_capacity'}
+        if update_fields is None and not self._state.adding:
+            # A full save writes every column, so the ids are read again
+            # instead of trusting ones loaded before the links changed.
+            self.amenity_ids = sorted(self.amenities.values_list('id', flat=True))
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f'{self.name}, {self.category}, max. guests - {self.total_capacity}, price - {self.price_per_night}'
 
 
+class DateRange(Func):
+    """Half-open PostgreSQL date range between two date expressions."""
+    function = 'DATERANGE'
+    output_field = DateRangeField()
+
+
+class BookingQuerySet(models.QuerySet):
+    """Queryset for bookings."""
+
+    def conflicts(self, bookings):
+        """Return why unsaved bookings cannot be stored, keyed by position.
+
+        Stored bookings that could overlap the batch are read in one query,
+        then each cottage and each customer timeline is swept in date order.
+        """
+        if not bookings:
+            return {}
+        timelines = {}
+        for index, booking in enumerate(bookings):
+            for key in (('cottage', booking.cottage_id), ('customer', booking.customer_email)):
+                timelines.setdefault(key, []).append((booking.check_in, booking.check_out, index))
+
+        stored = self.filter(
+            Q(cottage_id__in={booking.cottage_id for booking in bookings})
+            | Q(customer_email__in={booking.customer_email for booking in bookings}),
+            check_in__lt=max(booking.check_out for booking in bookings),
+            check_out__gt=min(booking.check_in for booking in bookings),
+        ).values_list('cottage_id', 'customer_email', 'check_in', 'check_out')
+        for cottage_id, customer_email, check_in, check_out in stored:
+            for key in (('cottage', cottage_id), ('customer', customer_email)):
+                if key in timelines:
+                    timelines[key].append((check_in, check_out, None))
+
+        errors = {}
+        # Cottage timelines go first so their message wins for a booking
+        # that clashes on both.
+        for (kind, _), intervals in sorted(timelines.items(), key=lambda item: item[0][0]):
+            intervals.sort(key=lambda interval: interval[:2])
+            active = []
+            for order, (check_in, check_out, index) in enumerate(intervals):
+                while active and active[0][0] <= check_in:
+                    heapq.heappop(active)
+                for _, _, other in active:
+                    self._record_conflict(errors, kind, index, other)
+                heapq.heappush(active, (check_out, order, index))
+        return errors
+
+    def nearest_free_windows(self, cottage_id, check_in, check_out, earliest, latest):
+        """Return the free stays of the same length nearest to the dates.
+
+        Returns the check-in dates of the latest stay starting before
+        check_in and of the earliest stay starting after it, or None, within
+        earliest and latest. The cottage's bookings are read in one sorted
+        query and the gaps between them are scanned once.
+        """
+        nights = check_out - check_in
+        day = timedelta(days=1)
+        bookings = self.filter(
+            cottage_id=cottage_id,
+            check_in__lt=latest,
+            check_out__gt=earliest,
+        ).order_by('check_in').values_list('check_in', 'check_out')
+
+        before = after = None
+        free_from = earliest
+        for busy_from, busy_until in [*bookings, (latest, latest)]:
+            if busy_from - free_from >= nights:
+                last = min(busy_from - nights, check_in - day)
+                if last >= free_from:
+                    before = last
+                first = max(free_from, check_in + day)
+                if first + nights <= busy_from:
+                    after = first
+                    break
+            free_from = max(free_from, busy_until)
+        return before, after
+
+    @staticmethod
+    def _record_conflict(errors, kind, index, other):
+        """Blame the batch booking that cannot be stored for an overlap."""
+        if index is None or other is None:
+            index = other if index is None else index
+            if index is not None:
+                constraint = f'booking_no_overlapping_{kind}'
+                errors.setdefault(index, Booking.CONSTRAINT_MESSAGES[constraint])
+            return
+        earlier, later = sorted((index, other))
+        errors.setdefault(later, Booking.BATCH_CONFLICT_MESSAGES[kind].format(earlier))
+
+    def bulk_book(self, bookings):
+        """Store the bookings together, or none of them.
+
+        Raises ValidationError with one entry per booking, empty for the
+        bookings that were fine, when any of them cannot be stored.
+        """
+        for booking in bookings:
+            booking.clean()
+        with transaction.atomic():
+            Cottage.objects.lock(booking.cottage_id for booking in bookings)
+            errors = self.conflicts(bookings)
+            if errors:
+                raise ValidationError([
+                    {'non_field_errors': [errors[index]]} if index in errors else {}
+                    for index in range(len(bookings))
+                ])
+            try:
+                with transaction.atomic():
+                    created = self.bulk_create(bookings)
+            except IntegrityError as error:
+                raise Booking.constraint_error(error) from error
+            nights = [(booking.cottage_id, booking.check_in, booking.check_out) for booking in created]
+            CottageOccupancy.objects.mark_many(nights, occupied=True)
+            DailyCottageStats.objects.refresh(nights)
+        for booking in created:
+            booking._booked_nights = (booking.cottage_id, booking.check_in, booking.check_out)
+        return created
+
+
 class Booking(models.Model):
     """Booking model for managing cottage reservations."""
+    CONSTRAINT_MESSAGES = {
+        'booking_check_out_after_check_in': 'Check-out date must be later than check-in date.',
+        'booking_no_overlapping_cottage': 'This cottage is already booked for the selected dates.',
+        'booking_no_overlapping_customer':
+            'This customer already has a booking in another cottage for the selected dates.',
+    }
+    BATCH_CONFLICT_MESSAGES = {
+        'cottage': 'This cottage is already booked by item {} of this request for the selected dates.',
+        'customer': 'This customer already has a booking in item {} of this request for the selected dates.',
+    }
+
     cottage = models.ForeignKey(Cottage, on_delete=models.CASCADE)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -98,31 +352,651 @@ class Booking(models.Model):
     customer_email = models.EmailField()
     is_confirmed = models.BooleanField(default=False)
 
-    def clean(self):
-        overlapping_bookings = Booking.objects.filter(
-            cottage=self.cottage,
-            check_in__lt=self.check_out,
-            check_out__gt=self.check_in,
-        ).exclude(id=self.id)
+    objects = BookingQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if {'cottage_id', 'check_in', 'check_out'}.issubset(field_names):
+            instance._booked_nights = (instance.cottage_id, instance.check_in, instance.check_out)
+        return instance
+
+    def _previous_nights(self):
+        """Return the cottage and dates this booking is stored with."""
+        if not hasattr(self, '_booked_nights'):
+            self._booked_nights = None
+            if self.pk is not None:
+                self._booked_nights = Booking.objects.filter(pk=self.pk).values_list(
+                    'cottage_id', 'check_in', 'check_out'
+                ).first()
+        return self._booked_nights
 
-        if overlapping_bookings.exists():
-            raise ValidationError('This cottage is already booked for the selected dates.')
+    @classmethod
+    def constraint_error(cls, error):
+        """Return the ValidationError for a violated booking constraint.
 
-        customer_bookings = Booking.objects.filter(
-            customer_email=self.customer_email,
-            check_in__lt=self.check_out,
-            check_out__gt=self.check_in
-        ).exclude(id=self.id)
+        Integrity errors from other constraints are returned unchanged.
+        """
+        constraint = getattr(getattr(error.__cause__, 'diag', None), 'constraint_name', None)
+        if constraint not in cls.CONSTRAINT_MESSAGES:
+            return error
+        return ValidationError(cls.CONSTRAINT_MESSAGES[constraint])
 
-        if customer_bookings.exists():
-            raise ValidationError('This customer already has a booking in another cottage for the selected dates.')
+    def _normalize_dates(self):
+        """Convert check-in and check-out values to dates."""
+        for field_name in ('check_in', 'check_out'):
+            field = self._meta.get_field(field_name)
+            setattr(self, field_name, field.to_python(getattr(self, field_name)))
 
+    class Meta:
+        indexes = [
+            # Overlap lookups filter on check_out > requested check-in,
+            # which keeps the scan to current and future bookings.
+            models.Index(
+                fields=['cottage', 'check_out'],
+                include=['check_in'],
+                name='booking_cottage_dates_idx',
+            ),
+            models.Index(
+                fields=['customer_email', 'check_out'],
+                include=['check_in'],
+                name='booking_customer_dates_idx',
+            ),
+            models.Index(fields=['-check_in', '-id'], name='booking_check_in_id_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=Q(check_in__lt=F('check_out')),
+                name='booking_check_out_after_check_in',
+            ),
+            ExclusionConstraint(
+                name='booking_no_overlapping_cottage',
+                expressions=[
+                    ('cottage', RangeOperators.EQUAL),
+                    (DateRange('check_in', 'check_out'), RangeOperators.OVERLAPS),
+                ],
+            ),
+            ExclusionConstraint(
+                name='booking_no_overlapping_customer',
+                expressions=[
+                    ('customer_email', RangeOperators.EQUAL),
+                    (DateRange('check_in', 'check_out'), RangeOperators.OVERLAPS),
+                ],
+            ),
+        ]
+
+    def clean(self):
+        self._normalize_dates()
         if self.check_in >= self.check_out:
             raise ValidationError('Check-out date must be later than check-in date.')
 
     def save(self, *args, **kwargs):
-        self.clean()
-        super().save(*args, **kwargs)
+        """Save the booking, relying on the database to reject overlaps.
+
+        Writers for the same cottage are serialized on the cottage row,
+        while writers for other cottages proceed in parallel.
+        """
+        with transaction.atomic():
+            previous = self._previous_nights()
+            self.clean()
+            Cottage.objects.lock([self.cottage_id] + ([previous[0]] if previous else []))
+            try:
+                super().save(*args, **kwargs)
+            except IntegrityError as error:
+                raise self.constraint_error(error) from error
+            if previous:
+                CottageOccupancy.objects.mark(*previous, occupied=False)
+            CottageOccupancy.objects.mark(
+                self.cottage_id, self.check_in, self.check_out, occupied=True
+            )
+            self._booked_nights = (self.cottage_id, self.check_in, self.check_out)
+            DailyCottageStats.objects.refresh([self._booked_nights] + ([previous] if previous else []))
 
     def __str__(self):
         return f'Booking for {self.customer_name} in {self.cottage.name}'
+
+
+class CottageOccupancyManager(models.Manager):
+    """Manager for cottage occupancy bitmaps."""
+
+    def _build_bitmaps(self, start, horizon, cottage_ids=None):
+        """Return the bitmaps computed from bookings, keyed by cottage id."""
+        end = start + timedelta(days=horizon)
+        bookings = Booking.objects.filter(check_in__lt=end, check_out__gt=start)
+        if cottage_ids is not None:
+            bookings = bookings.filter(cottage_id__in=cottage_ids)
+
+        bitmaps = {}
+        for cottage_id, check_in, check_out in bookings.values_list(
+                'cottage_id', 'check_in', 'check_out').iterator():
+            bits = CottageOccupancy.nights_mask(start, horizon, check_in, check_out)
+            bitmaps[cottage_id] = bitmaps.get(cottage_id, 0) | bits
+        return bitmaps
+
+    def _new(self, cottage_id, start, horizon, bits):
+        return self.model(
+            cottage_id=cottage_id,
+            start=start,
+            bitmap=bits.to_bytes(horizon // 8, 'little'),
+        )
+
+    def rebuild(self, cottage_ids=None):
+        """Rebuild bitmaps from bookings, anchored at today.
+
+        The cottages are locked first, like every booking write does, so
+        that bookings written meanwhile are either read here or marked in
+        the rebuilt bitmap once it is committed.
+        """
+        start = timezone.now().date()
+        horizon = CottageOccupancy.horizon_days()
+        cottages = Cottage.objects.all()
+        if cottage_ids is not None:
+            cottages = cottages.filter(id__in=cottage_ids)
+
+        with transaction.atomic():
+            ids = Cottage.objects.lock(cottages.values_list('id', flat=True))
+            self.filter(cottage_id__in=ids).delete()
+            bitmaps = self._build_bitmaps(start, horizon, ids)
+            self.bulk_create(
+                [self._new(cottage_id, start, horizon, bitmaps.get(cottage_id, 0)) for cottage_id in ids],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+        return len(ids)
+
+    def roll(self):
+        """Re-anchor at today the bitmaps starting before today.
+
+        Otherwise the covered window shrinks by a day every day, and checks
+        past its end fall back to querying bookings. Returns the number of
+        cottages rebuilt.
+        """
+        stale = list(self.filter(start__lt=timezone.now().date()).values_list('cottage_id', flat=True))
+        if stale:
+            self.rebuild(stale)
+        return len(stale)
+
+    def inconsistent(self):
+        """Return ids of cottages whose bitmap disagrees with their bookings."""
+        mismatched = []
+        for occupancy in self.order_by('cottage_id').iterator():
+            expected = self._build_bitmaps(
+                occupancy.start, occupancy.horizon, [occupancy.cottage_id]
+            ).get(occupancy.cottage_id, 0)
+            if expected != occupancy.bits:
+                mismatched.append(occupancy.cottage_id)
+        return mismatched
+
+    def is_available(self, cottage_id, check_in, check_out):
+        """Return whether the nights are free, or None if not covered."""
+        occupancy = self.filter(cottage_id=cottage_id).first()
+        if occupancy is None:
+            return None
+        return occupancy.is_free(check_in, check_out)
+
+    async def ais_available(self, cottage_id, check_in, check_out):
+        """Async is_available() for async views."""
+        occupancy = await self.filter(cottage_id=cottage_id).afirst()
+        if occupancy is None:
+            return None
+        return occupancy.is_free(check_in, check_out)
+
+    def mark(self, cottage_id, check_in, check_out, occupied):
+        """Set or clear the nights of a booking in the cottage bitmap."""
+        self.mark_many([(cottage_id, check_in, check_out)], occupied)
+
+    def mark_many(self, nights, occupied):
+        """Set or clear (cottage_id, check_in, check_out) nights in bitmaps.
+
+        Each affected bitmap is locked once and written once.
+        """
+        cottage_ids = {cottage_id for cottage_id, _, _ in nights}
+        occupancies = {
+            occupancy.cottage_id: occupancy
+            for occupancy in self.select_for_update().filter(
+                cottage_id__in=cottage_ids
+            ).order_by('cottage_id')
+        }
+        missing = cottage_ids - occupancies.keys()
+        if missing and occupied:
+            # Rebuilt bitmaps are read from the bookings, which already
+            # include the nights being marked.
+            self.rebuild(missing)
+
+        changed = {}
+        for cottage_id, check_in, check_out in nights:
+            occupancy = occupancies.get(cottage_id)
+            if occupancy is None:
+                continue
+            bits = CottageOccupancy.nights_mask(
+                occupancy.start, occupancy.horizon, check_in, check_out
+            )
+            if not bits:
+                continue
+            value = occupancy.bits | bits if occupied else occupancy.bits & ~bits
+            occupancy.bitmap = value.to_bytes(len(occupancy.bitmap), 'little')
+            changed[cottage_id] = occupancy
+        if changed:
+            self.bulk_update(changed.values(), ['bitmap'])
+
+
+class CottageOccupancy(models.Model):
+    """Day-granular occupancy bitmap of a cottage over a rolling horizon.
+
+    Bit ``i`` is set when the night starting ``start + i days`` is booked.
+    """
+    cottage = models.OneToOneField(
+        Cottage,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='occupancy',
+    )
+    start = models.DateField()
+    bitmap = models.BinaryField()
+
+    objects = CottageOccupancyManager()
+
+    @staticmethod
+    def horizon_days():
+        """Return the configured horizon rounded up to whole bytes."""
+        return -(-settings.OCCUPANCY_HORIZON_DAYS // 8) * 8
+
+    @staticmethod
+    def nights_mask(start, horizon, check_in, check_out):
+        """Return the bits of the nights between the dates inside the horizon."""
+        first = max((check_in - start).days, 0)
+        last = min((check_out - start).days, horizon)
+        if first >= last:
+            return 0
+        return ((1 << (last - first)) - 1) << first
+
+    @property
+    def horizon(self):
+        return len(self.bitmap) * 8
+
+    @property
+    def bits(self):
+        return int.from_bytes(self.bitmap, 'little')
+
+    def covers(self, check_in, check_out):
+        """Return whether all nights between the dates are inside the horizon."""
+        return (check_in - self.start).days >= 0 and (check_out - self.start).days <= self.horizon
+
+    def is_free(self, check_in, check_out):
+        """Return whether the nights are free, or None if not covered."""
+        if not self.covers(check_in, check_out):
+            return None
+        return not self.bits & self.nights_mask(self.start, self.horizon, check_in, check_out)
+
+    def __str__(self):
+        return f'Occupancy of cottage {self.cottage_id} from {self.start}'
+
+
+class DailyCottageStatsManager(models.Manager):
+    """Manager for the per-night occupancy and revenue summary.
+
+    Every change to the summary also adds its signed difference to the
+    resort-wide totals per date, so concurrent writers never overwrite
+    each other's totals.
+    """
+
+    def _apply_to_totals(self, cursor, change_sql, params, sign=1, count_nights=True):
+        """Run change_sql returning (date, revenue) and add it to the totals.
+
+        Each returned row counts as one night times sign, unless
+        count_nights is false, and adds its revenue times sign.
+        """
+        totals = DailyResortStats._meta.db_table
+        nights = f'{sign} * COUNT(*)' if count_nights else '0'
+        cursor.execute(
+            f"""
+            WITH changed AS ({change_sql})
+            INSERT INTO {totals} AS totals (date, occupied_nights, revenue)
+            SELECT date, {nights}, {sign} * SUM(revenue)
+            FROM changed
+            GROUP BY date
+            ON CONFLICT (date) DO UPDATE SET
+                occupied_nights = totals.occupied_nights + EXCLUDED.occupied_nights,
+                revenue = totals.revenue + EXCLUDED.revenue
+            """,
+            params,
+        )
+
+    def _night_price(self, cottage, night):
+        """Return SQL for the price of a cottage on a night, as quotes price it.
+
+        A seasonal rate replaces the cottage price, and the weekday
+        adjustment is applied on top, rounded half up to the cent.
+        """
+        return f"""ROUND(
+            COALESCE((
+                SELECT season.price_per_night FROM {SeasonalRate._meta.db_table} season
+                WHERE season.cottage_id = {cottage}.id
+                  AND season.start <= {night} AND season.end > {night}
+            ), {cottage}.price_per_night)
+            * (100 + COALESCE((
+                SELECT weekday.adjustment_percent FROM {WeekdayRate._meta.db_table} weekday
+                WHERE weekday.cottage_id = {cottage}.id
+                  AND weekday.weekday = EXTRACT(ISODOW FROM {night}) - 1
+            ), 0)) / 100,
+            2
+        )"""
+
+    def _insert_nights(self, cursor, source, bounds, params):
+        """Expand the bookings joined by source into one row per night."""
+        self._apply_to_totals(
+            cursor,
+            f"""
+            INSERT INTO {self.model._meta.db_table} (cottage_id, date, revenue)
+            SELECT booking.cottage_id, night::date, {self._night_price('cottage', 'night::date')}
+            FROM {source}
+            JOIN {Cottage._meta.db_table} cottage ON cottage.id = booking.cottage_id
+            CROSS JOIN LATERAL generate_series(
+                GREATEST(booking.check_in, {bounds[0]})::timestamp,
+                (LEAST(booking.check_out, {bounds[1]}) - 1)::timestamp,
+                interval '1 day'
+            ) AS night
+            ON CONFLICT (cottage_id, date) DO NOTHING
+            RETURNING date, revenue
+            """,
+            params,
+        )
+
+    def refresh(self, ranges):
+        """Recompute the nights of (cottage_id, start, end) ranges.
+
+        Only the nights inside the ranges are deleted and expanded again
+        from the bookings, in two statements for any number of ranges.
+        """
+        ranges = [(cottage_id, start, end) for cottage_id, start, end in ranges if start < end]
+        if not ranges:
+            return
+        params = [list(column) for column in zip(*ranges)]
+        touched = 'unnest(%s::bigint[], %s::date[], %s::date[]) AS touched(cottage_id, start_date, end_date)'
+        with transaction.atomic(), connection.cursor() as cursor:
+            self._apply_to_totals(
+                cursor,
+                f"""
+                DELETE FROM {self.model._meta.db_table} stats
+                USING {touched}
+                WHERE stats.cottage_id = touched.cottage_id
+                  AND stats.date >= touched.start_date
+                  AND stats.date < touched.end_date
+                RETURNING stats.date, stats.revenue
+                """,
+                params,
+                sign=-1,
+            )
+            self._insert_nights(
+                cursor,
+                f"""{touched}
+                JOIN {Booking._meta.db_table} booking
+                  ON booking.cottage_id = touched.cottage_id
+                 AND booking.check_in < touched.end_date
+                 AND booking.check_out > touched.start_date""",
+                ('touched.start_date', 'touched.end_date'),
+                params,
+            )
+
+    def discard(self, cottage_ids):
+        """Delete every night of the cottages from the summary."""
+        with transaction.atomic(), connection.cursor() as cursor:
+            self._apply_to_totals(
+                cursor,
+                f"""
+                DELETE FROM {self.model._meta.db_table}
+                WHERE cottage_id = ANY(%s)
+                RETURNING date, revenue
+                """,
+                [list(cottage_ids)],
+                sign=-1,
+            )
+
+    def rebuild(self):
+        """Recompute the whole summary from bookings and return its size."""
+        with transaction.atomic(), connection.cursor() as cursor:
+            self.all().delete()
+            DailyResortStats.objects.all().delete()
+            self._insert_nights(
+                cursor,
+                f'{Booking._meta.db_table} booking',
+                ('booking.check_in', 'booking.check_out'),
+                [],
+            )
+        return self.count()
+
+    def reprice(self, cottage_id):
+        """Apply the current nightly prices of the cottage to its nights."""
+        table = self.model._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            self._apply_to_totals(
+                cursor,
+                f"""
+                UPDATE {table} stats
+                SET revenue = previous.price
+                FROM (
+                    SELECT nights.id, nights.revenue, {self._night_price('cottage', 'nights.date')} AS price
+                    FROM {table} nights
+                    JOIN {Cottage._meta.db_table} cottage ON cottage.id = nights.cottage_id
+                    WHERE nights.cottage_id = %s
+                    FOR UPDATE OF nights
+                ) previous
+                WHERE stats.id = previous.id AND previous.revenue <> previous.price
+                RETURNING stats.date, stats.revenue - previous.revenue AS revenue
+                """,
+                [cottage_id],
+                count_nights=False,
+            )
+
+    def by_date(self, start, end, cottage_id):
+        """Return occupied nights and revenue of a cottage per date."""
+        return self.filter(
+            cottage_id=cottage_id, date__gte=start, date__lt=end
+        ).values('date').annotate(
+            occupied_nights=Count('*'),
+            revenue=Sum('revenue'),
+        ).order_by('date')
+
+
+class DailyCottageStats(models.Model):
+    """Revenue of a cottage for one booked night.
+
+    Rows exist only for occupied nights, so the occupied nights of a period
+    are its row count.
+    """
+    cottage = models.ForeignKey(
+        Cottage,
+        on_delete=models.CASCADE,
+        related_name='daily_stats',
+        db_index=False,
+    )
+    date = models.DateField()
+    revenue = models.DecimalField(max_digits=10, decimal_places=2)
+
+    objects = DailyCottageStatsManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cottage', 'date'], name='daily_stats_cottage_date_unique'),
+        ]
+
+    def __str__(self):
+        return f'Cottage {self.cottage_id} on {self.date}: {self.revenue}'
+
+
+class DailyResortStatsManager(models.Manager):
+    """Manager for the resort-wide totals per date."""
+
+    def by_date(self, start, end):
+        """Return occupied nights and revenue of all cottages per date."""
+        return self.filter(
+            date__gte=start, date__lt=end
+        ).values('date', 'occupied_nights', 'revenue').order_by('date')
+
+
+class DailyResortStats(models.Model):
+    """Occupied nights and revenue of all cottages for one date."""
+    date = models.DateField(primary_key=True)
+    occupied_nights = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    objects = DailyResortStatsManager()
+
+    def __str__(self):
+        return f'{self.date}: {self.occupied_nights} nights, {self.revenue}'
+
+
+class SeasonalRate(models.Model):
+    """Nightly price of a cottage for the nights from start until end."""
+    cottage = models.ForeignKey(Cottage, on_delete=models.CASCADE, related_name='seasonal_rates')
+    start = models.DateField()
+    end = models.DateField()
+    price_per_night = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                check=Q(start__lt=F('end')),
+                name='seasonal_rate_end_after_start',
+            ),
+            ExclusionConstraint(
+                name='seasonal_rate_no_overlap',
+                expressions=[
+                    ('cottage', RangeOperators.EQUAL),
+                    (DateRange('start', 'end'), RangeOperators.OVERLAPS),
+                ],
+            ),
+        ]
+
+    def __str__(self):
+        return f'Cottage {self.cottage_id} from {self.start} to {self.end}: {self.price_per_night}'
+
+
+class WeekdayRate(models.Model):
+    """Percentage added to the nightly price of a cottage on a weekday.
+
+    Negative percentages are discounts. The adjusted price of each night is
+    rounded half up to the cent.
+    """
+    WEEKDAY_CHOICES = [
+        (0, 'Monday'),
+        (1, 'Tuesday'),
+        (2, 'Wednesday'),
+        (3, 'Thursday'),
+        (4, 'Friday'),
+        (5, 'Saturday'),
+        (6, 'Sunday'),
+    ]
+    cottage = models.ForeignKey(Cottage, on_delete=models.CASCADE, related_name='weekday_rates')
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    adjustment_percent = models.SmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cottage', 'weekday'], name='weekday_rate_cottage_weekday_unique'),
+            models.CheckConstraint(
+                check=Q(weekday__lte=6, adjustment_percent__gt=-100),
+                name='weekday_rate_valid',
+            ),
+        ]
+
+    def __str__(self):
+        return f'Cottage {self.cottage_id} on {self.get_weekday_display()}: {self.adjustment_percent:+d}%'
+
+
+class JobManager(models.Manager):
+    """Manager for background jobs."""
+
+    def claim(self):
+        """Return the next due job, locked until the transaction ends, or None.
+
+        Jobs locked by other workers are skipped rather than waited for, so
+        any number of workers take distinct jobs off the queue in parallel.
+        """
+        return self.select_for_update(skip_locked=True).filter(
+            status=Job.QUEUED, run_at__lte=timezone.now()
+        ).order_by('run_at', 'id').first()
+
+    def prune(self):
+        """Delete jobs that finished more than JOB_KEEP_SECONDS ago."""
+        cutoff = timezone.now() - timedelta(seconds=settings.JOB_KEEP_SECONDS)
+        return self.filter(finished_at__lt=cutoff).delete()[0]
+
+    def stats(self, since):
+        """Return counts and timings per job name of the jobs finished since.
+
+        Latency runs from enqueueing to the end of the last attempt, and run
+        time covers the last attempt only. Times are in milliseconds.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT name,
+                       COUNT(*) FILTER (WHERE status = %s),
+                       COUNT(*) FILTER (WHERE status = %s),
+                       AVG(latency), percentile_cont(0.95) WITHIN GROUP (ORDER BY latency),
+                       AVG(run), percentile_cont(0.95) WITHIN GROUP (ORDER BY run)
+                FROM (
+                    SELECT name, status,
+                           EXTRACT(EPOCH FROM finished_at - created_at) * 1000 AS latency,
+                           EXTRACT(EPOCH FROM finished_at - started_at) * 1000 AS run
+                    FROM {self.model._meta.db_table}
+                    WHERE finished_at >= %s
+                ) finished
+                GROUP BY name
+                """,
+                [Job.DONE, Job.FAILED, since],
+            )
+            rows = cursor.fetchall()
+        queued = dict(
+            self.filter(status=Job.QUEUED).values('name').annotate(count=Count('*')).values_list('name', 'count')
+        )
+        stats = {
+            name: {
+                'done': done,
+                'failed': failed,
+                'latency_avg_ms': float(latency_avg),
+                'latency_p95_ms': latency_p95,
+                'run_avg_ms': float(run_avg),
+                'run_p95_ms': run_p95,
+            }
+            for name, done, failed, latency_avg, latency_p95, run_avg, run_p95 in rows
+        }
+        for name in queued.keys() - stats.keys():
+            stats[name] = {'done': 0, 'failed': 0}
+        for name, item in stats.items():
+            item['queued'] = queued.get(name, 0)
+        return stats
+
+
+class Job(models.Model):
+    """Background job queued for, or finished by, a worker."""
+    QUEUED = 'queued'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    objects = JobManager()
+
+    class Meta:
+        indexes = [
+            # Workers only ever look for the earliest due queued job.
+            models.Index(fields=['run_at', 'id'], condition=Q(status='queued'), name='job_queued_idx'),
+            models.Index(fields=['finished_at'], name='job_finished_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
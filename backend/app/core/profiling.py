@@ -0,0 +1,161 @@
+"""
+On-demand cProfile runs of single requests.
+"""
+import cProfile
+import json
+import pstats
+import re
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+
+PROFILE_ID = re.compile(r'^[0-9]{20}-[0-9a-f]{8}$')
+
+# cProfile hooks are process wide on recent Pythons, so one request is
+# profiled at a time and concurrent requests run unprofiled.
+_lock = threading.Lock()
+
+
+def requested(request):
+    """Return whether the request asks to be profiled."""
+    return request.headers.get('X-Profile') == '1' or request.GET.get('profile') == '1'
+
+
+def is_staff(request):
+    """Return whether the request comes from a staff user.
+
+    API requests authenticate with tokens inside the view, so the token is
+    checked here as well.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    from user.authentication import CachedTokenAuthentication
+    try:
+        result = CachedTokenAuthentication().authenticate(Request(request))
+    except AuthenticationFailed:
+        return False
+    return bool(result and result[0].is_staff)
+
+
+def directory():
+    """Return the profile directory, creating it if needed."""
+    path = Path(settings.PROFILE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def prof_path(profile_id):
+    """Return the path of the stored cProfile data."""
+    return Path(settings.PROFILE_DIR) / f'{profile_id}.prof'
+
+
+def summary_path(profile_id):
+    """Return the path of the stored summary."""
+    return Path(settings.PROFILE_DIR) / f'{profile_id}.json'
+
+
+def load_summary(profile_id):
+    """Return the stored summary of a profile, or None."""
+    if not PROFILE_ID.match(profile_id) or not summary_path(profile_id).exists():
+        return None
+    return json.loads(summary_path(profile_id).read_text())
+
+
+def list_summaries():
+    """Return the stored summaries, newest first, without their details."""
+    if not Path(settings.PROFILE_DIR).exists():
+        return []
+    summaries = []
+    for path in sorted(Path(settings.PROFILE_DIR).glob('*.json'), reverse=True):
+        summary = json.loads(path.read_text())
+        summaries.append({key: summary[key] for key in ('id', 'method', 'path', 'status', 'total_ms')})
+    return summaries
+
+
+def top_functions(profiler, limit):
+    """Return the functions with the highest cumulative time."""
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            'function': f'{filename}:{line}({name})',
+            'calls': calls,
+            'tottime_ms': round(tottime * 1000, 3),
+            'cumtime_ms': round(cumtime * 1000, 3),
+        }
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in rows
+    ]
+
+
+def save(profiler, summary):
+    """Store the profile and its summary and return its id."""
+    # Ids sort by creation time, which pruning and listing rely on.
+    profile_id = f'{datetime.now():%Y%m%d%H%M%S%f}-{uuid.uuid4().hex[:8]}'
+    path = directory()
+    profiler.dump_stats(path / f'{profile_id}.prof')
+    summary = {'id': profile_id, **summary, 'top': top_functions(profiler, settings.PROFILE_TOP_N)}
+    (path / f'{profile_id}.json').write_text(json.dumps(summary))
+
+    for old in sorted(path.glob('*.json'), reverse=True)[settings.PROFILE_KEEP:]:
+        old.unlink(missing_ok=True)
+        old.with_suffix('.prof').unlink(missing_ok=True)
+    return profile_id
+
+
+def run(get_response, request):
+    """Return the response and profile id of a profiled request.
+
+    The profile id is None when another request is being profiled.
+    """
+    if not _lock.acquire(blocking=False):
+        return get_response(request), None
+    try:
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries.append({
+                    'sql': sql,
+                    'params': repr(params),
+                    'ms': round((time.perf_counter() - start) * 1000, 3),
+                })
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(record))
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler, e.g. a coverage tool, owns the hooks.
+                return get_response(request), None
+            try:
+                response = get_response(request)
+            finally:
+                profiler.disable()
+        total = time.perf_counter() - start
+
+        profile_id = save(profiler, {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 3),
+            'sql_ms': round(sum(query['ms'] for query in queries), 3),
+            'queries': queries,
+        })
+        return response, profile_id
+    finally:
+        _lock.release()
@@ -0,0 +1,111 @@
+"""
+Routing of read-only requests to database replicas.
+
+Reads go to a replica only inside replica_reads() blocks, which the
+ReplicaReadMixin opens around the read-only actions of a view. Everything
+else, including every write, uses the primary.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+_replica = ContextVar('replica', default=None)
+
+
+def pin_key(scope):
+    return f'core:replica-pin:{scope}'
+
+
+def pin(scope):
+    """Read the scope from the primary for the next REPLICA_PIN_SECONDS.
+
+    Replicas lag behind the primary, so whoever just wrote must not read
+    from them until the write has had time to replicate.
+    """
+    if settings.DATABASE_REPLICAS:
+        cache.set(pin_key(scope), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(*scopes):
+    """Return whether any of the scopes was written recently."""
+    return bool(cache.get_many([pin_key(scope) for scope in scopes]))
+
+
+async def ais_pinned(*scopes):
+    """Async is_pinned() for async views."""
+    return bool(await cache.aget_many([pin_key(scope) for scope in scopes]))
+
+
+def user_scope(user):
+    return f'user:{user.pk}'
+
+
+@contextmanager
+def replica_reads():
+    """Send the reads of the block to one replica, if there are any."""
+    alias = random.choice(settings.DATABASE_REPLICAS) if settings.DATABASE_REPLICAS else None
+    token = _replica.set(alias)
+    try:
+        yield alias
+    finally:
+        _replica.reset(token)
+
+
+class ReplicaRouter:
+    """Database router reading from the replica chosen for the block."""
+
+    def db_for_read(self, model, **hints):
+        return _replica.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaReadMixin:
+    """Serve the replica_actions of a view from a read replica.
+
+    Users keep reading from the primary for REPLICA_PIN_SECONDS after a
+    successful write through the view, so they see their own writes, and
+    so does everyone while one of replica_pin_scopes is pinned. Plain views
+    name their HTTP methods in replica_actions.
+    """
+    replica_actions = ('list', 'retrieve')
+    replica_pin_scopes = ()
+
+    def get_replica_action(self, request):
+        return getattr(self, 'action', None) or request.method.lower()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.get_replica_action(request) not in self.replica_actions:
+            return
+        scopes = list(self.replica_pin_scopes)
+        if request.user.is_authenticated:
+            scopes.append(user_scope(request.user))
+        if not is_pinned(*scopes):
+            self._replica_reads = replica_reads()
+            self._replica_reads.__enter__()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        replica = getattr(self, '_replica_reads', None)
+        if replica is not None:
+            self._replica_reads = None
+            replica.__exit__(None, None, None)
+        elif (
+                request.method not in SAFE_METHODS
+                and self.get_replica_action(request) not in self.replica_actions
+                and response.status_code < 400
+                and request.user.is_authenticated
+        ):
+            pin(user_scope(request.user))
+        return super().finalize_response(request, response, *args, **kwargs)
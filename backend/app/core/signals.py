@@ -0,0 +1,124 @@
+"""
+Signal handlers for core models.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core import metrics, timing
+from core.caching import bump_catalogue_version
+from core.models import (
+    Amenities,
+    Booking,
+    Cottage,
+    CottageOccupancy,
+    DailyCottageStats,
+    SeasonalRate,
+    WeekdayRate,
+)
+
+
+@receiver(pre_delete, sender=Booking)
+def lock_cottage_of_deleted_booking(sender, instance, **kwargs):
+    """Lock the cottage before its booking is deleted, as saves do.
+
+    An occupancy rebuild then either waits for the delete to commit or
+    finishes before its nights are released.
+    """
+    Cottage.objects.lock([instance.cottage_id])
+
+
+@receiver(post_delete, sender=Booking)
+def release_booked_nights(sender, instance, **kwargs):
+    """Clear the nights of a deleted booking from the occupancy bitmap."""
+    CottageOccupancy.objects.mark(
+        instance.cottage_id, instance.check_in, instance.check_out, occupied=False
+    )
+
+
+@receiver(post_delete, sender=Booking)
+def refresh_stats_on_booking_delete(sender, instance, **kwargs):
+    """Drop the nights of a deleted booking from the daily summary."""
+    DailyCottageStats.objects.refresh([(instance.cottage_id, instance.check_in, instance.check_out)])
+
+
+@receiver(pre_delete, sender=Cottage)
+def discard_daily_stats(sender, instance, **kwargs):
+    """Take the nights of a deleted cottage out of the resort totals."""
+    DailyCottageStats.objects.discard([instance.pk])
+
+
+@receiver(post_save, sender=Cottage)
+def reprice_daily_stats(sender, instance, created, update_fields, **kwargs):
+    """Apply a changed nightly price to the revenue of booked nights."""
+    if created or (update_fields is not None and 'price_per_night' not in update_fields):
+        return
+    DailyCottageStats.objects.reprice(instance.pk)
+
+
+@receiver(post_save, sender=SeasonalRate)
+@receiver(post_delete, sender=SeasonalRate)
+@receiver(post_save, sender=WeekdayRate)
+@receiver(post_delete, sender=WeekdayRate)
+def reprice_daily_stats_on_rate_change(sender, instance, **kwargs):
+    """Apply a changed seasonal or weekday rate to the revenue of booked nights."""
+    DailyCottageStats.objects.reprice(instance.cottage_id)
+
+
+@receiver(m2m_changed, sender=Cottage.amenities.through)
+def refresh_capacity_on_amenities_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Recompute total capacity and amenity ids of cottages whose amenities changed."""
+    if reverse:
+        if action == 'pre_clear':
+            instance._cleared_cottage_ids = list(instance.cottage_set.values_list('id', flat=True))
+        elif action == 'post_clear':
+            Cottage.objects.filter(id__in=instance._cleared_cottage_ids).refresh_amenities()
+        elif action in ('post_add', 'post_remove'):
+            Cottage.objects.filter(id__in=pk_set).refresh_amenities()
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        Cottage.objects.filter(pk=instance.pk).refresh_amenities()
+        instance.refresh_from_db(fields=['total_capacity', 'amenity_ids'])
+
+
+@receiver(post_save, sender=Amenities)
+def refresh_capacity_on_amenity_save(sender, instance, created, update_fields, **kwargs):
+    """Recompute total capacity of cottages offering a changed amenity."""
+    if created or (update_fields is not None and 'additional_capacity' not in update_fields):
+        return
+    Cottage.objects.filter(amenities=instance).refresh_total_capacity()
+
+
+@receiver(pre_delete, sender=Amenities)
+def remember_amenity_cottages(sender, instance, **kwargs):
+    """Remember the cottages of an amenity before its links are deleted."""
+    instance._cottage_ids = list(instance.cottage_set.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Amenities)
+def refresh_capacity_on_amenity_delete(sender, instance, **kwargs):
+    """Recompute total capacity and amenity ids of cottages that offered a deleted amenity."""
+    Cottage.objects.filter(id__in=instance._cottage_ids).refresh_amenities()
+
+
+@receiver(post_save, sender=Cottage)
+@receiver(post_delete, sender=Cottage)
+@receiver(post_save, sender=Amenities)
+@receiver(post_delete, sender=Amenities)
+@receiver(m2m_changed, sender=Cottage.amenities.through)
+def invalidate_catalogue(sender, **kwargs):
+    """Invalidate cached cottage and amenity reads after any write."""
+    transaction.on_commit(bump_catalogue_version)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    """Count new database connections and time their queries.
+
+    Request timing is installed whatever REQUEST_TIMING says, as it only
+    records while a request is being timed.
+    """
+    if settings.METRICS_ENABLED:
+        metrics.instrument_connection(connection)
+    timing.instrument_connection(connection)
@@ -1,13 +1,21 @@
 """
 Test custom Django management commands.
 """
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from core.models import Amenities, Booking, Cottage, CottageOccupancy, DailyCottageStats
 
 
 @patch("core.management.commands.wait_for_db.Command.check")
@@ -32,3 +40,77 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=["default"])
+
+
+class OccupancyCommandTests(TestCase):
+    """Test occupancy commands."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.cottage = Cottage.objects.create(
+            name='Cottage',
+            base_capacity=2,
+            price_per_night=Decimal('100.00'),
+            user=user
+        )
+        check_in = timezone.now().date() + timedelta(days=5)
+        Booking.objects.create(
+            cottage=self.cottage,
+            user=user,
+            check_in=check_in,
+            check_out=check_in + timedelta(days=2),
+            customer_name='Guest',
+            customer_email='guest@example.com',
+        )
+
+    def test_rebuild_occupancy(self):
+        """Test rebuilding recreates the bitmaps."""
+        CottageOccupancy.objects.all().delete()
+        out = StringIO()
+
+        call_command('rebuild_occupancy', stdout=out)
+
+        self.assertIn('1 cottages', out.getvalue())
+        self.assertTrue(CottageOccupancy.objects.filter(cottage=self.cottage).exists())
+
+    def test_check_occupancy_reports_mismatch(self):
+        """Test the checker fails for bitmaps that disagree with bookings."""
+        call_command('check_occupancy', stdout=StringIO())
+
+        CottageOccupancy.objects.update(bitmap=bytes(92))
+
+        with self.assertRaises(CommandError):
+            call_command('check_occupancy', stdout=StringIO())
+
+    def test_rebuild_stats(self):
+        """Test rebuilding recreates the daily summary."""
+        DailyCottageStats.objects.all().delete()
+        out = StringIO()
+
+        call_command('rebuild_stats', stdout=out)
+
+        self.assertIn('2 booked nights', out.getvalue())
+        self.assertEqual(DailyCottageStats.objects.filter(cottage=self.cottage).count(), 2)
+
+
+class RecomputeCapacityCommandTests(TestCase):
+    """Test the recompute capacity command."""
+
+    def test_recompute_capacity(self):
+        """Test stale capacities are recomputed."""
+        user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        cottage = Cottage.objects.create(
+            name='Cottage',
+            base_capacity=2,
+            price_per_night=Decimal('100.00'),
+            user=user
+        )
+        cottage.amenities.add(Amenities.objects.create(name='Bed', additional_capacity=2, user=user))
+        Cottage.objects.update(total_capacity=0)
+        out = StringIO()
+
+        call_command('recompute_capacity', stdout=out)
+
+        cottage.refresh_from_db()
+        self.assertEqual(cottage.total_capacity, 4)
+        self.assertIn('1 cottages', out.getvalue())
@@ -0,0 +1,201 @@
+"""
+Tests that the hot booking queries are served by indexes.
+"""
+import os
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase
+
+from core.models import Booking, Cottage
+from resort.search import search
+
+SEED_COTTAGES = 1000
+SEED_BOOKINGS_PER_COTTAGE = int(os.getenv('INDEX_TEST_BOOKINGS_PER_COTTAGE', 1000))
+
+
+class BookingIndexTests(TestCase):
+    """Test EXPLAIN plans of booking queries on a seeded table."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        Cottage.objects.bulk_create(
+            Cottage(name=f'Cottage {i}', base_capacity=2, price_per_night=Decimal('100.00'), user=user)
+            for i in range(SEED_COTTAGES)
+        )
+        # The btree indexes are rebuilt once after the load, which is much
+        # faster than maintaining them row by row. The GiST exclusion
+        # constraints are left out for the class: building them over a
+        # million rows takes minutes and they cannot serve these predicates.
+        # Both changes are rolled back with the test transaction.
+        with connection.schema_editor() as editor:
+            for item in Booking._meta.indexes:
+                editor.remove_index(Booking, item)
+            for item in Booking._meta.constraints:
+                editor.remove_constraint(Booking, item)
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            cursor.execute(
+                f"""
+                INSERT INTO {Booking._meta.db_table}
+                    (cottage_id, user_id, check_in, check_out,
+                     customer_name, customer_email, is_confirmed)
+                SELECT cottage.id, cottage.user_id,
+                       DATE '2020-01-01' + night * 3,
+                       DATE '2020-01-01' + night * 3 + 2,
+                       'Guest', 'guest' || cottage.id || '@example.com', false
+                FROM {Cottage._meta.db_table} cottage
+                CROSS JOIN generate_series(0, %s - 1) AS night
+                """,
+                [SEED_BOOKINGS_PER_COTTAGE],
+            )
+        with connection.schema_editor() as editor:
+            for item in Booking._meta.indexes:
+                editor.add_index(Booking, item)
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL DEFERRED')
+            cursor.execute(f'ANALYZE {Booking._meta.db_table}')
+        cls.cottage = Cottage.objects.order_by('id')[SEED_COTTAGES // 2]
+        cls.check_in = date(2024, 6, 1)
+        cls.check_out = date(2024, 6, 8)
+
+    def assertUsesIndex(self, queryset, index_name):
+        """Assert the plan of the queryset scans the named index."""
+        plan = queryset.explain()
+        self.assertNotIn('Seq Scan', plan)
+        self.assertIn(index_name, plan)
+
+    def test_seeded_rows(self):
+        """Test the table holds the seeded bookings."""
+        self.assertEqual(
+            Booking.objects.count(), SEED_COTTAGES * SEED_BOOKINGS_PER_COTTAGE
+        )
+
+    def test_cottage_overlap_uses_index(self):
+        """Test the cottage overlap lookup uses the cottage dates index."""
+        queryset = Booking.objects.filter(
+            cottage=self.cottage,
+            check_in__lt=self.check_out,
+            check_out__gt=self.check_in,
+        ).values('id')
+
+        self.assertUsesIndex(queryset, 'booking_cottage_dates_idx')
+
+    def test_customer_overlap_uses_index(self):
+        """Test the customer overlap lookup uses the customer dates index."""
+        queryset = Booking.objects.filter(
+            customer_email=f'guest{self.cottage.id}@example.com',
+            check_in__lt=self.check_out,
+            check_out__gt=self.check_in,
+        ).values('id')
+
+        self.assertUsesIndex(queryset, 'booking_customer_dates_idx')
+
+    def test_list_ordering_uses_index(self):
+        """Test the first page of the booking list reads the ordering index."""
+        queryset = Booking.objects.order_by('-check_in', '-id')[:51]
+
+        self.assertUsesIndex(queryset, 'booking_check_in_id_idx')
+
+    def test_keyset_page_uses_index(self):
+        """Test a deep keyset page starts the index scan at its position."""
+        position = Booking.objects.filter(
+            check_in__lte=self.check_in
+        ).order_by('-check_in', '-id')[SEED_COTTAGES // 2]
+        queryset = Booking.objects.filter(
+            Q(check_in__lte=position.check_in),
+            Q(check_in__lt=position.check_in) | Q(check_in=position.check_in, id__lt=position.id),
+        ).order_by('-check_in', '-id')[:51]
+
+        plan = queryset.explain()
+        self.assertIn('booking_check_in_id_idx', plan)
+        self.assertIn('Index Cond', plan)
+
+
+class CottageIndexTests(TestCase):
+    """Test EXPLAIN plans of cottage list filters on a seeded table."""
+    SEED = 20000
+
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        # As for bookings, the indexes are built once after the load; GIN
+        # inserts would otherwise sit in its pending list, which the
+        # planner costs as a full scan.
+        with connection.schema_editor() as editor:
+            for item in Cottage._meta.indexes:
+                editor.remove_index(Cottage, item)
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            cursor.execute(
+                f"""
+                INSERT INTO {Cottage._meta.db_table}
+                    (name, category, base_capacity, total_capacity,
+                     price_per_night, user_id, amenity_ids)
+                SELECT 'Cottage ' || i,
+                       CASE WHEN i %% 100 = 0 THEN 'luxury' ELSE 'standard' END,
+                       2, 1 + i %% 8, 50 + i %% 500, %s,
+                       ARRAY[i %% 50, 50 + i %% 7]
+                FROM generate_series(1, %s) AS i
+                """,
+                [user.id, cls.SEED],
+            )
+        with connection.schema_editor() as editor:
+            for item in Cottage._meta.indexes:
+                editor.add_index(Cottage, item)
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL DEFERRED')
+            cursor.execute(f'ANALYZE {Cottage._meta.db_table}')
+
+    def test_amenities_filter_uses_gin_index(self):
+        """Test "has all these amenities" is answered by the GIN index."""
+        queryset = Cottage.objects.with_amenities([3, 52]).order_by('-name', '-id')[:51]
+
+        plan = queryset.explain()
+        self.assertNotIn('Seq Scan', plan)
+        self.assertIn('cottage_amenity_ids_gin', plan)
+        self.assertEqual(Cottage.objects.with_amenities([3, 52]).count(), self.SEED // 350)
+
+    def test_category_filter_uses_index(self):
+        """Test the category filter reads the category index in list order."""
+        queryset = Cottage.objects.filter(category='luxury').order_by('-name', '-id')[:51]
+
+        plan = queryset.explain()
+        self.assertNotIn('Seq Scan', plan)
+        self.assertIn('cottage_category_name_idx', plan)
+
+    def test_capacity_price_search_uses_index(self):
+        """Test party size and price bounds within a category use one index."""
+        queryset = Cottage.objects.filter(
+            category='standard', total_capacity__gte=8, price_per_night__lte=60
+        ).order_by('-name', '-id')[:51]
+
+        plan = queryset.explain()
+        self.assertNotIn('Seq Scan', plan)
+        self.assertIn('cottage_category_capacity_idx', plan)
+
+    def test_price_keyset_page_uses_index(self):
+        """Test a deep price-sorted page starts at its position in the index."""
+        queryset = Cottage.objects.filter(
+            Q(price_per_night__gt=400) | Q(price_per_night=400, id__gt=12345)
+        ).order_by('price_per_night', 'id')[:51]
+
+        plan = queryset.explain()
+        self.assertNotIn('Seq Scan', plan)
+        self.assertNotIn('Sort', plan)
+        self.assertIn('cottage_price_id_idx', plan)
+
+    def test_name_search_uses_gin_index(self):
+        """Test typeahead search is answered by the search vector index."""
+        queryset = search(Cottage.objects.all(), '1234', 10)
+
+        plan = queryset.explain()
+        self.assertNotIn('Seq Scan', plan)
+        self.assertIn('cottage_search_gin', plan)
+        # Cottage 1234 and Cottage 12340 to 12349.
+        self.assertEqual(len(queryset), 10)
+        self.assertEqual(queryset[0].name, 'Cottage 1234')
@@ -0,0 +1,282 @@
+"""
+Tests for the background job queue.
+"""
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import jobs
+from core.jobs import enqueue, enqueue_many, retry_delay, run_next
+from core.models import Amenities, Booking, Cottage, Job
+
+calls = []
+
+
+def record(**payload):
+    calls.append(payload)
+
+
+def fail(**payload):
+    Amenities.objects.create(user=get_user_model().objects.get(), name='Rolled back')
+    raise RuntimeError('mail server down')
+
+
+@patch.dict(jobs.JOBS, {'record': record, 'fail': fail})
+@patch.dict(jobs.RECURRING, clear=True)
+@override_settings(JOB_MAX_ATTEMPTS=3, JOB_RETRY_BACKOFF_SECONDS=10, JOB_RETRY_MAX_SECONDS=25)
+class JobQueueTests(TestCase):
+    """Test queueing and running jobs."""
+
+    def setUp(self):
+        calls.clear()
+        get_user_model().objects.create_user('user@example.com', 'testpass123')
+
+    def test_run_due_job(self):
+        """Test a due job runs with its payload and is marked done."""
+        job = enqueue('record', booking_id=1)
+
+        self.assertEqual(run_next().pk, job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(calls, [{'booking_id': 1}])
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 1))
+        self.assertLessEqual(job.started_at, job.finished_at)
+        self.assertIsNone(run_next())
+
+    @patch.dict(jobs.RECURRING, {'record': 60})
+    def test_recurring_job_queued_once(self):
+        """Test the worker start queues a recurring job only when none is queued."""
+        self.assertEqual(len(jobs.queue_recurring()), 1)
+        self.assertEqual(jobs.queue_recurring(), [])
+
+    @patch.dict(jobs.RECURRING, {'record': 60})
+    def test_recurring_job_queues_next_run(self):
+        """Test a recurring run queues the next one and duplicate runs collapse."""
+        jobs.queue_recurring()
+        enqueue('record')
+
+        run_next()
+        run_next()
+
+        queued = Job.objects.filter(status=Job.QUEUED)
+        self.assertEqual(len(queued), 1)
+        self.assertGreater(queued[0].run_at, timezone.now() + timedelta(seconds=50))
+        self.assertIsNone(run_next())
+
+    @patch.dict(jobs.RECURRING, {'fail': 60})
+    def test_failed_recurring_job_queues_next_run(self):
+        """Test a recurring job keeps its schedule after failing for good."""
+        job = enqueue('fail')
+        Job.objects.filter(pk=job.pk).update(attempts=2)
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            run_next()
+
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.FAILED)
+        self.assertTrue(Job.objects.filter(name='fail', status=Job.QUEUED).exists())
+
+    def test_unknown_job(self):
+        """Test jobs can only be queued for registered names."""
+        with self.assertRaises(KeyError):
+            enqueue('missing')
+
+    def test_jobs_run_in_order(self):
+        """Test due jobs run oldest first and scheduled ones wait."""
+        enqueue_many('record', [{'n': 1}, {'n': 2}])
+        Job.objects.create(name='record', payload={'n': 0}, run_at=timezone.now() + timedelta(hours=1))
+
+        while run_next() is not None:
+            pass
+
+        self.assertEqual(calls, [{'n': 1}, {'n': 2}])
+
+    def test_failed_job_retried_with_backoff(self):
+        """Test a failing job is rolled back and queued again later."""
+        job = enqueue('fail')
+
+        before = timezone.now()
+        with self.assertLogs('core.jobs', 'ERROR'):
+            run_next()
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertEqual(job.last_error, 'RuntimeError: mail server down')
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=10))
+        self.assertFalse(Amenities.objects.exists())
+        self.assertIsNone(run_next())
+
+    def test_job_fails_after_max_attempts(self):
+        """Test a job is given up after JOB_MAX_ATTEMPTS attempts."""
+        job = enqueue('fail')
+
+        with self.assertLogs('core.jobs', 'ERROR') as logs:
+            for _ in range(3):
+                Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+                run_next()
+
+        self.assertEqual(len(logs.records), 3)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 3))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_retry_delay(self):
+        """Test retry delays double up to JOB_RETRY_MAX_SECONDS."""
+        self.assertEqual(
+            [retry_delay(attempts).seconds for attempts in (1, 2, 3)],
+            [10, 20, 25],
+        )
+
+    @override_settings(JOB_KEEP_SECONDS=60)
+    def test_prune(self):
+        """Test only jobs finished before JOB_KEEP_SECONDS are deleted."""
+        now = timezone.now()
+        old = Job.objects.create(name='record', status=Job.DONE, finished_at=now - timedelta(minutes=5))
+        recent = Job.objects.create(name='record', status=Job.DONE, finished_at=now)
+        queued = enqueue('record')
+
+        self.assertEqual(Job.objects.prune(), 1)
+        self.assertFalse(Job.objects.filter(pk=old.pk).exists())
+        self.assertEqual(Job.objects.filter(pk__in=[recent.pk, queued.pk]).count(), 2)
+
+    def test_stats(self):
+        """Test counts and timings are reported per job name."""
+        now = timezone.now()
+        for ms, status in ((100, Job.DONE), (300, Job.DONE), (500, Job.FAILED)):
+            Job.objects.create(
+                name='record',
+                status=status,
+                created_at=now - timedelta(milliseconds=ms),
+                started_at=now - timedelta(milliseconds=ms / 2),
+                finished_at=now,
+            )
+        enqueue('record')
+        enqueue('fail')
+
+        stats = Job.objects.stats(now - timedelta(minutes=1))
+
+        self.assertEqual(stats['record']['done'], 2)
+        self.assertEqual(stats['record']['failed'], 1)
+        self.assertEqual(stats['record']['queued'], 1)
+        self.assertAlmostEqual(stats['record']['latency_avg_ms'], 300)
+        self.assertAlmostEqual(stats['record']['run_avg_ms'], 150)
+        self.assertAlmostEqual(stats['record']['latency_p95_ms'], 480)
+        self.assertEqual(stats['fail'], {'done': 0, 'failed': 0, 'queued': 1})
+
+    def test_worker_survives_queue_errors(self):
+        """Test a database error is logged and retried instead of ending the worker."""
+        enqueue('record', n=1)
+        errors = [OperationalError('server closed the connection')]
+
+        def flaky_run_next():
+            if errors:
+                raise errors.pop()
+            return run_next()
+
+        with patch('core.jobs.run_next', flaky_run_next), \
+                patch('core.jobs.close_old_connections') as close, \
+                self.assertLogs('core.jobs', 'ERROR'):
+            count = jobs.work(threading.Event(), poll_seconds=0, burst=True)
+
+        self.assertEqual(count, 1)
+        close.assert_called_once_with()
+        self.assertEqual(calls, [{'n': 1}])
+
+    def test_only_pruning_thread_prunes(self):
+        """Test only the worker given a prune interval prunes when idle."""
+        stop = threading.Event()
+        with patch.object(Job.objects, 'prune') as prune:
+            jobs.work(stop, poll_seconds=0, burst=True)
+            self.assertFalse(prune.called)
+
+            jobs.work(stop, poll_seconds=0, burst=True, prune_seconds=300)
+            self.assertEqual(prune.call_count, 1)
+
+    def test_job_stats_command(self):
+        """Test job stats prints one line per job name."""
+        enqueue('record')
+        run_next()
+        out = StringIO()
+
+        call_command('job_stats', minutes=5, stdout=out)
+
+        self.assertIn('job=record done=1 failed=0 queued=0 per_s=0.003 latency_avg_ms=', out.getvalue())
+
+
+class JobWorkerTests(TransactionTestCase):
+    """Test workers running jobs in parallel."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.cottage = Cottage.objects.create(
+            name='Lake', base_capacity=2, price_per_night=Decimal('100.00'), user=self.user
+        )
+
+    def test_claim_skips_locked_jobs(self):
+        """Test a job locked by one worker is skipped by the others."""
+        first, second = enqueue_many('confirm_booking', [{'booking_id': 1}, {'booking_id': 2}])
+        claimed = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            try:
+                with transaction.atomic():
+                    self.assertEqual(Job.objects.claim().pk, first.pk)
+                    claimed.set()
+                    release.wait(5)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        claimed.wait(5)
+        try:
+            with transaction.atomic():
+                self.assertEqual(Job.objects.claim().pk, second.pk)
+        finally:
+            release.set()
+            thread.join()
+
+    def test_worker_command(self):
+        """Test concurrent workers confirm every booking exactly once."""
+        bookings = [
+            Booking.objects.create(
+                cottage=self.cottage,
+                user=self.user,
+                check_in=timezone.now().date() + timedelta(days=day),
+                check_out=timezone.now().date() + timedelta(days=day + 1),
+                customer_name='Guest',
+                customer_email=f'guest{day}@example.com',
+            )
+            for day in range(20)
+        ]
+        enqueue_many('confirm_booking', [{'booking_id': booking.pk} for booking in bookings])
+        out = StringIO()
+
+        call_command('worker', concurrency=4, burst=True, stdout=out)
+
+        # 20 confirmations, 20 emails and the recurring roll_occupancy job.
+        self.assertIn('Ran 41 jobs', out.getvalue())
+        self.assertFalse(Booking.objects.filter(is_confirmed=False).exists())
+        self.assertEqual(len(mail.outbox), 20)
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 41)
+        self.assertEqual(
+            list(Job.objects.filter(status=Job.QUEUED).values_list('name', flat=True)),
+            ['roll_occupancy'],
+        )
+
+    def test_worker_exits_with_error_when_thread_dies(self):
+        """Test the command fails, so that it is restarted, when a worker thread dies."""
+        with patch('core.management.commands.worker.work', side_effect=RuntimeError('boom')), \
+                self.assertLogs('core', 'ERROR'):
+            with self.assertRaises(CommandError):
+                call_command('worker', concurrency=2, burst=True, stdout=StringIO())
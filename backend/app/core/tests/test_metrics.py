@@ -0,0 +1,168 @@
+"""
+Tests for the in-process metrics registry.
+"""
+import threading
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from core.models import Cottage
+from resort.views import CheckAvailabilityView
+
+
+class RegistryTests(SimpleTestCase):
+    """Test metric types and the text format."""
+
+    def test_counter_format(self):
+        """Test counters are exposed per label set with escaped values."""
+        counter = metrics.Counter('jobs_total', 'Jobs run.', ('name',))
+        counter.inc('a "quoted" name')
+        counter.inc('plain', amount=2)
+
+        lines = counter.expose()
+
+        self.assertEqual(lines, [
+            '# HELP jobs_total Jobs run.',
+            '# TYPE jobs_total counter',
+            'jobs_total{name="a \\"quoted\\" name"} 1',
+            'jobs_total{name="plain"} 2',
+        ])
+
+    def test_histogram_format(self):
+        """Test histograms expose cumulative buckets, sum and count."""
+        histogram = metrics.Histogram('latency_seconds', 'Latency.', ('view',), buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value, 'list')
+
+        lines = histogram.expose()[2:]
+
+        self.assertEqual(lines, [
+            'latency_seconds_bucket{view="list",le="0.1"} 2',
+            'latency_seconds_bucket{view="list",le="1.0"} 3',
+            'latency_seconds_bucket{view="list",le="+Inf"} 4',
+            'latency_seconds_sum{view="list"} 3.65',
+            'latency_seconds_count{view="list"} 4',
+        ])
+
+    def test_wrong_labels(self):
+        """Test observations with the wrong number of labels are rejected."""
+        counter = metrics.Counter('jobs_total', 'Jobs run.', ('name',))
+
+        with self.assertRaises(ValueError):
+            counter.inc()
+
+    def test_thread_safe(self):
+        """Test concurrent updates are all counted."""
+        counter = metrics.Counter('hits_total', 'Hits.')
+        histogram = metrics.Histogram('hit_seconds', 'Hit time.')
+
+        def hit():
+            for _ in range(5000):
+                counter.inc()
+                histogram.observe(0.01)
+
+        threads = [threading.Thread(target=hit) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(counter.value(), 40000)
+        self.assertEqual(histogram.count(), 40000)
+
+
+@override_settings(METRICS_ENABLED=1)
+class MetricsMiddlewareTests(TestCase):
+    """Test requests are measured per view and action."""
+
+    def setUp(self):
+        self.client = Client(raise_request_exception=False)
+        user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.cottage = Cottage.objects.create(
+            name='Cottage', base_capacity=2, price_per_night=Decimal('100.00'), user=user
+        )
+
+    def check_availability(self):
+        return self.client.post(
+            reverse('resort:check-availability'),
+            {'cottage': self.cottage.id, 'check_in': date(2024, 1, 1), 'check_out': date(2024, 1, 3)},
+            content_type='application/json',
+        )
+
+    def test_viewset_action_label(self):
+        """Test viewset requests are labelled by class and action."""
+        before = metrics.REQUESTS.value('BookingViewSet.list', 'GET', '200')
+        latency = metrics.REQUEST_LATENCY.count('BookingViewSet.list')
+
+        self.client.get(reverse('resort:booking-list'))
+
+        self.assertEqual(metrics.REQUESTS.value('BookingViewSet.list', 'GET', '200'), before + 1)
+        self.assertEqual(metrics.REQUEST_LATENCY.count('BookingViewSet.list'), latency + 1)
+
+    async def test_async_request(self):
+        """Test ASGI requests are counted by the same labels."""
+        before = metrics.REQUESTS.value('BookingViewSet.list', 'GET', '200')
+
+        await AsyncClient().get(reverse('resort:booking-list'))
+
+        self.assertEqual(metrics.REQUESTS.value('BookingViewSet.list', 'GET', '200'), before + 1)
+
+    def test_unmatched_label(self):
+        """Test requests no URL matches are labelled unmatched."""
+        before = metrics.REQUESTS.value('unmatched', 'GET', '404')
+
+        self.client.get('/missing/')
+
+        self.assertEqual(metrics.REQUESTS.value('unmatched', 'GET', '404'), before + 1)
+
+    def test_api_view_label(self):
+        """Test API views are labelled by class and method."""
+        before = metrics.REQUESTS.value('CheckAvailabilityView.post', 'POST', '200')
+
+        self.check_availability()
+
+        self.assertEqual(metrics.REQUESTS.value('CheckAvailabilityView.post', 'POST', '200'), before + 1)
+
+    def test_server_errors_counted(self):
+        """Test unhandled exceptions count as errors."""
+        before = metrics.REQUEST_ERRORS.value('CheckAvailabilityView.post', '500')
+
+        with patch.object(CheckAvailabilityView, 'post', side_effect=RuntimeError), \
+                self.assertLogs('django.request', 'ERROR'):
+            res = self.check_availability()
+
+        self.assertEqual(res.status_code, 500)
+        self.assertEqual(metrics.REQUEST_ERRORS.value('CheckAvailabilityView.post', '500'), before + 1)
+
+    def test_queries_timed(self):
+        """Test database queries are timed per connection alias."""
+        before = metrics.DB_QUERIES.count('default')
+
+        self.client.get(reverse('resort:booking-list'))
+
+        self.assertGreater(metrics.DB_QUERIES.count('default'), before)
+
+    def test_metrics_endpoint(self):
+        """Test the registry is served in the Prometheus text format."""
+        self.client.get(reverse('resort:booking-list'))
+
+        res = self.client.get(reverse('metrics'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = res.content.decode()
+        self.assertIn('# TYPE http_requests_total counter', body)
+        self.assertIn('http_requests_total{view="BookingViewSet.list",method="GET",status="200"}', body)
+        self.assertIn('# TYPE db_query_duration_seconds histogram', body)
+
+    @override_settings(METRICS_ENABLED=0)
+    def test_disabled(self):
+        """Test the endpoint is hidden when metrics are disabled."""
+        res = self.client.get(reverse('metrics'))
+
+        self.assertEqual(res.status_code, 404)
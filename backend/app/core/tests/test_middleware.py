@@ -0,0 +1,107 @@
+"""
+Tests for core middleware.
+"""
+import asyncio
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.middleware import MetricsMiddleware, ProfilingMiddleware, RequestTimingMiddleware
+from core.models import Amenities, Cottage
+from resort.views import CottageViewSet
+
+COTTAGES_URL = reverse('resort:cottage-list')
+
+
+@override_settings(REQUEST_TIMING=1, REQUEST_TIMING_REPEATED_QUERIES=3)
+class RequestTimingMiddlewareTests(TestCase):
+    """Test per-request timing reports."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        for i in range(4):
+            cottage = Cottage.objects.create(
+                name=f'Cottage {i}', base_capacity=2, price_per_night=Decimal('100.00'), user=user
+            )
+            cottage.amenities.add(Amenities.objects.create(name=f'Amenity {i}', user=user))
+
+    def metrics(self, response):
+        """Return the Server-Timing metrics by name."""
+        return {
+            metric.split(';')[0]: metric
+            for metric in response['Server-Timing'].split(', ')
+        }
+
+    def test_server_timing_header(self):
+        """Test SQL, serialization, render and total time are reported."""
+        with self.assertLogs('core.middleware', 'INFO') as logs:
+            res = self.client.get(COTTAGES_URL)
+
+        metrics = self.metrics(res)
+        self.assertEqual(set(metrics), {'db', 'serialize', 'render', 'total'})
+        self.assertIn('desc="2 queries"', metrics['db'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], COTTAGES_URL)
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['queries'], 2)
+        self.assertGreater(record['render_ms'], 0)
+        self.assertNotIn('repeated_queries', record)
+
+    def test_repeated_queries_flagged(self):
+        """Test an N+1 pattern is flagged in the header and a warning."""
+        def without_prefetch(view):
+            return Cottage.objects.order_by(*view.ordering)
+
+        with patch.object(CottageViewSet, 'get_queryset', without_prefetch), \
+                self.assertLogs('core.middleware', 'WARNING') as logs:
+            res = self.client.get(COTTAGES_URL)
+
+        self.assertIn('n-plus-one;desc="4 identical queries"', res['Server-Timing'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['repeated_queries'][0]['count'], 4)
+        self.assertIn('core_amenities', record['repeated_queries'][0]['sql'])
+
+    @override_settings(REQUEST_TIMING=0)
+    def test_disabled(self):
+        """Test nothing is reported when timing is disabled."""
+        res = self.client.get(COTTAGES_URL)
+
+        self.assertNotIn('Server-Timing', res)
+
+    async def test_async_request(self):
+        """Test ASGI requests are timed, with queries run in worker threads."""
+        with self.assertLogs('core.middleware', 'INFO'):
+            res = await AsyncClient().get(COTTAGES_URL)
+
+        metrics = self.metrics(res)
+        self.assertIn('desc="2 queries"', metrics['db'])
+        self.assertIn('render', metrics)
+
+
+class SyncAndAsyncMiddlewareTests(SimpleTestCase):
+    """Test the core middleware runs in the mode of the handler."""
+
+    def test_sync(self):
+        """Test WSGI handlers get a sync middleware."""
+        for middleware in (RequestTimingMiddleware, MetricsMiddleware, ProfilingMiddleware):
+            with self.subTest(middleware=middleware.__name__):
+                self.assertFalse(asyncio.iscoroutinefunction(middleware(lambda request: HttpResponse())))
+
+    def test_async(self):
+        """Test ASGI handlers get an async middleware instead of an adapted sync one."""
+        async def get_response(request):
+            return HttpResponse()
+
+        for middleware in (RequestTimingMiddleware, MetricsMiddleware, ProfilingMiddleware):
+            with self.subTest(middleware=middleware.__name__):
+                self.assertTrue(middleware.async_capable)
+                self.assertTrue(asyncio.iscoroutinefunction(middleware(get_response)))
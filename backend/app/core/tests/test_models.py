@@ -8,6 +8,8 @@ from unittest.mock import patch
 
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
 
 from core import models
 from django.utils import timezone
@@ -112,3 +114,308 @@ class ModelTests(TestCase):
         self.assertEqual(booking.check_out, check_out)
         self.assertEqual(booking.customer_name, "username")
         self.assertEqual(booking.cottage, cottage)
+
+
+class BookingConstraintTests(TestCase):
+    """Test overlapping bookings are rejected by the database."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.cottage = models.Cottage.objects.create(
+            name='Sample cottage name',
+            base_capacity=5,
+            price_per_night=Decimal('500.50'),
+            user=self.user
+        )
+        self.check_in = timezone.now().date() + timedelta(days=1)
+        self.booking = models.Booking.objects.create(
+            cottage=self.cottage,
+            check_in=self.check_in,
+            check_out=self.check_in + timedelta(days=3),
+            customer_name='username',
+            customer_email='example@example.com',
+            user=self.user
+        )
+
+    def new_booking(self, **params):
+        """Return an unsaved booking overlapping the existing one."""
+        defaults = {
+            'cottage': self.cottage,
+            'check_in': self.check_in + timedelta(days=1),
+            'check_out': self.check_in + timedelta(days=2),
+            'customer_name': 'other',
+            'customer_email': 'other@example.com',
+            'user': self.user,
+        }
+        defaults.update(params)
+        return models.Booking(**defaults)
+
+    def test_overlapping_cottage_booking_rejected(self):
+        """Test overlapping bookings of a cottage raise the cottage message."""
+        with self.assertRaisesMessage(ValidationError, 'This cottage is already booked'):
+            self.new_booking().save()
+
+    def test_overlapping_customer_booking_rejected(self):
+        """Test overlapping bookings of a customer raise the customer message."""
+        other_cottage = models.Cottage.objects.create(
+            name='Other cottage',
+            base_capacity=5,
+            price_per_night=Decimal('500.50'),
+            user=self.user
+        )
+
+        with self.assertRaisesMessage(ValidationError, 'This customer already has a booking'):
+            self.new_booking(cottage=other_cottage, customer_email='example@example.com').save()
+
+    def test_back_to_back_bookings_allowed(self):
+        """Test a booking may start on the day another one ends."""
+        booking = self.new_booking(
+            check_in=self.booking.check_out,
+            check_out=self.booking.check_out + timedelta(days=2),
+        )
+        booking.save()
+
+        self.assertIsNotNone(booking.id)
+
+    def test_constraint_enforced_without_save(self):
+        """Test the constraint holds for writes that bypass Booking.save()."""
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                models.Booking.objects.bulk_create([self.new_booking()])
+
+    def test_update_keeps_own_nights(self):
+        """Test a booking does not conflict with itself when updated."""
+        self.booking.customer_name = 'renamed'
+        self.booking.save()
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.customer_name, 'renamed')
+
+
+class NearestFreeWindowsTests(TestCase):
+    """Test finding free stays around unavailable dates."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.cottage = models.Cottage.objects.create(
+            name='Sample cottage name',
+            base_capacity=5,
+            price_per_night=Decimal('500.50'),
+            user=self.user
+        )
+        self.day = timezone.now().date()
+
+    def book(self, start, end):
+        """Book the cottage from day start to day end."""
+        models.Booking.objects.create(
+            cottage=self.cottage,
+            check_in=self.day + timedelta(days=start),
+            check_out=self.day + timedelta(days=end),
+            customer_name='guest',
+            customer_email=f'guest{start}@example.com',
+            user=self.user
+        )
+
+    def windows(self, check_in, check_out, earliest=0, latest=60):
+        """Return the nearest free check-in days around the stay."""
+        before, after = models.Booking.objects.nearest_free_windows(
+            self.cottage.id,
+            self.day + timedelta(days=check_in),
+            self.day + timedelta(days=check_out),
+            self.day + timedelta(days=earliest),
+            self.day + timedelta(days=latest),
+        )
+        return tuple(None if start is None else (start - self.day).days for start in (before, after))
+
+    def test_nearest_gaps_that_fit(self):
+        """Test the closest gaps long enough for the stay are returned."""
+        self.book(5, 10)
+        self.book(11, 14)
+        self.book(16, 20)
+        self.book(22, 25)
+
+        # The one-night gap at 10 and the two-night gap at 14 are too short.
+        self.assertEqual(self.windows(12, 15), (2, 25))
+
+    def test_same_gap_both_sides(self):
+        """Test windows either side of a booking inside one stretch."""
+        self.book(10, 12)
+
+        self.assertEqual(self.windows(10, 13), (7, 12))
+
+    def test_back_to_back_bookings(self):
+        """Test back to back bookings leave no gap between them."""
+        self.book(5, 10)
+        self.book(10, 20)
+
+        self.assertEqual(self.windows(9, 11), (3, 20))
+
+    def test_no_window_in_range(self):
+        """Test None is returned when no stay fits inside the range."""
+        self.book(0, 10)
+        self.book(12, 30)
+
+        self.assertEqual(self.windows(8, 11, latest=31), (None, None))
+
+    def test_single_query(self):
+        """Test the bookings are read with one query."""
+        for start in range(0, 50, 5):
+            self.book(start, start + 4)
+
+        with self.assertNumQueries(1):
+            self.windows(20, 26)
+
+
+class CottageCapacityTests(TestCase):
+    """Test total capacity follows amenity changes."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.cottage = models.Cottage.objects.create(
+            name='Sample cottage name',
+            base_capacity=2,
+            price_per_night=Decimal('500.50'),
+            user=self.user
+        )
+        self.bed = models.Amenities.objects.create(name='Bed', additional_capacity=2, user=self.user)
+        self.sofa = models.Amenities.objects.create(name='Sofa', additional_capacity=1, user=self.user)
+
+    def assertCapacity(self, expected):
+        self.cottage.refresh_from_db()
+        self.assertEqual(self.cottage.total_capacity, expected)
+
+    def test_new_cottage_capacity(self):
+        """Test a new cottage starts at its base capacity."""
+        self.assertEqual(self.cottage.total_capacity, 2)
+
+    def test_add_and_remove_amenities(self):
+        """Test adding and removing amenities updates capacity."""
+        self.cottage.amenities.add(self.bed, self.sofa)
+        self.assertEqual(self.cottage.total_capacity, 5)
+        self.assertCapacity(5)
+
+        self.cottage.amenities.remove(self.sofa)
+        self.assertCapacity(4)
+
+        self.cottage.amenities.clear()
+        self.assertCapacity(2)
+
+    def test_reverse_add_and_clear(self):
+        """Test changing cottages from the amenity side updates capacity."""
+        self.bed.cottage_set.add(self.cottage)
+        self.assertCapacity(4)
+
+        self.bed.cottage_set.clear()
+        self.assertCapacity(2)
+
+    def test_amenity_capacity_change(self):
+        """Test editing an amenity updates the cottages offering it."""
+        self.cottage.amenities.add(self.bed)
+        self.bed.additional_capacity = 4
+        self.bed.save()
+
+        self.assertCapacity(6)
+
+    def test_amenity_delete(self):
+        """Test deleting an amenity updates the cottages offering it."""
+        self.cottage.amenities.add(self.bed, self.sofa)
+        self.bed.delete()
+
+        self.assertCapacity(3)
+
+    def test_base_capacity_change(self):
+        """Test changing base capacity keeps amenities counted."""
+        self.cottage.amenities.add(self.bed)
+        self.cottage.base_capacity = 3
+        self.cottage.save()
+
+        self.assertEqual(self.cottage.total_capacity, 5)
+        self.assertCapacity(5)
+
+    def test_refresh_in_one_statement(self):
+        """Test stale capacities are fixed with a single query."""
+        self.cottage.amenities.add(self.bed)
+        models.Cottage.objects.update(total_capacity=0)
+
+        with self.assertNumQueries(1):
+            models.Cottage.objects.refresh_total_capacity()
+
+        self.assertCapacity(4)
+
+
+class CottageAmenityIdsTests(TestCase):
+    """Test the denormalized amenity ids follow amenity changes."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.cottage = models.Cottage.objects.create(
+            name='Sample cottage name',
+            base_capacity=2,
+            price_per_night=Decimal('500.50'),
+            user=self.user
+        )
+        self.bed = models.Amenities.objects.create(name='Bed', additional_capacity=2, user=self.user)
+        self.sofa = models.Amenities.objects.create(name='Sofa', additional_capacity=1, user=self.user)
+
+    def assertAmenityIds(self, *amenities):
+        self.cottage.refresh_from_db()
+        self.assertEqual(self.cottage.amenity_ids, sorted(amenity.id for amenity in amenities))
+
+    def test_add_remove_and_clear(self):
+        """Test the ids follow changes from the cottage side."""
+        self.cottage.amenities.add(self.sofa, self.bed)
+        self.assertEqual(self.cottage.amenity_ids, [self.bed.id, self.sofa.id])
+        self.assertAmenityIds(self.bed, self.sofa)
+
+        self.cottage.amenities.remove(self.bed)
+        self.assertAmenityIds(self.sofa)
+
+        self.cottage.amenities.clear()
+        self.assertAmenityIds()
+
+    def test_reverse_changes_and_delete(self):
+        """Test the ids follow changes from the amenity side."""
+        self.bed.cottage_set.add(self.cottage)
+        self.sofa.cottage_set.add(self.cottage)
+        self.assertAmenityIds(self.bed, self.sofa)
+
+        self.sofa.cottage_set.clear()
+        self.assertAmenityIds(self.bed)
+
+        self.bed.delete()
+        self.assertAmenityIds()
+
+    def test_stale_instance_save(self):
+        """Test saving an instance loaded before a link change keeps the ids."""
+        stale = models.Cottage.objects.get(pk=self.cottage.pk)
+        self.cottage.amenities.add(self.bed)
+
+        stale.name = 'Renamed'
+        stale.save()
+
+        self.assertAmenityIds(self.bed)
+
+    def test_with_amenities(self):
+        """Test cottages are matched when they offer every amenity."""
+        other = models.Cottage.objects.create(
+            name='Other', base_capacity=2, price_per_night=Decimal('100.00'), user=self.user
+        )
+        self.cottage.amenities.add(self.bed, self.sofa)
+        other.amenities.add(self.bed)
+
+        both = models.Cottage.objects.with_amenities([self.sofa.id, self.bed.id, self.bed.id])
+        bed = models.Cottage.objects.with_amenities([self.bed.id])
+
+        self.assertEqual(list(both), [self.cottage])
+        self.assertEqual(set(bed), {self.cottage, other})
+
+    def test_refresh_in_one_statement(self):
+        """Test stale ids and capacities are fixed with a single query."""
+        self.cottage.amenities.add(self.bed)
+        models.Cottage.objects.update(amenity_ids=[], total_capacity=0)
+
+        with self.assertNumQueries(1):
+            models.Cottage.objects.refresh_amenities()
+
+        self.assertAmenityIds(self.bed)
+        self.assertEqual(self.cottage.total_capacity, 4)
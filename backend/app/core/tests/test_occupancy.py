@@ -0,0 +1,205 @@
+"""
+Tests for cottage occupancy bitmaps.
+"""
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from core.models import Booking, Cottage, CottageOccupancy
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(email, password)
+
+
+class OccupancyTests(TestCase):
+    """Test occupancy bitmaps are kept in step with bookings."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.cottage = Cottage.objects.create(
+            name='Cottage',
+            base_capacity=2,
+            price_per_night=Decimal('100.00'),
+            user=self.user
+        )
+        self.today = timezone.now().date()
+
+    def book(self, start, nights, email='guest@example.com', cottage=None):
+        """Create a booking starting start days from today."""
+        check_in = self.today + timedelta(days=start)
+        return Booking.objects.create(
+            cottage=cottage or self.cottage,
+            user=self.user,
+            check_in=check_in,
+            check_out=check_in + timedelta(days=nights),
+            customer_name='Guest',
+            customer_email=email,
+        )
+
+    def is_available(self, start, nights):
+        check_in = self.today + timedelta(days=start)
+        return CottageOccupancy.objects.is_available(
+            self.cottage.id, check_in, check_in + timedelta(days=nights)
+        )
+
+    def test_booking_creates_bitmap(self):
+        """Test the first booking builds the cottage bitmap."""
+        self.book(10, 3)
+
+        occupancy = CottageOccupancy.objects.get(cottage=self.cottage)
+        self.assertEqual(occupancy.start, self.today)
+        self.assertEqual(occupancy.bits, 0b111 << 10)
+
+    def test_is_available(self):
+        """Test availability is read from the bitmap."""
+        self.book(10, 3)
+
+        self.assertFalse(self.is_available(12, 5))
+        self.assertFalse(self.is_available(8, 3))
+        self.assertTrue(self.is_available(13, 5))
+        self.assertTrue(self.is_available(7, 3))
+
+    def test_outside_horizon_is_unknown(self):
+        """Test dates outside the horizon are not answered by the bitmap."""
+        self.book(10, 3)
+
+        self.assertIsNone(self.is_available(-5, 3))
+        self.assertIsNone(self.is_available(CottageOccupancy.horizon_days() - 1, 2))
+
+    def test_update_moves_nights(self):
+        """Test moving a booking clears the old nights and sets the new ones."""
+        booking = self.book(10, 3)
+        booking.check_in = self.today + timedelta(days=11)
+        booking.check_out = self.today + timedelta(days=15)
+        booking.save()
+
+        occupancy = CottageOccupancy.objects.get(cottage=self.cottage)
+        self.assertEqual(occupancy.bits, 0b1111 << 11)
+
+    def test_delete_clears_nights(self):
+        """Test deleting a booking frees its nights."""
+        booking = self.book(10, 3)
+        Booking.objects.get(id=booking.id).delete()
+
+        self.assertTrue(self.is_available(10, 3))
+
+    def test_overlap_rejected_by_bitmap(self):
+        """Test an overlapping booking is rejected."""
+        self.book(10, 3)
+
+        with self.assertRaises(ValidationError):
+            self.book(12, 2, email='other@example.com')
+
+    def test_rebuild_and_consistency(self):
+        """Test the bitmap can be rebuilt and checked against bookings."""
+        self.book(10, 3)
+        CottageOccupancy.objects.filter(cottage=self.cottage).update(bitmap=bytes(92))
+
+        self.assertEqual(CottageOccupancy.objects.inconsistent(), [self.cottage.id])
+
+        CottageOccupancy.objects.rebuild()
+
+        self.assertEqual(CottageOccupancy.objects.inconsistent(), [])
+        self.assertFalse(self.is_available(10, 3))
+
+    def test_roll(self):
+        """Test bitmaps starting before today are re-anchored at today."""
+        self.book(1, 2)
+        yesterday = self.today - timedelta(days=1)
+        CottageOccupancy.objects.filter(cottage=self.cottage).update(start=yesterday)
+
+        self.assertEqual(CottageOccupancy.objects.roll(), 1)
+
+        occupancy = CottageOccupancy.objects.get(cottage=self.cottage)
+        self.assertEqual(occupancy.start, self.today)
+        self.assertEqual(occupancy.bits, 0b11 << 1)
+        self.assertEqual(CottageOccupancy.objects.roll(), 0)
+
+
+class OccupancyRollConcurrencyTests(TransactionTestCase):
+    """Test rolling bitmaps while bookings are written in parallel."""
+
+    def test_roll_during_booking_delete(self):
+        """Test nights released by a delete committing during roll() end up free."""
+        user = create_user()
+        cottage = Cottage.objects.create(
+            name='Cottage', base_capacity=2, price_per_night=Decimal('100.00'), user=user
+        )
+        today = timezone.now().date()
+        booking = Booking.objects.create(
+            cottage=cottage,
+            user=user,
+            check_in=today + timedelta(days=1),
+            check_out=today + timedelta(days=3),
+            customer_name='Guest',
+            customer_email='guest@example.com',
+        )
+        CottageOccupancy.objects.filter(cottage=cottage).update(start=today - timedelta(days=1))
+        deleted = threading.Event()
+        built = threading.Event()
+        release_delete = threading.Event()
+        release_roll = threading.Event()
+        mark = CottageOccupancy.objects.mark
+        build_bitmaps = CottageOccupancy.objects._build_bitmaps
+
+        def paused_mark(*args, **kwargs):
+            # Hold the delete between removing the booking and releasing its nights.
+            deleted.set()
+            release_delete.wait(5)
+            mark(*args, **kwargs)
+
+        def paused_build_bitmaps(*args, **kwargs):
+            # Hold the rebuild after reading bookings, before committing.
+            bitmaps = build_bitmaps(*args, **kwargs)
+            built.set()
+            release_roll.wait(5)
+            return bitmaps
+
+        def delete():
+            try:
+                with patch.object(CottageOccupancy.objects, 'mark', paused_mark), transaction.atomic():
+                    booking.delete()
+            finally:
+                connections.close_all()
+
+        def roll():
+            try:
+                with patch.object(CottageOccupancy.objects, '_build_bitmaps', paused_build_bitmaps):
+                    CottageOccupancy.objects.roll()
+            finally:
+                connections.close_all()
+
+        def lock_waited():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT EXISTS (SELECT 1 FROM pg_locks WHERE NOT granted)')
+                return cursor.fetchone()[0]
+
+        deleter = threading.Thread(target=delete)
+        deleter.start()
+        deleted.wait(5)
+        roller = threading.Thread(target=roll)
+        roller.start()
+        # Without the cottage lock the rebuild reads the booking being
+        # deleted, and the delete then waits for the rebuild to commit.
+        built.wait(1)
+        release_delete.set()
+        while deleter.is_alive() and not lock_waited():
+            time.sleep(0.01)
+        release_roll.set()
+        deleter.join()
+        roller.join()
+
+        self.assertEqual(CottageOccupancy.objects.inconsistent(), [])
+        self.assertTrue(CottageOccupancy.objects.is_available(
+            cottage.id, today + timedelta(days=1), today + timedelta(days=3)
+        ))
@@ -0,0 +1,151 @@
+"""
+Tests for on-demand request profiling.
+"""
+import pstats
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Cottage
+from user.authentication import token_cache
+
+COTTAGES_URL = reverse('resort:cottage-list')
+PROFILES_URL = reverse('profile-list')
+
+
+class ProfilingTests(TestCase):
+    """Test profiling requests and reading stored profiles."""
+
+    def setUp(self):
+        token_cache.clear()
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        settings = override_settings(PROFILE_DIR=self.directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(self.directory.cleanup)
+
+        self.staff = get_user_model().objects.create_user(
+            email='admin@example.com',
+            password='testpass123',
+            is_staff=True
+        )
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        Cottage.objects.create(
+            name='Lake', base_capacity=2, price_per_night=Decimal('100.00'), user=self.staff
+        )
+        self.client = APIClient()
+        self.token = Token.objects.create(user=self.staff)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def stored(self):
+        return sorted(path.name for path in Path(self.directory.name).iterdir())
+
+    def test_profile_staff_request(self):
+        """Test a flagged staff request stores a profile with its SQL."""
+        res = self.client.get(COTTAGES_URL, {'profile': '1'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        profile_id = res['X-Profile-Id']
+        self.assertEqual(res['X-Profile-Url'], reverse('profile-detail', args=[profile_id]))
+        self.assertEqual(self.stored(), [f'{profile_id}.json', f'{profile_id}.prof'])
+
+        summary = self.client.get(res['X-Profile-Url']).data
+        self.assertEqual(summary['path'], f'{COTTAGES_URL}?profile=1')
+        self.assertEqual(summary['status'], 200)
+        self.assertTrue(summary['top'])
+        self.assertTrue(any('core_cottage' in query['sql'] for query in summary['queries']))
+
+    async def test_profile_async_request(self):
+        """Test flagged ASGI requests are profiled as well."""
+        res = await AsyncClient().get(COTTAGES_URL, {'profile': '1'}, authorization=f'Token {self.token.key}')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.stored(), [f'{res["X-Profile-Id"]}.json', f'{res["X-Profile-Id"]}.prof'])
+
+    def test_profile_session_request(self):
+        """Test staff logged in with a session can profile requests."""
+        self.client.credentials()
+        self.client.login(email='admin@example.com', password='testpass123')
+
+        res = self.client.get(COTTAGES_URL, {'profile': '1'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('X-Profile-Id', res)
+
+    def test_profile_header(self):
+        """Test the X-Profile header also turns profiling on."""
+        res = self.client.get(COTTAGES_URL, HTTP_X_PROFILE='1')
+
+        self.assertIn('X-Profile-Id', res)
+
+    def test_unflagged_request_not_profiled(self):
+        """Test requests without the flag are not profiled."""
+        res = self.client.get(COTTAGES_URL)
+
+        self.assertNotIn('X-Profile-Id', res)
+        self.assertEqual(self.stored(), [])
+
+    def test_non_staff_not_profiled(self):
+        """Test flagged requests of other users are served unprofiled."""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+
+        res = self.client.get(COTTAGES_URL, {'profile': '1'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('X-Profile-Id', res)
+        self.assertEqual(self.stored(), [])
+
+    @override_settings(REQUEST_PROFILING=0)
+    def test_profiling_disabled(self):
+        """Test the setting turns profiling off."""
+        res = self.client.get(COTTAGES_URL, {'profile': '1'})
+
+        self.assertNotIn('X-Profile-Id', res)
+
+    @override_settings(PROFILE_KEEP=2)
+    def test_old_profiles_pruned(self):
+        """Test only the newest PROFILE_KEEP profiles are kept."""
+        ids = [self.client.get(COTTAGES_URL, {'profile': '1'})['X-Profile-Id'] for _ in range(3)]
+
+        res = self.client.get(PROFILES_URL)
+
+        self.assertEqual(len(self.stored()), 4)
+        self.assertEqual({profile['id'] for profile in res.data}, set(ids) - {min(ids)})
+
+    def test_download_profile(self):
+        """Test the cProfile data can be downloaded and loaded by pstats."""
+        profile_id = self.client.get(COTTAGES_URL, {'profile': '1'})['X-Profile-Id']
+
+        res = self.client.get(reverse('profile-download', args=[profile_id]))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(f'filename="{profile_id}.prof"', res['Content-Disposition'])
+        path = Path(self.directory.name) / 'download.prof'
+        path.write_bytes(b''.join(res.streaming_content))
+        self.assertTrue(pstats.Stats(str(path)).stats)
+
+    def test_missing_profile(self):
+        """Test unknown profile ids return 404."""
+        res = self.client.get(reverse('profile-detail', args=['20240101000000000000-deadbeef']))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_profiles_staff_only(self):
+        """Test stored profiles are only served to staff users."""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+
+        res = self.client.get(PROFILES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
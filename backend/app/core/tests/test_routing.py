@@ -0,0 +1,175 @@
+"""
+Tests for routing reads to database replicas.
+
+The replica_1 alias mirrors the test database over its own connection, so
+it does not see rows written inside a test's transaction, like a replica
+that has not caught up yet.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Cottage
+from core.routing import ReplicaRouter, pin, replica_reads
+from user.authentication import token_cache
+
+COTTAGES_URL = reverse('resort:cottage-list')
+BOOKING_URL = reverse('resort:booking-list')
+CHECK_AVAILABILITY_URL = reverse('resort:check-availability')
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    """Test the database router."""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_default_outside_block(self):
+        """Test reads use the primary outside replica blocks."""
+        self.assertEqual(self.router.db_for_read(Cottage), 'default')
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'])
+    def test_reads_replica_inside_block(self):
+        """Test reads use the replica inside a block and writes do not."""
+        with replica_reads() as alias:
+            self.assertEqual(alias, 'replica_1')
+            self.assertEqual(self.router.db_for_read(Cottage), 'replica_1')
+            self.assertEqual(self.router.db_for_write(Cottage), 'default')
+        self.assertEqual(self.router.db_for_read(Cottage), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        """Test reads stay on the primary without replicas."""
+        with replica_reads() as alias:
+            self.assertIsNone(alias)
+            self.assertEqual(self.router.db_for_read(Cottage), 'default')
+
+    def test_migrate_primary_only(self):
+        """Test migrations only run on the primary."""
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+        self.assertFalse(self.router.allow_migrate('replica_1', 'core'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRoutingApiTests(TestCase):
+    """Test read-only API actions are served from the replica."""
+    databases = {'default', 'replica_1'}
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        self.cottage = Cottage.objects.create(
+            name='Lake', base_capacity=2, price_per_night=Decimal('100.00'), user=self.user
+        )
+        # Let the pins of the writes above expire.
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url):
+        """Return the response and the queries run on the replica."""
+        with CaptureQueriesContext(connections['replica_1']) as replica:
+            res = self.client.get(url)
+        return res, replica
+
+    def book(self):
+        return self.client.post(BOOKING_URL, {
+            'cottage': self.cottage.id,
+            'check_in': '2024-10-01',
+            'check_out': '2024-10-05',
+            'customer_name': 'John Doe',
+            'customer_email': 'john.doe@example.com',
+            'user': self.user.id,
+        }, format='json')
+
+    def test_list_from_replica(self):
+        """Test lists are read from the replica."""
+        res, replica = self.get(COTTAGES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(replica.captured_queries)
+        # The replica has not seen the cottage created in this test.
+        self.assertEqual(res.data['results'], [])
+
+    def test_write_on_primary(self):
+        """Test writes go to the primary."""
+        with CaptureQueriesContext(connections['replica_1']) as replica:
+            res = self.book()
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replica.captured_queries, [])
+
+    def test_read_your_writes(self):
+        """Test a user reads from the primary after booking."""
+        self.book()
+
+        res, replica = self.get(BOOKING_URL)
+
+        self.assertEqual(replica.captured_queries, [])
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_other_users_read_replica(self):
+        """Test the pin only applies to the user who wrote."""
+        self.book()
+        self.client.force_authenticate(None)
+
+        res, replica = self.get(BOOKING_URL)
+
+        self.assertTrue(replica.captured_queries)
+        self.assertEqual(res.data['results'], [])
+
+    def test_pin_expires(self):
+        """Test the user reads from the replica again once the pin expires."""
+        self.book()
+        cache.clear()
+
+        res, replica = self.get(BOOKING_URL)
+
+        self.assertTrue(replica.captured_queries)
+
+    def test_catalogue_write_pins_catalogue(self):
+        """Test cottage reads use the primary right after a catalogue change."""
+        pin('catalogue')
+
+        res, replica = self.get(COTTAGES_URL)
+
+        self.assertEqual(replica.captured_queries, [])
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_check_availability_from_replica(self):
+        """Test availability checks are read from the replica."""
+        with CaptureQueriesContext(connections['replica_1']) as replica:
+            self.client.post(CHECK_AVAILABILITY_URL, {
+                'cottage': self.cottage.id,
+                'check_in': '2024-10-01',
+                'check_out': '2024-10-05',
+            })
+
+        self.assertTrue(replica.captured_queries)
+
+    def test_check_availability_reads_your_writes(self):
+        """Test a token user checks availability on the primary after booking."""
+        token_cache.clear()
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        self.book()
+
+        with CaptureQueriesContext(connections['replica_1']) as replica:
+            res = self.client.post(CHECK_AVAILABILITY_URL, {
+                'cottage': self.cottage.id,
+                'check_in': '2024-10-01',
+                'check_out': '2024-10-05',
+            })
+
+        self.assertEqual(replica.captured_queries, [])
+        self.assertFalse(res.data['available'])
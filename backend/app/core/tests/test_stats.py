@@ -0,0 +1,212 @@
+"""
+Tests for the daily cottage summary.
+"""
+from datetime import date
+from decimal import Decimal
+from unittest import skip
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Sum
+from django.test import TestCase
+
+from core.models import Booking, Cottage, DailyCottageStats, DailyResortStats, SeasonalRate, WeekdayRate
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(email, password)
+
+
+class DailyCottageStatsTests(TestCase):
+    """Test the daily summary is kept in step with bookings."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.cottage = Cottage.objects.create(
+            name='Cottage',
+            base_capacity=2,
+            price_per_night=Decimal('100.00'),
+            user=self.user
+        )
+
+    def book(self, check_in, check_out, email='guest@example.com', cottage=None):
+        """Create and return a booking."""
+        return Booking.objects.create(
+            cottage=cottage or self.cottage,
+            user=self.user,
+            check_in=check_in,
+            check_out=check_out,
+            customer_name='Guest',
+            customer_email=email,
+        )
+
+    def nights(self, cottage=None):
+        """Return the summarized nights of the cottage with their revenue."""
+        return list(
+            DailyCottageStats.objects.filter(cottage=cottage or self.cottage)
+            .order_by('date').values_list('date', 'revenue')
+        )
+
+    def test_booking_adds_nights(self):
+        """Test every booked night is summarized at the cottage price."""
+        self.book(date(2024, 3, 30), date(2024, 4, 2))
+
+        self.assertEqual(self.nights(), [
+            (date(2024, 3, 30), Decimal('100.00')),
+            (date(2024, 3, 31), Decimal('100.00')),
+            (date(2024, 4, 1), Decimal('100.00')),
+        ])
+
+    def test_moving_booking_moves_nights(self):
+        """Test changing dates and cottage refreshes both ranges."""
+        other = Cottage.objects.create(
+            name='Other', base_capacity=2, price_per_night=Decimal('80.00'), user=self.user
+        )
+        booking = self.book(date(2024, 3, 1), date(2024, 3, 3))
+
+        booking.cottage = other
+        booking.check_in = date(2024, 3, 10)
+        booking.check_out = date(2024, 3, 11)
+        booking.save()
+
+        self.assertEqual(self.nights(), [])
+        self.assertEqual(self.nights(other), [(date(2024, 3, 10), Decimal('80.00'))])
+
+    def test_delete_removes_nights(self):
+        """Test deleting a booking drops its nights only."""
+        booking = self.book(date(2024, 3, 1), date(2024, 3, 3))
+        self.book(date(2024, 3, 3), date(2024, 3, 4), email='next@example.com')
+
+        booking.delete()
+
+        self.assertEqual(self.nights(), [(date(2024, 3, 3), Decimal('100.00'))])
+
+    def test_bulk_book_adds_nights(self):
+        """Test bookings stored in bulk are summarized."""
+        Booking.objects.bulk_book([
+            Booking(cottage=self.cottage, user=self.user, check_in=date(2024, 3, 1),
+                    check_out=date(2024, 3, 3), customer_name='A', customer_email='a@example.com'),
+            Booking(cottage=self.cottage, user=self.user, check_in=date(2024, 3, 5),
+                    check_out=date(2024, 3, 6), customer_name='B', customer_email='b@example.com'),
+        ])
+
+        self.assertEqual([night for night, _ in self.nights()], [
+            date(2024, 3, 1), date(2024, 3, 2), date(2024, 3, 5),
+        ])
+
+    def test_refresh_only_touches_range(self):
+        """Test a refresh leaves nights outside its range alone."""
+        self.book(date(2024, 3, 1), date(2024, 3, 5))
+        DailyCottageStats.objects.update(revenue=Decimal('1.00'))
+
+        DailyCottageStats.objects.refresh([(self.cottage.id, date(2024, 3, 2), date(2024, 3, 3))])
+
+        self.assertEqual([revenue for _, revenue in self.nights()], [
+            Decimal('1.00'), Decimal('100.00'), Decimal('1.00'), Decimal('1.00'),
+        ])
+
+    def test_price_change_reprices_nights(self):
+        """Test a new nightly price applies to booked nights."""
+        self.book(date(2024, 3, 1), date(2024, 3, 3))
+
+        self.cottage.price_per_night = Decimal('120.00')
+        self.cottage.save()
+
+        self.assertEqual({revenue for _, revenue in self.nights()}, {Decimal('120.00')})
+
+    def test_booking_uses_nightly_rates(self):
+        """Test booked nights are summarized at their seasonal and weekday rates."""
+        SeasonalRate.objects.create(
+            cottage=self.cottage, start=date(2024, 3, 2), end=date(2024, 3, 4), price_per_night=Decimal('150.00')
+        )
+        WeekdayRate.objects.create(cottage=self.cottage, weekday=4, adjustment_percent=10)
+        WeekdayRate.objects.create(cottage=self.cottage, weekday=6, adjustment_percent=-15)
+
+        self.book(date(2024, 3, 1), date(2024, 3, 5))
+
+        self.assertEqual(self.nights(), [
+            (date(2024, 3, 1), Decimal('110.00')),
+            (date(2024, 3, 2), Decimal('150.00')),
+            (date(2024, 3, 3), Decimal('127.50')),
+            (date(2024, 3, 4), Decimal('100.00')),
+        ])
+
+    def test_rate_change_reprices_nights(self):
+        """Test adding and removing rates applies to booked nights."""
+        self.book(date(2024, 3, 1), date(2024, 3, 3))
+
+        season = SeasonalRate.objects.create(
+            cottage=self.cottage, start=date(2024, 3, 2), end=date(2024, 3, 10), price_per_night=Decimal('150.00')
+        )
+        WeekdayRate.objects.create(cottage=self.cottage, weekday=4, adjustment_percent=10)
+        self.assertEqual(self.nights(), [
+            (date(2024, 3, 1), Decimal('110.00')),
+            (date(2024, 3, 2), Decimal('150.00')),
+        ])
+
+        season.delete()
+        self.assertEqual(self.nights(), [
+            (date(2024, 3, 1), Decimal('110.00')),
+            (date(2024, 3, 2), Decimal('100.00')),
+        ])
+
+    def test_rebuild_matches_incremental(self):
+        """Test a rebuild produces the rows maintained incrementally."""
+        self.book(date(2024, 3, 1), date(2024, 3, 5))
+        self.book(date(2024, 3, 7), date(2024, 3, 9), email='next@example.com')
+        incremental = self.nights()
+
+        count = DailyCottageStats.objects.rebuild()
+
+        self.assertEqual(count, 6)
+        self.assertEqual(self.nights(), incremental)
+
+    def test_by_date(self):
+        """Test a cottage's nights and revenue are listed per date."""
+        self.book(date(2024, 3, 30), date(2024, 4, 1))
+
+        rows = list(DailyCottageStats.objects.by_date(date(2024, 3, 31), date(2024, 5, 1), self.cottage.id))
+
+        self.assertEqual(rows, [
+            {'date': date(2024, 3, 31), 'occupied_nights': 1, 'revenue': Decimal('100.00')},
+        ])
+
+
+class DailyResortStatsTests(DailyCottageStatsTests):
+    """Test the resort totals follow every change of the daily summary."""
+
+    def tearDown(self):
+        expected = {
+            row['date']: (row['nights'], row['revenue'])
+            for row in DailyCottageStats.objects.values('date').annotate(
+                nights=Count('*'), revenue=Sum('revenue')
+            )
+        }
+        totals = {
+            row.date: (row.occupied_nights, row.revenue)
+            for row in DailyResortStats.objects.exclude(occupied_nights=0)
+        }
+        self.assertEqual(totals, expected)
+
+    @skip('Edits the summary directly, bypassing the totals.')
+    def test_refresh_only_touches_range(self):
+        pass
+
+    def test_cottage_delete_discards_nights(self):
+        """Test deleting a cottage takes its nights out of the totals."""
+        other = Cottage.objects.create(
+            name='Other', base_capacity=2, price_per_night=Decimal('80.00'), user=self.user
+        )
+        self.book(date(2024, 3, 1), date(2024, 3, 3))
+        self.book(date(2024, 3, 2), date(2024, 3, 4), email='other@example.com', cottage=other)
+
+        other.delete()
+
+        self.assertEqual(
+            list(DailyResortStats.objects.by_date(date(2024, 3, 1), date(2024, 3, 4))),
+            [
+                {'date': date(2024, 3, 1), 'occupied_nights': 1, 'revenue': Decimal('100.00')},
+                {'date': date(2024, 3, 2), 'occupied_nights': 1, 'revenue': Decimal('100.00')},
+                {'date': date(2024, 3, 3), 'occupied_nights': 0, 'revenue': Decimal('0.00')},
+            ]
+        )
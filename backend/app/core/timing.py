@@ -0,0 +1,104 @@
+"""
+Per-request timing of SQL, serialization and rendering.
+"""
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from rest_framework import serializers
+
+_current = ContextVar('request_timing', default=None)
+
+
+class RequestTimings:
+    """Timings collected while handling one request."""
+
+    def __init__(self):
+        self.queries = Counter()
+        self.query_count = 0
+        self.sql = 0.0
+        self.spans = {}
+        self._active = set()
+
+    def execute(self, execute, sql, params, many, context):
+        """Database execute wrapper recording the time of every query."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - start
+            self.query_count += 1
+            self.queries[sql] += 1
+
+    def repeated_queries(self, threshold):
+        """Return (sql, count) of statements run at least threshold times."""
+        return [(sql, count) for sql, count in self.queries.most_common() if count >= threshold]
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper adding the query to the current timings.
+
+    It looks the timings up in a context variable rather than being added
+    around a request, because ASGI requests query from other threads.
+    """
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.execute(execute, sql, params, many, context)
+
+
+def instrument_connection(connection):
+    """Record the queries of a new connection in the current timings."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def current():
+    """Return the timings of the request being handled, if recorded."""
+    return _current.get()
+
+
+@contextmanager
+def recording():
+    """Record timings for the block and yield them."""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def measure(name):
+    """Add the time of the block, less its SQL time, to the named span.
+
+    Nested measurements of the same span are counted once.
+    """
+    timings = _current.get()
+    if timings is None or name in timings._active:
+        yield
+        return
+    timings._active.add(name)
+    start = time.perf_counter()
+    sql = timings.sql
+    try:
+        yield
+    finally:
+        timings._active.discard(name)
+        elapsed = time.perf_counter() - start - (timings.sql - sql)
+        timings.spans[name] = timings.spans.get(name, 0.0) + elapsed
+
+
+class TimedSerializerMixin:
+    """Record the time spent building serializer data."""
+
+    @property
+    def data(self):
+        with measure('serialize'):
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    """List serializer recording the time spent building its data."""
@@ -0,0 +1,61 @@
+"""
+Views for core operational endpoints.
+"""
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from rest_framework import generics
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from core import profiling
+from core.metrics import REGISTRY
+from user.authentication import CachedTokenAuthentication
+
+
+def metrics(request):
+    """Serve the process metrics in the Prometheus text format."""
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    return HttpResponse(
+        REGISTRY.expose(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+class BaseProfileView(generics.GenericAPIView):
+    """Base view for stored request profiles."""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAdminUser,)
+
+    def get_summary(self):
+        summary = profiling.load_summary(self.kwargs['profile_id'])
+        if summary is None:
+            raise Http404
+        return summary
+
+
+class ProfileListView(BaseProfileView):
+    """List stored request profiles, newest first."""
+
+    def get(self, request, *args, **kwargs):
+        return Response(profiling.list_summaries())
+
+
+class ProfileDetailView(BaseProfileView):
+    """Return the top functions and SQL statements of a profile."""
+
+    def get(self, request, *args, **kwargs):
+        return Response(self.get_summary())
+
+
+class ProfileDownloadView(BaseProfileView):
+    """Download the cProfile data of a profile as a .prof file."""
+
+    def get(self, request, *args, **kwargs):
+        summary = self.get_summary()
+        return FileResponse(
+            open(profiling.prof_path(summary['id']), 'rb'),
+            as_attachment=True,
+            filename=f'{summary["id"]}.prof',
+            content_type='application/octet-stream',
+        )
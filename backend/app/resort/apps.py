@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ResortConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'resort'
+
+    def ready(self):
+        from resort import jobs  # noqa: F401
@@ -0,0 +1,187 @@
+"""
+Async views for resort reads and availability checks, served under ASGI.
+
+The views query with the async ORM, so the event loop serves other
+requests while theirs wait on the database. They reuse the querysets,
+serializers and keyset pagination of the DRF views of the same endpoints,
+and share their token authentication, response cache and replica routing.
+Only token authentication is supported, and every endpoint is public.
+"""
+import functools
+from contextlib import nullcontext
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from rest_framework import exceptions, status
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+
+from core.caching import acatalogue_version
+from core.models import Booking, Cottage, CottageOccupancy
+from core.routing import ais_pinned, replica_reads, user_scope
+from resort import views
+from resort.caching import cache_entry, etag_matches, response_cache_key
+from resort.serializers import AvailabilityCheckSerializer
+from user.authentication import CachedTokenAuthentication
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    """Return the data as compact JSON, like the DRF JSON renderer."""
+    return JsonResponse(data, status=status_code, safe=False, json_dumps_params={'separators': (',', ':')})
+
+
+def error_response(exc):
+    """Return the response the DRF views give for an API exception."""
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        exc.auth_header = CachedTokenAuthentication.keyword
+    response = exception_handler(exc, {})
+    error = json_response(response.data, response.status_code)
+    for header, value in response.items():
+        if header != 'Content-Type':
+            error[header] = value
+    return error
+
+
+def async_api_view(methods):
+    """Turn a coroutine into an async view answering the HTTP methods.
+
+    The coroutine is called with a DRF request carrying the authenticated
+    user, and API exceptions are answered as the DRF views answer them.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def inner(request, *args, **kwargs):
+            try:
+                if request.method not in methods:
+                    raise exceptions.MethodNotAllowed(request.method)
+                auth = await CachedTokenAuthentication().aauthenticate(request)
+                drf_request = Request(request, parsers=[JSONParser()])
+                if auth is not None:
+                    drf_request.user, drf_request.auth = auth
+                return await func(drf_request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                return error_response(exc)
+
+        # Only token authentication is accepted, and csrf_exempt would wrap
+        # the coroutine function in a sync view on Django 4.1.
+        inner.csrf_exempt = True
+        return inner
+    return decorator
+
+
+async def read_context(request, scopes=()):
+    """Return replica_reads(), unless the scopes or the user were written recently."""
+    scopes = list(scopes)
+    if request.user.is_authenticated:
+        scopes.append(user_scope(request.user))
+    if await ais_pinned(*scopes):
+        return nullcontext()
+    return replica_reads()
+
+
+async def cached_response(request, load):
+    """Return the cached response, a 304, or await load() and cache its data."""
+    key = response_cache_key(request, 'json', await acatalogue_version())
+    entry = await cache.aget(key)
+    if entry is None:
+        entry = cache_entry(await load())
+        await cache.aset(key, entry, settings.RESPONSE_CACHE_TIMEOUT)
+
+    etag, data = entry
+    if etag_matches(etag, request.META.get('HTTP_IF_NONE_MATCH')):
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = json_response(data)
+    response['ETag'] = etag
+    return response
+
+
+def viewset(view_class, request, action, **kwargs):
+    """Return the DRF viewset set up for the action, for its queryset and serializer."""
+    return view_class(request=request, action=action, format_kwarg=None, args=(), kwargs=kwargs)
+
+
+async def list_data(view):
+    """Return the paginated list data of the viewset."""
+    page = await view.paginator.apaginate_queryset(view.get_queryset(), view.request, view)
+    return view.get_paginated_response(view.get_serializer(page, many=True).data).data
+
+
+async def retrieve_data(view, pk):
+    """Return the data of one object of the viewset."""
+    queryset = view.get_queryset()
+    try:
+        instance = await queryset.aget(pk=pk)
+    except queryset.model.DoesNotExist:
+        raise exceptions.NotFound()
+    return view.get_serializer(instance).data
+
+
+@async_api_view(['GET'])
+async def cottage_list(request):
+    """Manage cottages in the database."""
+    view = viewset(views.CottageViewSet, request, 'list')
+    with await read_context(request, view.replica_pin_scopes):
+        return await cached_response(request, functools.partial(list_data, view))
+
+
+@async_api_view(['GET'])
+async def cottage_detail(request, pk):
+    """Manage cottages in the database."""
+    view = viewset(views.CottageViewSet, request, 'retrieve', pk=pk)
+    with await read_context(request, view.replica_pin_scopes):
+        return await cached_response(request, functools.partial(retrieve_data, view, pk))
+
+
+@async_api_view(['GET'])
+async def amenity_list(request):
+    """Manage amenities in the database."""
+    view = viewset(views.AmenitiesViewSet, request, 'list')
+    with await read_context(request, view.replica_pin_scopes):
+        return await cached_response(request, functools.partial(list_data, view))
+
+
+@async_api_view(['GET'])
+async def booking_list(request):
+    """Manage booking in the database."""
+    view = viewset(views.BookingViewSet, request, 'list')
+    with await read_context(request):
+        return json_response(await list_data(view))
+
+
+async def cottage_availability(cottage_id, check_in, check_out):
+    """Async views.cottage_availability()."""
+    available = await CottageOccupancy.objects.ais_available(cottage_id, check_in, check_out)
+    if available is None:
+        if not await Cottage.objects.filter(id=cottage_id).aexists():
+            raise exceptions.NotFound()
+        available = not await Booking.objects.filter(
+            cottage_id=cottage_id,
+            check_in__lt=check_out,
+            check_out__gt=check_in
+        ).aexists()
+    return available
+
+
+@async_api_view(['POST'])
+async def check_availability(request):
+    """Return whether a cottage is free for the dates, with suggestions when booked."""
+    serializer = AvailabilityCheckSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    cottage_id = serializer.validated_data['cottage']
+    check_in = serializer.validated_data['check_in']
+    check_out = serializer.validated_data['check_out']
+
+    with await read_context(request):
+        available = await cottage_availability(cottage_id, check_in, check_out)
+        data = views.availability_data(available)
+        if not available:
+            # Booked dates are the slow path, which shares the suggestion
+            # searches of the DRF view in a thread.
+            data.update(await sync_to_async(views.availability_suggestions)(
+                cottage_id, check_in, check_out, serializer.validated_data['similar']
+            ))
+    return json_response(data)
@@ -0,0 +1,449 @@
+"""
+Benchmark scenarios for resort APIs.
+"""
+import asyncio
+import random
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import connection, connections, transaction
+from django.db.models import Exists, OuterRef
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Booking, Cottage, DailyCottageStats, SeasonalRate, WeekdayRate
+from resort.exports import BOOKING_EXPORT_FIELDS
+from resort.pricing import quote
+from resort.reports import occupancy_report
+from resort.search import search
+from resort.serializers import CottageSerializer
+from user.authentication import CachedTokenAuthentication, token_cache
+
+SCENARIOS = {}
+
+
+def scenario(name, sizes):
+    """Register a benchmark scenario with its default sizes."""
+    def decorator(func):
+        func.default_sizes = sizes
+        SCENARIOS[name] = func
+        return func
+    return decorator
+
+
+@contextmanager
+def rollback():
+    """Run the block in a transaction that is always rolled back."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def timed(func, repeat=5):
+    """Return the best wall time of func in milliseconds and its last result."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def create_bench_user():
+    """Create and return the user owning benchmark data."""
+    return get_user_model().objects.create_user(email='bench@example.com')
+
+
+def create_bench_cottages(user, size):
+    """Bulk create size cottages with alternating capacities."""
+    return Cottage.objects.bulk_create(
+        Cottage(
+            name=f'Bench cottage {i:06d}',
+            base_capacity=2 + i % 4,
+            total_capacity=2 + i % 4,
+            price_per_night=Decimal('100.00') + i % 50,
+            user=user,
+        )
+        for i in range(size)
+    )
+
+
+@scenario('availability_search', sizes=(100, 1000, 5000))
+def availability_search(sizes):
+    """Search free cottages for a date range with half the catalogue booked."""
+    check_in = date.today() + timedelta(days=30)
+    check_out = check_in + timedelta(days=3)
+    for size in sizes:
+        with rollback():
+            user = create_bench_user()
+            cottages = create_bench_cottages(user, size)
+            Booking.objects.bulk_create(
+                Booking(
+                    cottage=cottage,
+                    user=user,
+                    check_in=check_in,
+                    check_out=check_out,
+                    customer_name='Bench',
+                    customer_email=f'bench{cottage.id}@example.com',
+                )
+                for cottage in cottages[::2]
+            )
+
+            def search():
+                queryset = Cottage.objects.available(
+                    check_in, check_out, guests=3
+                ).prefetch_related('amenities')
+                return CottageSerializer(queryset, many=True).data
+
+            with CaptureQueriesContext(connection) as queries:
+                search()
+            ms, data = timed(search)
+
+        yield {
+            'cottages': size,
+            'free': len(data),
+            'queries': len(queries),
+            'ms': f'{ms:.2f}',
+        }
+
+
+def count_double_bookings(cottage_ids):
+    """Return the number of bookings overlapping another one of their cottage."""
+    overlapping = Booking.objects.filter(
+        cottage=OuterRef('cottage'),
+        check_in__lt=OuterRef('check_out'),
+        check_out__gt=OuterRef('check_in'),
+    ).exclude(pk=OuterRef('pk'))
+    return Booking.objects.filter(
+        cottage_id__in=cottage_ids
+    ).filter(Exists(overlapping)).count()
+
+
+def book_in_parallel(workers, attempts, cottage_ids, seed):
+    """Fire bookings from parallel threads and return (created, rejected)."""
+    user = get_user_model().objects.get(email='stress@example.com')
+    today = date.today()
+    results = []
+
+    def worker(number):
+        rng = random.Random(seed + number)
+        created = rejected = 0
+        try:
+            for attempt in range(attempts):
+                check_in = today + timedelta(days=rng.randrange(60))
+                try:
+                    Booking.objects.create(
+                        cottage_id=rng.choice(cottage_ids),
+                        user=user,
+                        check_in=check_in,
+                        check_out=check_in + timedelta(days=rng.randint(1, 4)),
+                        customer_name='Stress',
+                        customer_email=f'stress{number}.{attempt}@example.com',
+                    )
+                    created += 1
+                except ValidationError:
+                    rejected += 1
+        finally:
+            connection.close()
+        results.append((created, rejected))
+
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return sum(r[0] for r in results), sum(r[1] for r in results)
+
+
+@scenario('booking_stress', sizes=(8, 32))
+def booking_stress(sizes, attempts=10):
+    """Create bookings from parallel threads at one and at many cottages.
+
+    Data is committed so that threads can see it and deleted afterwards.
+    """
+    user = get_user_model().objects.create_user(email='stress@example.com')
+    try:
+        for size in sizes:
+            cottages = create_bench_cottages(user, size)
+            for target, cottage_ids in (
+                    ('one', [cottages[0].id]),
+                    ('many', [cottage.id for cottage in cottages]),
+            ):
+                Booking.objects.filter(cottage__user=user).delete()
+                start = time.perf_counter()
+                created, rejected = book_in_parallel(size, attempts, cottage_ids, seed=size)
+                elapsed = time.perf_counter() - start
+                yield {
+                    'workers': size,
+                    'target': target,
+                    'created': created,
+                    'rejected': rejected,
+                    'per_second': f'{(created + rejected) / elapsed:.1f}',
+                    'double_bookings': count_double_bookings(cottage_ids),
+                }
+            Cottage.objects.filter(user=user).delete()
+    finally:
+        user.delete()
+
+
+@scenario('token_auth', sizes=(1000,))
+def token_auth(sizes):
+    """Authenticate requests with and without the token cache."""
+    factory = APIRequestFactory()
+    for size in sizes:
+        with rollback():
+            token = Token.objects.create(user=create_bench_user())
+            request = Request(factory.get('/', HTTP_AUTHORIZATION=f'Token {token.key}'))
+            token_cache.clear()
+            for authentication in (TokenAuthentication(), CachedTokenAuthentication()):
+                with CaptureQueriesContext(connection) as queries:
+                    authentication.authenticate(request)
+                    authentication.authenticate(request)
+
+                def authenticate_all():
+                    for _ in range(size):
+                        authentication.authenticate(request)
+
+                ms, _ = timed(authenticate_all, repeat=3)
+                yield {
+                    'requests': size,
+                    'authentication': type(authentication).__name__,
+                    'queries_per_2_requests': len(queries),
+                    'us_per_request': f'{ms * 1000 / size:.1f}',
+                }
+
+
+def wsgi_throughput(url, payload, concurrency, total):
+    """Return (seconds, statuses) for total POSTs from concurrency threads."""
+    statuses = []
+
+    def worker(count):
+        client = Client()
+        try:
+            for _ in range(count):
+                statuses.append(client.post(url, payload, content_type='application/json').status_code)
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=worker, args=(total // concurrency + (number < total % concurrency),))
+        for number in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, statuses
+
+
+def asgi_throughput(url, payload, concurrency, total):
+    """Return (seconds, statuses) for total POSTs with concurrency in flight."""
+    async def run():
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def post():
+            async with semaphore:
+                response = await client.post(url, payload, content_type='application/json')
+                return response.status_code
+
+        try:
+            return await asyncio.gather(*(post() for _ in range(total)))
+        finally:
+            # The queries ran on the one thread of thread sensitive calls,
+            # whose connection the test client leaves open.
+            await sync_to_async(connections.close_all)()
+
+    start = time.perf_counter()
+    statuses = asyncio.run(run())
+    return time.perf_counter() - start, statuses
+
+
+@scenario('async_reads', sizes=(1, 8, 32))
+def async_reads(sizes, total=200):
+    """Compare availability check throughput of the WSGI and ASGI views.
+
+    Data is committed so that request threads can see it and deleted
+    afterwards.
+    """
+    user = get_user_model().objects.create_user(email='async@example.com')
+    try:
+        cottage = create_bench_cottages(user, 1)[0]
+        check_in = date.today() + timedelta(days=30)
+        payload = {
+            'cottage': cottage.id,
+            'check_in': check_in.isoformat(),
+            'check_out': (check_in + timedelta(days=3)).isoformat(),
+        }
+        paths = (
+            ('wsgi', wsgi_throughput, reverse('resort:check-availability')),
+            ('asgi', asgi_throughput, reverse('resort:async-check-availability')),
+        )
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for size in sizes:
+                for name, run, url in paths:
+                    elapsed, statuses = run(url, payload, size, total)
+                    yield {
+                        'concurrency': size,
+                        'server': name,
+                        'requests': total,
+                        'errors': sum(code != 200 for code in statuses),
+                        'per_second': f'{total / elapsed:.1f}',
+                    }
+    finally:
+        user.delete()
+
+
+def seed_bench_bookings(user, size, per_cottage=100):
+    """Insert size bookings spread over cottages with one SQL statement."""
+    cottages = create_bench_cottages(user, -(-size // per_cottage))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {Booking._meta.db_table}
+                (cottage_id, user_id, check_in, check_out,
+                 customer_name, customer_email, is_confirmed)
+            SELECT cottage.id, cottage.user_id,
+                   DATE '2020-01-01' + night * 3,
+                   DATE '2020-01-01' + night * 3 + 2,
+                   'Bench', 'bench' || cottage.id || '.' || night || '@example.com', true
+            FROM {Cottage._meta.db_table} cottage
+            CROSS JOIN generate_series(0, %s - 1) AS night
+            WHERE cottage.id = ANY(%s)
+            LIMIT %s
+            """,
+            [per_cottage, [cottage.id for cottage in cottages], size],
+        )
+
+
+def traced_peak(func):
+    """Return the result of func and the peak traced memory in KiB."""
+    tracemalloc.start()
+    try:
+        result = func()
+        return result, tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+@scenario('booking_export', sizes=(1000, 10000, 100000))
+def booking_export(sizes):
+    """Compare peak memory of the streaming export and a materialized list."""
+    for size in sizes:
+        with rollback():
+            user = get_user_model().objects.create_user(email='export@example.com', is_staff=True)
+            seed_bench_bookings(user, size)
+            client = Client(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+            url = reverse('resort:booking-export')
+
+            def export():
+                response = client.get(url, {'fmt': 'csv'})
+                return sum(len(chunk) for chunk in response.streaming_content)
+
+            def materialize():
+                return len(list(Booking.objects.order_by('id').values(*BOOKING_EXPORT_FIELDS)))
+
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                ms, exported = timed(export, repeat=1)
+                _, export_peak = traced_peak(export)
+            rows, list_peak = traced_peak(materialize)
+
+        yield {
+            'rows': rows,
+            'bytes': exported,
+            'ms': f'{ms:.0f}',
+            'export_peak_kb': f'{export_peak:.0f}',
+            'list_peak_kb': f'{list_peak:.0f}',
+        }
+
+
+@scenario('occupancy_report', sizes=(10000, 100000))
+def occupancy_report_benchmark(sizes):
+    """Time month and year reports from the daily summary."""
+    for size in sizes:
+        with rollback():
+            user = create_bench_user()
+            seed_bench_bookings(user, size)
+            nights = DailyCottageStats.objects.rebuild()
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {DailyCottageStats._meta.db_table}')
+            cottages = Cottage.objects.count()
+            for period in ('month', 'year'):
+                ms, results = timed(lambda: occupancy_report(
+                    date(2020, 1, 1), date(2021, 1, 1), period, cottages
+                ))
+                yield {
+                    'bookings': size,
+                    'nights': nights,
+                    'period': period,
+                    'rows': len(results),
+                    'ms': f'{ms:.2f}',
+                }
+
+
+@scenario('quotes', sizes=(10000, 100000))
+def quotes(sizes, cottages=200):
+    """Quote random stays of up to two weeks over a year of seasonal rates."""
+    rng = random.Random(0)
+    start = date(2025, 1, 1)
+    with rollback():
+        catalogue = create_bench_cottages(create_bench_user(), cottages)
+        SeasonalRate.objects.bulk_create(
+            SeasonalRate(
+                cottage=cottage,
+                start=start + timedelta(days=season * 91),
+                end=start + timedelta(days=season * 91 + 91),
+                price_per_night=cottage.price_per_night + 10 * season,
+            )
+            for cottage in catalogue for season in range(4)
+        )
+        WeekdayRate.objects.bulk_create(
+            WeekdayRate(cottage=cottage, weekday=weekday, adjustment_percent=15)
+            for cottage in catalogue for weekday in (4, 5)
+        )
+        for size in sizes:
+            cottage_ids = [rng.choice(catalogue).id for _ in range(size)]
+            check_ins = [start + timedelta(days=rng.randrange(350)) for _ in range(size)]
+            check_outs = [check_in + timedelta(days=rng.randint(1, 14)) for check_in in check_ins]
+            ms, totals = timed(lambda: quote(cottage_ids, check_ins, check_outs))
+            yield {
+                'stays': size,
+                'cottages': cottages,
+                'ms': f'{ms:.1f}',
+                'quotes_per_s': f'{size / ms * 1000:.0f}',
+                'total': sum(totals),
+            }
+
+
+@scenario('search', sizes=(10000, 100000))
+def search_benchmark(sizes):
+    """Time narrow and catalogue-wide typeahead searches over cottage names."""
+    for size in sizes:
+        with rollback():
+            create_bench_cottages(create_bench_user(), size)
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {Cottage._meta.db_table}')
+            for text in ('00012', 'bench cot'):
+                ms, results = timed(lambda: list(search(Cottage.objects.all(), text, 10)))
+                yield {
+                    'cottages': size,
+                    'q': f'"{text}"',
+                    'results': len(results),
+                    'ms': f'{ms:.2f}',
+                }
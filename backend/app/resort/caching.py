@@ -0,0 +1,73 @@
+"""
+Response caching for public resort reads.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.caching import catalogue_version
+
+
+def etag_matches(etag, header):
+    """Return whether an If-None-Match header matches the ETag."""
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(',')]
+    return '*' in candidates or etag in candidates
+
+
+def response_cache_key(request, fmt, version):
+    """Return the cache key of a response in a format, under a catalogue version.
+
+    Paginated responses link to their neighbours with absolute URLs, so the
+    scheme and host are part of the key along with the path.
+    """
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'resort:response:{version}:{fmt}:{url}'
+
+
+def cache_entry(data):
+    """Return the (ETag, data) entry cached for response data."""
+    body = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+    return '"%s"' % hashlib.md5(body.encode()).hexdigest(), data
+
+
+class CachedReadMixin:
+    """Serve list and retrieve responses from the cache with strong ETags.
+
+    Entries are keyed by the catalogue version, so any Cottage or Amenities
+    write makes every cached response unreachable.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_cache_key(self, request):
+        return response_cache_key(request, request.accepted_renderer.format, catalogue_version())
+
+    def cached_response(self, view, request, *args, **kwargs):
+        """Return the cached response, a 304, or render and cache it."""
+        key = self.get_cache_key(request)
+        entry = cache.get(key)
+        if entry is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            entry = cache_entry(response.data)
+            cache.set(key, entry, settings.RESPONSE_CACHE_TIMEOUT)
+
+        etag, data = entry
+        if etag_matches(etag, request.META.get('HTTP_IF_NONE_MATCH')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        return response
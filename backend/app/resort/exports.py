@@ -0,0 +1,94 @@
+"""
+Streaming exports for resort APIs.
+"""
+import csv
+import io
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+BOOKING_EXPORT_FIELDS = (
+    'id',
+    'cottage_id',
+    'user_id',
+    'check_in',
+    'check_out',
+    'customer_name',
+    'customer_email',
+    'is_confirmed',
+)
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Spreadsheets run cells starting with these as formulas.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def csv_cell(value):
+    """Return the value, quoting text a spreadsheet would run as a formula.
+
+    Guests choose their own names, so an export opened in Excel must not
+    evaluate e.g. =HYPERLINK(...) typed into a booking form.
+    """
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def _chunks(rows, write_row, buffer, flush_every):
+    """Yield the buffered text after every flush_every rows."""
+    pending = 0
+    for row in rows:
+        write_row(row)
+        pending += 1
+        if pending == flush_every:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def csv_lines(rows, fields, flush_every):
+    """Yield CSV text for the rows, header first."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    return _chunks(
+        rows,
+        lambda row: writer.writerow([csv_cell(row[field]) for field in fields]),
+        buffer,
+        flush_every,
+    )
+
+
+def ndjson_lines(rows, flush_every):
+    """Yield newline delimited JSON text for the rows."""
+    buffer = io.StringIO()
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+
+    def write_row(row):
+        buffer.write(encoder.encode(row))
+        buffer.write('\n')
+
+    return _chunks(rows, write_row, buffer, flush_every)
+
+
+def stream_queryset(queryset, fields, fmt, filename, chunk_size):
+    """Return a response streaming the queryset rows as CSV or NDJSON.
+
+    Rows are read with a server-side cursor, so memory does not depend on
+    the number of rows exported.
+    """
+    rows = queryset.values(*fields).iterator(chunk_size=chunk_size)
+    if fmt == 'csv':
+        content = csv_lines(rows, fields, chunk_size)
+    else:
+        content = ndjson_lines(rows, chunk_size)
+    response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
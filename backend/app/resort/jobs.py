@@ -0,0 +1,37 @@
+"""
+Background jobs of the resort app.
+"""
+from django.conf import settings
+from django.core.mail import send_mail
+
+from core.jobs import enqueue, job
+from core.models import Booking, CottageOccupancy
+
+
+@job('confirm_booking')
+def confirm_booking(booking_id):
+    """Confirm a new booking and queue its confirmation email."""
+    if Booking.objects.filter(pk=booking_id, is_confirmed=False).update(is_confirmed=True):
+        enqueue('send_booking_confirmation', booking_id=booking_id)
+
+
+@job('send_booking_confirmation')
+def send_booking_confirmation(booking_id):
+    """Email the customer the details of a confirmed booking."""
+    booking = Booking.objects.select_related('cottage').filter(pk=booking_id).first()
+    if booking is None:
+        return
+    send_mail(
+        f'Your booking of {booking.cottage.name} is confirmed',
+        f'Dear {booking.customer_name},\n\n'
+        f'your stay in {booking.cottage.name} from {booking.check_in:%Y-%m-%d} '
+        f'to {booking.check_out:%Y-%m-%d} is confirmed.\n',
+        None,
+        [booking.customer_email],
+    )
+
+
+@job('roll_occupancy', every=settings.OCCUPANCY_ROLL_SECONDS)
+def roll_occupancy():
+    """Move the occupancy bitmaps that start before today to today."""
+    CottageOccupancy.objects.roll()
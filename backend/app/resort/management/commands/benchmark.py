@@ -0,0 +1,33 @@
+"""
+Django command to run a resort benchmark scenario.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from resort.benchmarks import SCENARIOS
+
+
+class Command(BaseCommand):
+    """Django command to run a benchmark scenario"""
+    help = 'Run a benchmark scenario and print one line per size.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(SCENARIOS))
+        parser.add_argument(
+            '--sizes',
+            help='Comma-separated list of sizes to run the scenario with.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        func = SCENARIOS[options['scenario']]
+        sizes = func.default_sizes
+        if options['sizes']:
+            try:
+                sizes = [int(size) for size in options['sizes'].split(',')]
+            except ValueError:
+                raise CommandError('--sizes must be a list of integers.')
+
+        for row in func(sizes):
+            self.stdout.write(
+                ' '.join(f'{key}={value}' for key, value in row.items())
+            )
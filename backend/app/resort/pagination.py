@@ -0,0 +1,136 @@
+"""
+Pagination for resort APIs.
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+def invert_ordering(ordering):
+    """Return the ordering with every field direction flipped."""
+    return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination keyed on every field of the view ordering.
+
+    The cursor holds the full sort key of the boundary row, so each page
+    is found with a WHERE clause on the ordering instead of an OFFSET and
+    deep pages cost the same as the first one. Views declare the sort key
+    in their ``ordering`` attribute, or return it from ``get_ordering()``
+    when it depends on the request, ending with a unique field.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def get_ordering(self, request, queryset, view):
+        if hasattr(view, 'get_ordering'):
+            return tuple(view.get_ordering())
+        return tuple(view.ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._set_page(list(self._page_queryset(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async paginate_queryset() for async views."""
+        return self._set_page([row async for row in self._page_queryset(queryset, request, view)])
+
+    def _page_queryset(self, queryset, request, view):
+        """Return the queryset of the requested page, with one extra row."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        ordering = invert_ordering(self.ordering) if self._reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(self._after(queryset.model, ordering, self.cursor.position))
+        return queryset[:self.page_size + 1]
+
+    def _set_page(self, results):
+        """Keep the page of the fetched rows and note its neighbours."""
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if self._reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    @property
+    def _reverse(self):
+        return self.cursor is not None and self.cursor.reverse
+
+    def _after(self, model, ordering, position):
+        """Return a filter for rows sorting after the position."""
+        if not isinstance(position, list) or len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            values = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(ordering, position)
+            ]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+
+        # The redundant bound on the leading field lets the database start
+        # an index scan at the position instead of filtering from the top.
+        first = ordering[0].lstrip('-')
+        bound = Q(**{f'{first}__{"lte" if ordering[0].startswith("-") else "gte"}': values[0]})
+
+        condition = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            step = Q(**{f'{name}__{lookup}': values[index]})
+            for previous, value in zip(ordering[:index], values):
+                step &= Q(**{previous.lstrip('-'): value})
+            condition |= step
+        return bound & condition
+
+    def _position(self, instance):
+        return [getattr(instance, field.lstrip('-')) for field in self.ordering]
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self._position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self._position(self.page[0])))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            tokens = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            return Cursor(offset=0, reverse=bool(tokens.get('r')), position=tokens['p'])
+        except (BinasciiError, UnicodeError, ValueError, TypeError, KeyError, AttributeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, cursor):
+        tokens = {'p': cursor.position}
+        if cursor.reverse:
+            tokens['r'] = 1
+        encoded = urlsafe_b64encode(
+            json.dumps(tokens, cls=DjangoJSONEncoder, separators=(',', ':')).encode('ascii')
+        ).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
@@ -0,0 +1,85 @@
+"""
+Price quotes for many stays at once.
+
+Nightly prices are laid out per cottage and day as NumPy arrays of cents,
+with seasonal rates and weekday adjustments applied to whole slices, so
+no Python loop runs over the nights and the totals stay exact.
+"""
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+
+from core.models import Cottage, SeasonalRate, WeekdayRate
+
+# 1970-01-01, day zero of datetime64[D], was a Thursday.
+EPOCH_WEEKDAY = date(1970, 1, 1).weekday()
+
+
+def to_cents(amount):
+    """Return a two-place Decimal amount as integer cents."""
+    return int(amount.scaleb(2))
+
+
+def nightly_prices(cottage_ids, first, days):
+    """Return the price in cents of each cottage on each of days from first.
+
+    Rows follow cottage_ids. Raises Cottage.DoesNotExist when one of the
+    cottages is missing.
+    """
+    rows = {cottage_id: row for row, cottage_id in enumerate(cottage_ids)}
+    base = dict(Cottage.objects.filter(id__in=cottage_ids).values_list('id', 'price_per_night'))
+    missing = rows.keys() - base.keys()
+    if missing:
+        raise Cottage.DoesNotExist(f'Cottages {sorted(missing)} do not exist.')
+
+    prices = np.empty((len(cottage_ids), days), dtype=np.int64)
+    prices[:] = np.array([to_cents(base[cottage_id]) for cottage_id in cottage_ids])[:, np.newaxis]
+
+    last = first + np.timedelta64(days, 'D')
+    seasons = SeasonalRate.objects.filter(
+        cottage_id__in=cottage_ids, start__lt=last.item(), end__gt=first.item()
+    ).values_list('cottage_id', 'start', 'end', 'price_per_night')
+    for cottage_id, start, end, price in seasons:
+        start = max((np.datetime64(start, 'D') - first).astype(int), 0)
+        end = min((np.datetime64(end, 'D') - first).astype(int), days)
+        prices[rows[cottage_id], start:end] = to_cents(price)
+
+    adjustments = WeekdayRate.objects.filter(
+        cottage_id__in=cottage_ids
+    ).values_list('cottage_id', 'weekday', 'adjustment_percent')
+    percent = np.full((len(cottage_ids), 7), 100, dtype=np.int64)
+    for cottage_id, weekday, adjustment in adjustments:
+        percent[rows[cottage_id], weekday] += adjustment
+    if (percent != 100).any():
+        weekdays = (np.arange(days) + first.astype(np.int64) + EPOCH_WEEKDAY) % 7
+        # Prices and percentages are positive, so this rounds half up.
+        prices = (prices * percent[:, weekdays] + 50) // 100
+    return prices
+
+
+def quote(cottage_ids, check_ins, check_outs):
+    """Return the total price of each stay as a Decimal.
+
+    Stays are given as parallel sequences of cottage ids, check-in and
+    check-out dates. Each cottage's nightly prices are summed once into a
+    running total, so a stay costs two lookups whatever its length.
+    """
+    cottage_ids = np.asarray(cottage_ids, dtype=np.int64)
+    check_ins = np.asarray(check_ins, dtype='datetime64[D]')
+    check_outs = np.asarray(check_outs, dtype='datetime64[D]')
+    if not len(cottage_ids):
+        return []
+
+    ids, rows = np.unique(cottage_ids, return_inverse=True)
+    first = check_ins.min()
+    days = int((check_outs.max() - first).astype(int))
+    prices = nightly_prices(ids.tolist(), first, days)
+
+    running = np.zeros((len(ids), days + 1), dtype=np.int64)
+    np.cumsum(prices, axis=1, out=running[:, 1:])
+    totals = (
+        running[rows, (check_outs - first).astype(np.int64)]
+        - running[rows, (check_ins - first).astype(np.int64)]
+    )
+    return [Decimal(cents).scaleb(-2) for cents in totals.tolist()]
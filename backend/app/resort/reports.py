@@ -0,0 +1,58 @@
+"""
+Occupancy and revenue reports for resort APIs.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from core.models import DailyCottageStats, DailyResortStats
+
+
+def period_start(day, period):
+    """Return the first day of the period containing the day."""
+    if period == 'year':
+        return day.replace(month=1, day=1)
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_period(day, period):
+    """Return the first day of the period following the one starting on day."""
+    if period == 'year':
+        return day.replace(year=day.year + 1)
+    if period == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def occupancy_report(start, end, period, cottages, cottage_id=None):
+    """Return occupancy rate and revenue per period, empty periods included.
+
+    Per-date totals are read from the summary tables and summed per period
+    here, which keeps the query on at most one row per day.
+    """
+    if cottage_id is None:
+        days = DailyResortStats.objects.by_date(start, end)
+    else:
+        days = DailyCottageStats.objects.by_date(start, end, cottage_id)
+    totals = {}
+    for day in days:
+        bucket = totals.setdefault(period_start(day['date'], period), [0, Decimal('0.00')])
+        bucket[0] += day['occupied_nights']
+        bucket[1] += day['revenue']
+
+    results = []
+    bucket = period_start(start, period)
+    while bucket < end:
+        following = next_period(bucket, period)
+        available = (min(following, end) - max(bucket, start)).days * cottages
+        occupied, revenue = totals.get(bucket, (0, Decimal('0.00')))
+        results.append({
+            'period': bucket,
+            'occupied_nights': occupied,
+            'available_nights': available,
+            'occupancy_rate': round(occupied / available, 4) if available else 0,
+            'revenue': revenue,
+        })
+        bucket = following
+    return results
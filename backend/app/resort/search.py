@@ -0,0 +1,38 @@
+"""
+Typeahead search over cottage and amenity names.
+
+Names are kept as tsvectors by database triggers and matched with prefix
+tsqueries, which the GIN indexes on the vectors answer without a scan.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
+
+# Names are proper nouns, so words are matched as typed rather than stemmed.
+SEARCH_CONFIG = 'simple'
+WORD = re.compile(r'[^\W_]+')
+
+
+def prefix_query(text):
+    """Return a query for names with words starting like each word of text.
+
+    Returns None when text has no words. Only letters and digits are kept,
+    so tsquery operators typed by the user cannot break the query.
+    """
+    words = WORD.findall(text.lower())
+    if not words:
+        return None
+    return SearchQuery(
+        ' & '.join(f'{word}:*' for word in words), search_type='raw', config=SEARCH_CONFIG
+    )
+
+
+def search(queryset, text, limit):
+    """Return up to limit rows of queryset matching text, best match first."""
+    query = prefix_query(text)
+    if query is None:
+        return queryset.none()
+    return queryset.filter(search_vector=query).annotate(
+        rank=SearchRank(F('search_vector'), query)
+    ).order_by('-rank', 'name', 'id')[:limit]
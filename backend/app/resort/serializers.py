@@ -1,18 +1,66 @@
 """
 Serializers for resort APIs.
 """
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.db import transaction
 from rest_framework import serializers
 
+from core.caching import bump_catalogue_version
 from core.models import Cottage, Amenities, Booking
+from core.timing import TimedListSerializer, TimedSerializerMixin
 
 
-class AmenitiesSerializer(serializers.ModelSerializer):
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field that resolves ids from rows loaded up front."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.prefetched = None
+
+    def to_internal_value(self, data):
+        if self.prefetched is not None and not isinstance(data, bool):
+            instance = self.prefetched.get(str(data))
+            if instance is not None:
+                return instance
+        return super().to_internal_value(data)
+
+
+class PrefetchedListSerializer(TimedListSerializer):
+    """List serializer that loads the related rows of all items at once."""
+
+    def to_internal_value(self, data):
+        fields = {
+            name: field for name, field in self.child.fields.items()
+            if isinstance(field, PrefetchedPrimaryKeyRelatedField)
+        }
+        if isinstance(data, list):
+            for name, field in fields.items():
+                ids = {
+                    str(item[name]) for item in data
+                    if isinstance(item, dict) and isinstance(item.get(name), (int, str))
+                }
+                ids = [pk for pk in ids if pk.isdigit()]
+                field.prefetched = {
+                    str(instance.pk): instance
+                    for instance in field.get_queryset().filter(pk__in=ids)
+                }
+        try:
+            return super().to_internal_value(data)
+        finally:
+            for field in fields.values():
+                field.prefetched = None
+
+
+class AmenitiesSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for Amenities."""
+    user = PrefetchedPrimaryKeyRelatedField(queryset=get_user_model().objects.all())
 
     class Meta:
         model = Amenities
-        fields = '__all__'
+        exclude = ['search_vector']
         read_only_fields = ['id']
+        list_serializer_class = PrefetchedListSerializer
 
     def validate(self, data):
         """Validate amenities data."""
@@ -21,13 +69,16 @@ class AmenitiesSerializer(serializers.ModelSerializer):
         return data
 
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for Booking."""
+    cottage = PrefetchedPrimaryKeyRelatedField(queryset=Cottage.objects.all())
+    user = PrefetchedPrimaryKeyRelatedField(queryset=get_user_model().objects.all())
 
     class Meta:
         model = Booking
         fields = '__all__'
         read_only_fields = ['id']
+        list_serializer_class = PrefetchedListSerializer
 
     def validate(self, data):
         """Validate booking data."""
@@ -40,35 +91,60 @@ class BookingSerializer(serializers.ModelSerializer):
         return data
 
 
-class CottageSerializer(serializers.ModelSerializer):
+class CottageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for cottages."""
     amenities = AmenitiesSerializer(many=True, required=False)
 
     class Meta:
         model = Cottage
-        fields = '__all__'
+        exclude = ['amenity_ids', 'search_vector']
         read_only_fields = ['id']
+        list_serializer_class = TimedListSerializer
 
     def _get_or_create_amenities(self, amenities, cottage):
-        """Handle getting or creating amenities as needed."""
+        """Attach amenities by name, creating the missing ones in bulk."""
         auth_user = self.context['request'].user
+        requested = {}
         for amenity in amenities:
-            name = amenity.get('name')
-            additional_capacity = amenity.get('additional_capacity', 0)
-            amenity_obj, created = Amenities.objects.get_or_create(
-                user=auth_user,
-                name=name,
-                defaults={'additional_capacity': additional_capacity}
-            )
-            cottage.amenities.add(amenity_obj)
+            requested.setdefault(amenity.get('name'), amenity.get('additional_capacity', 0))
+        if not requested:
+            return
+
+        existing = {}
+        for amenity_obj in Amenities.objects.filter(
+                user=auth_user, name__in=requested).order_by('id'):
+            existing.setdefault(amenity_obj.name, amenity_obj)
+        created = Amenities.objects.bulk_create([
+            Amenities(user=auth_user, name=name, additional_capacity=additional_capacity)
+            for name, additional_capacity in requested.items()
+            if name not in existing
+        ])
+        amenity_objs = [*existing.values(), *created]
+
+        # Bulk inserts bypass the m2m signals, so the capacity, the amenity
+        # ids and the cached reads are refreshed here from the rows already
+        # loaded.
+        through = Cottage.amenities.through
+        through.objects.bulk_create([
+            through(cottage_id=cottage.pk, amenities_id=amenity_obj.pk)
+            for amenity_obj in amenity_objs
+        ], ignore_conflicts=True)
+        cottage.total_capacity = cottage.base_capacity + sum(
+            amenity_obj.additional_capacity for amenity_obj in amenity_objs
+        )
+        cottage.amenity_ids = sorted(amenity_obj.pk for amenity_obj in amenity_objs)
+        Cottage.objects.filter(pk=cottage.pk).update(
+            total_capacity=cottage.total_capacity,
+            amenity_ids=cottage.amenity_ids,
+        )
+        transaction.on_commit(bump_catalogue_version)
 
     def create(self, validated_data):
         """Create a cottage."""
         amenities = validated_data.pop('amenities', [])
-        cottage = Cottage.objects.create(**validated_data)
-        self._get_or_create_amenities(amenities, cottage)
-        cottage.total_capacity = cottage.calculate_total_capacity()
-        cottage.save()
+        with transaction.atomic():
+            cottage = Cottage.objects.create(**validated_data)
+            self._get_or_create_amenities(amenities, cottage)
 
         return cottage
 
@@ -77,6 +153,55 @@ class AvailabilityCheckSerializer(serializers.Serializer):
     cottage = serializers.IntegerField()
     check_in = serializers.DateField()
     check_out = serializers.DateField()
+    similar = serializers.BooleanField(
+        default=False,
+        help_text='Also suggest similar cottages free for the dates.'
+    )
+
+    def validate(self, data):
+        check_in = data.get('check_in')
+        check_out = data.get('check_out')
+
+        if check_in >= check_out:
+            raise serializers.ValidationError({
+                'check_out': 'Check-out date must be later than check-in date.'
+            })
+
+        return data
+
+
+class StayQuoteSerializer(TimedSerializerMixin, serializers.Serializer):
+    """Stay to price, answered with its number of nights and total."""
+    cottage = PrefetchedPrimaryKeyRelatedField(queryset=Cottage.objects.all())
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    nights = serializers.IntegerField(read_only=True)
+    total = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+
+    class Meta:
+        list_serializer_class = PrefetchedListSerializer
+
+    def validate(self, data):
+        if data['check_in'] >= data['check_out']:
+            raise serializers.ValidationError({
+                'check_out': 'Check-out date must be later than check-in date.'
+            })
+        return data
+
+
+class SimilarCottageSerializer(serializers.ModelSerializer):
+    """Cottage suggested when the requested one is not available."""
+
+    class Meta:
+        model = Cottage
+        fields = ['id', 'name', 'category', 'total_capacity', 'price_per_night']
+        read_only_fields = fields
+
+
+class AvailabilitySearchSerializer(serializers.Serializer):
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    guests = serializers.IntegerField(min_value=1, default=1)
 
     def validate(self, data):
         check_in = data.get('check_in')
@@ -88,3 +213,99 @@ class AvailabilityCheckSerializer(serializers.Serializer):
             })
 
         return data
+
+
+class CottageSearchSerializer(serializers.Serializer):
+    category = serializers.ChoiceField(
+        choices=Cottage.CATEGORY_CHOICES,
+        required=False,
+        help_text='Category of the cottage (e.g. standard, luxury)'
+    )
+    min_guests = serializers.IntegerField(
+        min_value=1,
+        required=False,
+        help_text='Smallest total capacity of the cottages'
+    )
+    min_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    max_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    sort = serializers.ChoiceField(
+        choices=['-name', 'price', '-price'],
+        default='-name',
+        help_text='Order by name descending, or by nightly price'
+    )
+
+    def validate(self, data):
+        min_price = data.get('min_price')
+        max_price = data.get('max_price')
+
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise serializers.ValidationError({
+                'max_price': 'Maximum price must not be lower than minimum price.'
+            })
+
+        return data
+
+
+class BookingExportSerializer(serializers.Serializer):
+    fmt = serializers.ChoiceField(choices=['csv', 'ndjson'], default='csv')
+    cottage = serializers.IntegerField(required=False)
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, data):
+        start = data.get('start')
+        end = data.get('end')
+
+        if start and end and start >= end:
+            raise serializers.ValidationError({
+                'end': 'End date must be later than start date.'
+            })
+
+        return data
+
+
+class OccupancyReportSerializer(serializers.Serializer):
+    period = serializers.ChoiceField(choices=['day', 'month', 'year'], default='month')
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    cottage = serializers.IntegerField(required=False)
+
+    def validate(self, data):
+        year = timezone.now().date().replace(month=1, day=1)
+        start = data.setdefault('start', year)
+        end = data.setdefault('end', start.replace(year=start.year + 1, month=1, day=1))
+
+        if start >= end:
+            raise serializers.ValidationError({
+                'end': 'End date must be later than start date.'
+            })
+
+        return data
+
+
+class SearchSerializer(serializers.Serializer):
+    q = serializers.CharField(
+        max_length=100,
+        help_text='Beginning of the words to find in cottage and amenity names'
+    )
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+
+class CottageMatchSerializer(serializers.ModelSerializer):
+    """Cottage found by a search, with how well it matched."""
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Cottage
+        fields = ['id', 'name', 'category', 'total_capacity', 'price_per_night', 'rank']
+        read_only_fields = fields
+
+
+class AmenityMatchSerializer(serializers.ModelSerializer):
+    """Amenity found by a search, with how well it matched."""
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Amenities
+        fields = ['id', 'name', 'additional_capacity', 'rank']
+        read_only_fields = fields
@@ -4,6 +4,7 @@ Tests for the Amenities API.
 from decimal import Decimal
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 from django.test import TestCase
 
@@ -42,6 +43,8 @@ class PublicAmenitiesApiTest(TestCase):
     """Test unauthenticated API requests."""
 
     def setUp(self):
+        # Cached responses outlive the rolled back data of other tests.
+        cache.clear()
         self.client = APIClient()
 
     def test_auth_not_required(self):
@@ -55,6 +58,8 @@ class AdminAmenitiesApiTest(TestCase):
     """Test admin API requests."""
 
     def setUp(self):
+        # Cached responses outlive the rolled back data of other tests.
+        cache.clear()
         self.client = APIClient()
         self.user = create_admin()
         self.client.force_authenticate(self.user)
@@ -87,6 +92,8 @@ class PrivateAmenitiesApiTest(TestCase):
     """Test authenticated API requests."""
 
     def setUp(self):
+        # Cached responses outlive the rolled back data of other tests.
+        cache.clear()
         self.user = create_user()
         self.client = APIClient()
         self.client.force_authenticate(self.user)
@@ -101,7 +108,7 @@ class PrivateAmenitiesApiTest(TestCase):
         amenities = Amenities.objects.all().order_by('-name')
         serializer = AmenitiesSerializer(amenities, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_amenities_not_limited_to_user(self):
         """Test list of amenities is not limited for authenticated user."""
@@ -112,9 +119,9 @@ class PrivateAmenitiesApiTest(TestCase):
         res = self.client.get(AMENITIES_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 2)
-        self.assertEqual(res.data[0]['name'], amenity.name)
-        self.assertEqual(res.data[0]['id'], amenity.id)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertEqual(res.data['results'][0]['name'], amenity.name)
+        self.assertEqual(res.data['results'][0]['id'], amenity.id)
 
     def test_filter_amenities_assigned_to_cottages(self):
         """Test listing amenities by those assigned to cottages."""
@@ -133,8 +140,8 @@ class PrivateAmenitiesApiTest(TestCase):
         s1 = AmenitiesSerializer(amenity1)
         s2 = AmenitiesSerializer(amenity2)
 
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertNotIn(s2.data, res.data['results'])
 
     def test_filtered_amenities_unique(self):
         """Test filtered amenities return a unique list."""
@@ -157,4 +164,28 @@ class PrivateAmenitiesApiTest(TestCase):
 
         res = self.client.get(AMENITIES_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+
+class AmenitiesQueryBudgetTests(TestCase):
+    """Test amenity endpoints use a fixed number of queries."""
+
+    def setUp(self):
+        # Cached responses outlive the rolled back data of other tests.
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+
+    def test_list_query_count_does_not_grow(self):
+        """Test listing amenities takes one query for any number of rows."""
+        Amenities.objects.create(user=self.user, name='Pool')
+        with self.assertNumQueries(1):
+            self.client.get(AMENITIES_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(20):
+                Amenities.objects.create(user=self.user, name=f'Amenity {i}')
+        with self.assertNumQueries(1):
+            res = self.client.get(AMENITIES_URL)
+
+        self.assertEqual(len(res.data['results']), 21)
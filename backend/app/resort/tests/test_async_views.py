@@ -0,0 +1,149 @@
+"""
+Tests for the async resort views.
+"""
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncClient, Client, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from core.models import Amenities, Booking, Cottage
+from user.authentication import token_cache
+
+CHECK_AVAILABILITY_URL = reverse('resort:async-check-availability')
+
+
+class AsyncViewTests(TestCase):
+    """Test async reads, which query with the async ORM."""
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.client = AsyncClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.cottage = Cottage.objects.create(
+            name='Cottage',
+            base_capacity=2,
+            price_per_night=Decimal('100.00'),
+            user=self.user
+        )
+        self.cottage.amenities.add(Amenities.objects.create(name='Bed', additional_capacity=1, user=self.user))
+        Booking.objects.create(
+            cottage=self.cottage,
+            user=self.user,
+            check_in='2024-10-01',
+            check_out='2024-10-05',
+            customer_name='John Doe',
+            customer_email='john.doe@example.com'
+        )
+
+    async def test_cottage_list(self):
+        """Test listing cottages asynchronously."""
+        res = await self.client.get(reverse('resort:async-cottage-list'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.json()['results']
+        self.assertEqual(results[0]['id'], self.cottage.id)
+        self.assertEqual(results[0]['total_capacity'], 3)
+        self.assertEqual(results[0]['amenities'][0]['name'], 'Bed')
+
+    async def test_cottage_list_pages(self):
+        """Test async lists follow the keyset cursor of the DRF views."""
+        other = await Cottage.objects.acreate(
+            name='Other', base_capacity=2, price_per_night=Decimal('80.00'), user=self.user
+        )
+
+        first = (await self.client.get(reverse('resort:async-cottage-list'), {'page_size': 1})).json()
+        second = (await self.client.get(first['next'])).json()
+
+        self.assertEqual([cottage['id'] for cottage in first['results']], [other.id])
+        self.assertEqual([cottage['id'] for cottage in second['results']], [self.cottage.id])
+        self.assertIsNone(second['next'])
+
+    async def test_cottage_detail(self):
+        """Test retrieving a cottage asynchronously."""
+        res = await self.client.get(reverse('resort:async-cottage-detail', args=[self.cottage.id]))
+
+        self.assertEqual(res.json()['name'], 'Cottage')
+
+    async def test_cottage_detail_not_found(self):
+        """Test retrieving a missing cottage returns 404."""
+        res = await self.client.get(reverse('resort:async-cottage-detail', args=[self.cottage.id + 1]))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_amenity_and_booking_lists(self):
+        """Test listing amenities and bookings asynchronously."""
+        amenities = await self.client.get(reverse('resort:async-amenities-list'))
+        bookings = await self.client.get(reverse('resort:async-booking-list'))
+
+        self.assertEqual(len(amenities.json()['results']), 1)
+        self.assertEqual(bookings.json()['results'][0]['customer_name'], 'John Doe')
+
+    async def test_check_availability(self):
+        """Test checking availability asynchronously."""
+        booked = await self.client.post(CHECK_AVAILABILITY_URL, {
+            'cottage': self.cottage.id,
+            'check_in': '2024-10-03',
+            'check_out': '2024-10-06',
+        }, content_type='application/json')
+        free = await self.client.post(CHECK_AVAILABILITY_URL, {
+            'cottage': self.cottage.id,
+            'check_in': '2024-10-05',
+            'check_out': '2024-10-06',
+        }, content_type='application/json')
+
+        self.assertFalse(booked.json()['available'])
+        self.assertTrue(free.json()['available'])
+
+    async def test_check_availability_invalid(self):
+        """Test invalid availability payloads return 400."""
+        res = await self.client.post(CHECK_AVAILABILITY_URL, {
+            'cottage': self.cottage.id,
+            'check_in': '2024-10-06',
+            'check_out': '2024-10-03',
+        }, content_type='application/json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('check_out', res.json())
+
+    async def test_wrong_method(self):
+        """Test async views reject other methods."""
+        res = await self.client.get(CHECK_AVAILABILITY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    async def test_shares_response_cache(self):
+        """Test async reads are served from the cache of the DRF view."""
+        sync = await sync_to_async(Client().get)(reverse('resort:cottage-list'))
+        etag = sync['ETag']
+
+        res = await self.client.get(reverse('resort:async-cottage-list'))
+        not_modified = await self.client.get(reverse('resort:async-cottage-list'), if_none_match=etag)
+
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_token_authentication(self):
+        """Test async views authenticate tokens like the DRF views."""
+        valid = await self.client.get(
+            reverse('resort:async-booking-list'), authorization=f'Token {self.token.key}'
+        )
+        invalid = await self.client.get(reverse('resort:async-booking-list'), authorization='Token wrong')
+
+        self.assertEqual(valid.status_code, status.HTTP_200_OK)
+        self.assertEqual(invalid.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(invalid['WWW-Authenticate'], 'Token')
+
+    @override_settings(REQUEST_TIMING=1)
+    async def test_request_timing(self):
+        """Test async queries are timed with the request."""
+        with self.assertLogs('core.middleware', 'INFO'):
+            res = await self.client.get(reverse('resort:async-cottage-list'))
+
+        self.assertIn('desc="2 queries"', res['Server-Timing'])
@@ -1,17 +1,28 @@
 """
 Tests for the booking API.
 """
-from datetime import datetime
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
 
 from django.contrib.auth import get_user_model
+from django.core import mail
 from django.urls import reverse
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
-from core.models import Booking, Cottage
+from core.jobs import run_next
+from core.models import Booking, Cottage, CottageOccupancy, Job
+from resort.exports import BOOKING_EXPORT_FIELDS, csv_lines
 from resort.serializers import BookingSerializer
 
 BOOKING_URL = reverse('resort:booking-list')
+BULK_BOOKING_URL = reverse('resort:booking-bulk')
+EXPORT_BOOKING_URL = reverse('resort:booking-export')
 
 
 def create_user(email='user@example.com', password='testpass123'):
@@ -63,6 +74,32 @@ class BookingSerializerTests(TestCase):
         self.assertEqual(booking.customer_name, payload['customer_name'])
         self.assertEqual(booking.customer_email, payload['customer_email'])
 
+    def test_create_booking_confirmed_in_background(self):
+        """Test a new booking is confirmed and emailed by queued jobs."""
+        payload = {
+            'cottage': self.cottage.id,
+            'check_in': '2024-10-01',
+            'check_out': '2024-10-05',
+            'customer_name': 'John Doe',
+            'customer_email': 'john.doe@example.com',
+            'user': self.user.id
+        }
+        res = self.client.post(BOOKING_URL, payload, format='json')
+
+        self.assertFalse(res.data['is_confirmed'])
+        self.assertEqual(mail.outbox, [])
+        job = Job.objects.get()
+        self.assertEqual((job.name, job.payload), ('confirm_booking', {'booking_id': res.data['id']}))
+
+        while run_next() is not None:
+            pass
+
+        self.assertTrue(Booking.objects.get(id=res.data['id']).is_confirmed)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['john.doe@example.com'])
+        self.assertIn('2024-10-01', mail.outbox[0].body)
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {Job.DONE})
+
     def test_invalid_booking_serializer(self):
         """Test invalid booking serializer."""
         payload = {
@@ -143,7 +180,7 @@ class PrivateBookingApiTests(TestCase):
         )
         res = self.client.get(BOOKING_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
 
     def test_update_booking(self):
         """Test updating a booking."""
@@ -264,3 +301,521 @@ class CheckAvailabilityApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data['available'], False)
         self.assertEqual(res.data['message'], 'The cottage is not available for the selected dates.')
+
+
+    def test_check_availability_uses_occupancy_bitmap(self):
+        """Test availability within the occupancy horizon is read from the bitmap."""
+        check_in = timezone.now().date() + timedelta(days=10)
+        Booking.objects.create(
+            cottage=self.cottage,
+            user=self.user,
+            check_in=check_in,
+            check_out=check_in + timedelta(days=3),
+            customer_name='John Doe',
+            customer_email='john.doe@example.com'
+        )
+        payload = {
+            'cottage': self.cottage.id,
+            'check_in': check_in + timedelta(days=2),
+            'check_out': check_in + timedelta(days=4)
+        }
+        url = reverse('resort:check-availability')
+
+        # The bitmap, then the bookings scanned for alternative dates.
+        with self.assertNumQueries(2):
+            res = self.client.post(url, payload, format='json')
+
+        self.assertEqual(res.data['available'], False)
+
+    def test_check_availability_unknown_cottage(self):
+        """Test checking availability of a missing cottage returns 404."""
+        payload = {
+            'cottage': self.cottage.id + 1,
+            'check_in': '2024-10-01',
+            'check_out': '2024-10-05'
+        }
+        url = reverse('resort:check-availability')
+        res = self.client.post(url, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unavailable_suggests_nearest_dates(self):
+        """Test booked dates come with the nearest free stays of the same length."""
+        today = timezone.now().date()
+        for start, end in ((10, 14), (15, 20)):
+            Booking.objects.create(
+                cottage=self.cottage,
+                user=self.user,
+                check_in=today + timedelta(days=start),
+                check_out=today + timedelta(days=end),
+                customer_name='John Doe',
+                customer_email=f'john{start}@example.com'
+            )
+        payload = {
+            'cottage': self.cottage.id,
+            'check_in': today + timedelta(days=13),
+            'check_out': today + timedelta(days=16),
+        }
+
+        res = self.client.post(reverse('resort:check-availability'), payload, format='json')
+
+        self.assertEqual(res.data['alternatives'], {
+            'before': {'check_in': today + timedelta(days=7), 'check_out': today + timedelta(days=10)},
+            'after': {'check_in': today + timedelta(days=20), 'check_out': today + timedelta(days=23)},
+        })
+        self.assertNotIn('similar_cottages', res.data)
+
+    def test_available_has_no_suggestions(self):
+        """Test free dates are answered without suggestions."""
+        payload = {'cottage': self.cottage.id, 'check_in': '2024-10-01', 'check_out': '2024-10-05'}
+
+        res = self.client.post(reverse('resort:check-availability'), payload, format='json')
+
+        self.assertNotIn('alternatives', res.data)
+
+    def test_unavailable_suggests_similar_cottages(self):
+        """Test similar cottages free for the dates are suggested on request."""
+        self.cottage.total_capacity = 4
+        self.cottage.save()
+        close = create_cottage(self.user, name='Close', base_capacity=4, total_capacity=4, price_per_night='110.00')
+        far = create_cottage(self.user, name='Far', base_capacity=6, total_capacity=6, price_per_night='300.00')
+        create_cottage(self.user, name='Small', base_capacity=2, total_capacity=2, price_per_night='100.00')
+        create_cottage(
+            self.user, name='Luxury', category='luxury', base_capacity=4, total_capacity=4, price_per_night='100.00'
+        )
+        for cottage in (self.cottage, far):
+            Booking.objects.create(
+                cottage=cottage,
+                user=self.user,
+                check_in='2024-10-01',
+                check_out='2024-10-05',
+                customer_name='John Doe',
+                customer_email=f'john{cottage.id}@example.com'
+            )
+        payload = {
+            'cottage': self.cottage.id,
+            'check_in': '2024-10-02',
+            'check_out': '2024-10-04',
+            'similar': True,
+        }
+
+        res = self.client.post(reverse('resort:check-availability'), payload, format='json')
+
+        self.assertEqual([cottage['id'] for cottage in res.data['similar_cottages']], [close.id])
+
+
+class AvailabilitySearchApiTests(TestCase):
+    """Test the availability search API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.url = reverse('resort:search-availability')
+
+    def test_search_returns_free_cottages_with_capacity(self):
+        """Test search excludes booked and too small cottages."""
+        free = create_cottage(self.user, name='Free', base_capacity=4, total_capacity=4, price_per_night='100.00')
+        booked = create_cottage(self.user, name='Booked', base_capacity=4, total_capacity=4, price_per_night='100.00')
+        create_cottage(self.user, name='Small', base_capacity=1, total_capacity=1, price_per_night='100.00')
+        Booking.objects.create(
+            cottage=booked,
+            user=self.user,
+            check_in='2024-10-03',
+            check_out='2024-10-06',
+            customer_name='John Doe',
+            customer_email='john.doe@example.com'
+        )
+        payload = {'check_in': '2024-10-01', 'check_out': '2024-10-05', 'guests': 3}
+
+        res = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([cottage['id'] for cottage in res.data], [free.id])
+
+    def test_search_adjacent_booking_is_free(self):
+        """Test a booking ending on the check-in day does not block the cottage."""
+        cottage = create_cottage(self.user, name='Cottage', base_capacity=2, total_capacity=2, price_per_night='100.00')
+        Booking.objects.create(
+            cottage=cottage,
+            user=self.user,
+            check_in='2024-09-28',
+            check_out='2024-10-01',
+            customer_name='John Doe',
+            customer_email='john.doe@example.com'
+        )
+        payload = {'check_in': '2024-10-01', 'check_out': '2024-10-05'}
+
+        res = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_search_invalid_dates(self):
+        """Test search rejects check-out before check-in."""
+        payload = {'check_in': '2024-10-05', 'check_out': '2024-10-01'}
+
+        res = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_query_count_does_not_grow(self):
+        """Test search uses the same number of queries for any catalogue size."""
+        payload = {'check_in': '2024-10-01', 'check_out': '2024-10-05'}
+        for i in range(30):
+            create_cottage(self.user, name=f'Cottage {i}', base_capacity=2, total_capacity=2, price_per_night='100.00')
+
+        with self.assertNumQueries(2):
+            res = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(len(res.data), 30)
+
+
+class BookingPaginationTests(TestCase):
+    """Test keyset pagination of the booking list."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        cottages = [
+            create_cottage(self.user, name=f'Cottage {i}', base_capacity=2, price_per_night='100.00')
+            for i in range(2)
+        ]
+        for day in range(1, 5):
+            for cottage in cottages:
+                Booking.objects.create(
+                    cottage=cottage,
+                    user=self.user,
+                    check_in=f'2024-10-{day * 2:02d}',
+                    check_out=f'2024-10-{day * 2 + 1:02d}',
+                    customer_name='Guest',
+                    customer_email=f'guest{cottage.id}@example.com'
+                )
+        self.expected = list(
+            Booking.objects.order_by('-check_in', '-id').values_list('id', flat=True)
+        )
+
+    def test_walk_pages_forward(self):
+        """Test following next links returns every booking once in order."""
+        ids = []
+        url = BOOKING_URL + '?page_size=3'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids += [booking['id'] for booking in res.data['results']]
+            url = res.data['next']
+
+        self.assertEqual(ids, self.expected)
+
+    def test_previous_link(self):
+        """Test the previous link of the second page returns the first page."""
+        first = self.client.get(BOOKING_URL, {'page_size': 3})
+        second = self.client.get(first.data['next'])
+
+        res = self.client.get(second.data['previous'])
+
+        self.assertIsNone(first.data['previous'])
+        self.assertEqual(res.data['results'], first.data['results'])
+        self.assertIsNone(res.data['previous'])
+
+    def test_deep_page_uses_keyset(self):
+        """Test later pages are selected by sort key rather than offset."""
+        first = self.client.get(BOOKING_URL, {'page_size': 3})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first.data['next'])
+
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('OFFSET', queries[0]['sql'])
+
+    def test_list_query_count_does_not_grow(self):
+        """Test a page of bookings is loaded with a single query."""
+        with self.assertNumQueries(1):
+            res = self.client.get(BOOKING_URL)
+
+        self.assertEqual(len(res.data['results']), len(self.expected))
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor returns 404."""
+        res = self.client.get(BOOKING_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BulkBookingApiTests(TestCase):
+    """Test creating many bookings in one request."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.cottage = create_cottage(self.user, name='Lake', base_capacity=4, price_per_night='100.00')
+        self.other = create_cottage(self.user, name='Forest', base_capacity=4, price_per_night='100.00')
+        CottageOccupancy.objects.rebuild()
+        self.today = timezone.now().date()
+
+    def booking(self, cottage, start, nights, email='guest@example.com'):
+        """Return a booking payload starting start days from today."""
+        check_in = self.today + timedelta(days=start)
+        return {
+            'cottage': cottage.id,
+            'user': self.user.id,
+            'check_in': check_in.isoformat(),
+            'check_out': (check_in + timedelta(days=nights)).isoformat(),
+            'customer_name': 'Guest',
+            'customer_email': email,
+        }
+
+    def test_bulk_create(self):
+        """Test every booking is created and marked as occupied."""
+        payload = [
+            self.booking(self.cottage, 1, 2, 'a@example.com'),
+            self.booking(self.cottage, 3, 2, 'b@example.com'),
+            self.booking(self.other, 1, 4, 'c@example.com'),
+        ]
+
+        res = self.client.post(BULK_BOOKING_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 3)
+        self.assertTrue(all(item['id'] for item in res.data))
+        self.assertEqual(Booking.objects.count(), 3)
+        self.assertEqual(CottageOccupancy.objects.inconsistent(), [])
+        self.assertEqual(
+            sorted(Job.objects.values_list('payload__booking_id', flat=True)),
+            sorted(item['id'] for item in res.data),
+        )
+
+    def test_bulk_create_query_count_does_not_grow(self):
+        """Test the number of queries does not depend on the batch size."""
+        small = [self.booking(self.cottage, 1, 1, 'a@example.com')]
+        large = [
+            self.booking(self.other, day, 1, f'guest{day}@example.com')
+            for day in range(1, 21)
+        ]
+        with CaptureQueriesContext(connection) as small_queries:
+            self.client.post(BULK_BOOKING_URL, small, format='json')
+        with CaptureQueriesContext(connection) as large_queries:
+            res = self.client.post(BULK_BOOKING_URL, large, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(large_queries), len(small_queries))
+
+    def test_conflict_with_stored_booking(self):
+        """Test a booking overlapping a stored one is reported and nothing is created."""
+        Booking.objects.create(
+            cottage=self.cottage,
+            user=self.user,
+            check_in=self.today + timedelta(days=2),
+            check_out=self.today + timedelta(days=4),
+            customer_name='Stored',
+            customer_email='stored@example.com',
+        )
+        payload = [
+            self.booking(self.other, 1, 2, 'a@example.com'),
+            self.booking(self.cottage, 3, 2, 'b@example.com'),
+        ]
+
+        res = self.client.post(BULK_BOOKING_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertEqual(
+            res.data[1]['non_field_errors'],
+            [Booking.CONSTRAINT_MESSAGES['booking_no_overlapping_cottage']]
+        )
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertFalse(Job.objects.exists())
+
+    def test_conflict_within_batch(self):
+        """Test overlapping bookings in the batch blame the later item."""
+        payload = [
+            self.booking(self.cottage, 1, 3, 'a@example.com'),
+            self.booking(self.cottage, 5, 1, 'b@example.com'),
+            self.booking(self.cottage, 2, 1, 'c@example.com'),
+        ]
+
+        res = self.client.post(BULK_BOOKING_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertEqual(res.data[1], {})
+        self.assertEqual(
+            res.data[2]['non_field_errors'],
+            [Booking.BATCH_CONFLICT_MESSAGES['cottage'].format(0)]
+        )
+        self.assertFalse(Booking.objects.exists())
+
+    def test_same_customer_in_two_cottages(self):
+        """Test a customer cannot be in two cottages on the same nights."""
+        payload = [
+            self.booking(self.cottage, 1, 2),
+            self.booking(self.other, 2, 2),
+        ]
+
+        res = self.client.post(BULK_BOOKING_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.data[1]['non_field_errors'],
+            [Booking.BATCH_CONFLICT_MESSAGES['customer'].format(0)]
+        )
+
+    def test_back_to_back_bookings(self):
+        """Test a booking may start on the day the previous one ends."""
+        payload = [
+            self.booking(self.cottage, 1, 2),
+            self.booking(self.cottage, 3, 2),
+        ]
+
+        res = self.client.post(BULK_BOOKING_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_invalid_item(self):
+        """Test field errors are reported per item."""
+        payload = [
+            self.booking(self.cottage, 1, 2),
+            dict(self.booking(self.other, 1, 2, 'b@example.com'), check_out='not-a-date'),
+        ]
+
+        res = self.client.post(BULK_BOOKING_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('check_out', res.data[1])
+
+    @override_settings(BOOKING_BULK_MAX_SIZE=2)
+    def test_batch_too_large(self):
+        """Test batches above the configured size are rejected."""
+        payload = [
+            self.booking(self.cottage, day, 1, f'guest{day}@example.com')
+            for day in range(1, 4)
+        ]
+
+        res = self.client.post(BULK_BOOKING_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Booking.objects.exists())
+
+    def test_auth_required(self):
+        """Test authentication is required to create bookings in bulk."""
+        self.client.force_authenticate(None)
+
+        res = self.client.post(BULK_BOOKING_URL, [self.booking(self.cottage, 1, 2)], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class BookingExportApiTests(TestCase):
+    """Test streaming booking exports."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='finance@example.com',
+            password='testpass123',
+            is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.cottage = create_cottage(self.user, name='Lake', base_capacity=4, price_per_night='100.00')
+        self.other = create_cottage(self.user, name='Forest', base_capacity=4, price_per_night='100.00')
+        self.bookings = [
+            Booking.objects.create(
+                cottage=cottage,
+                user=self.user,
+                check_in=date(2024, month, 1),
+                check_out=date(2024, month, 5),
+                customer_name=f'Guest, {month}',
+                customer_email=f'guest{month}.{cottage.id}@example.com',
+            )
+            for month in (1, 2, 3)
+            for cottage in (self.cottage, self.other)
+        ]
+
+    def export(self, **params):
+        """Return the response and its streamed body."""
+        res = self.client.get(EXPORT_BOOKING_URL, params)
+        body = b''.join(res.streaming_content).decode() if res.streaming else ''
+        return res, body
+
+    def test_export_csv(self):
+        """Test bookings are streamed as CSV in id order."""
+        res, body = self.export()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        self.assertIn('bookings.csv', res['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([int(row['id']) for row in rows], [booking.id for booking in self.bookings])
+        self.assertEqual(rows[0]['customer_name'], 'Guest, 1')
+        self.assertEqual(rows[0]['check_in'], '2024-01-01')
+
+    def test_export_csv_neutralises_formulas(self):
+        """Test text cells a spreadsheet would run as formulas are quoted."""
+        self.bookings[0].customer_name = '=HYPERLINK("http://example.com")'
+        self.bookings[0].save(update_fields=['customer_name'])
+
+        res, body = self.export()
+
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(rows[0]['customer_name'], '\'=HYPERLINK("http://example.com")')
+        self.assertEqual(rows[1]['customer_name'], 'Guest, 1')
+
+    def test_csv_formula_prefixes(self):
+        """Test every formula prefix is quoted and other values kept."""
+        values = ['=1', '+1', '-1', '@A1', '\t1', '\r1', 'a=1', -1, None]
+
+        body = ''.join(csv_lines([{'value': value} for value in values], ['value'], flush_every=10))
+
+        self.assertEqual(
+            [row[0] for row in csv.reader(io.StringIO(body, newline=''))][1:],
+            ["'=1", "'+1", "'-1", "'@A1", "'\t1", "'\r1", 'a=1', '-1', ''],
+        )
+
+    def test_export_ndjson(self):
+        """Test bookings are streamed as one JSON object per line."""
+        res, body = self.export(fmt='ndjson')
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), len(self.bookings))
+        self.assertEqual(rows[0]['cottage_id'], self.cottage.id)
+        self.assertEqual(rows[0]['check_out'], '2024-01-05')
+
+    def test_export_filters(self):
+        """Test the export is limited to a cottage and overlapping dates."""
+        res, body = self.export(fmt='ndjson', cottage=self.other.id, start='2024-01-03', end='2024-02-02')
+
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(
+            [row['id'] for row in rows],
+            [self.bookings[1].id, self.bookings[3].id]
+        )
+
+    def test_export_empty(self):
+        """Test an export without matching bookings has only the header."""
+        res, body = self.export(start='2030-01-01')
+
+        self.assertEqual(body.splitlines(), [','.join(BOOKING_EXPORT_FIELDS)])
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_export_is_chunked(self):
+        """Test rows are sent in chunks rather than one body."""
+        res = self.client.get(EXPORT_BOOKING_URL, {'fmt': 'ndjson'})
+
+        chunks = list(res.streaming_content)
+        self.assertEqual(len(chunks), 3)
+
+    def test_invalid_params(self):
+        """Test an unknown format or reversed dates are rejected."""
+        res = self.client.get(EXPORT_BOOKING_URL, {'fmt': 'xml'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(EXPORT_BOOKING_URL, {'start': '2024-02-01', 'end': '2024-01-01'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_staff_required(self):
+        """Test only staff can export bookings."""
+        self.client.force_authenticate(create_user())
+
+        res = self.client.get(EXPORT_BOOKING_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,114 @@
+"""
+Test resort management commands.
+"""
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, TransactionTestCase
+
+from core.models import Booking, Cottage
+
+
+class BenchmarkCommandTests(TestCase):
+    """Test the benchmark command."""
+
+    def test_availability_search_benchmark(self):
+        """Test availability search benchmark prints one line per size."""
+        out = StringIO()
+
+        call_command('benchmark', 'availability_search', sizes='10,20', stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('cottages=10 free=', lines[0])
+        self.assertIn('queries=2', lines[1])
+
+    def test_token_auth_benchmark(self):
+        """Test token auth benchmark compares both authentication classes."""
+        out = StringIO()
+
+        call_command('benchmark', 'token_auth', sizes='5', stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertIn('authentication=TokenAuthentication queries_per_2_requests=2', lines[0])
+        self.assertIn('authentication=CachedTokenAuthentication queries_per_2_requests=1', lines[1])
+
+    def test_booking_export_benchmark(self):
+        """Test booking export benchmark streams every seeded row."""
+        out = StringIO()
+
+        call_command('benchmark', 'booking_export', sizes='150', stdout=out)
+
+        line = out.getvalue().strip()
+        self.assertIn('rows=150 ', line)
+        self.assertIn('export_peak_kb=', line)
+        self.assertFalse(Booking.objects.exists())
+
+    def test_occupancy_report_benchmark(self):
+        """Test occupancy report benchmark times month and year reports."""
+        out = StringIO()
+
+        call_command('benchmark', 'occupancy_report', sizes='150', stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertIn('bookings=150 nights=300 period=month rows=12', lines[0])
+        self.assertIn('period=year rows=1', lines[1])
+
+    def test_quotes_benchmark(self):
+        """Test quotes benchmark prices every stay and leaves no rates behind."""
+        out = StringIO()
+
+        call_command('benchmark', 'quotes', sizes='50', stdout=out)
+
+        self.assertIn('stays=50 cottages=200 ', out.getvalue())
+        self.assertFalse(Cottage.objects.exists())
+
+    def test_search_benchmark(self):
+        """Test search benchmark times a narrow and a catalogue-wide query."""
+        out = StringIO()
+
+        call_command('benchmark', 'search', sizes='200', stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertIn('cottages=200 q="00012" results=10 ', lines[0])
+        self.assertIn('q="bench cot" results=10 ', lines[1])
+        self.assertFalse(Cottage.objects.exists())
+
+    def test_invalid_sizes(self):
+        """Test benchmark rejects sizes that are not integers."""
+        with self.assertRaises(CommandError):
+            call_command('benchmark', 'availability_search', sizes='ten')
+
+
+class BookingStressTests(TransactionTestCase):
+    """Test parallel booking creation never double-books a cottage."""
+
+    def test_booking_stress(self):
+        """Test parallel creates at one and many cottages leave no overlaps."""
+        out = StringIO()
+
+        call_command('benchmark', 'booking_stress', sizes='4', stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        for line in lines:
+            self.assertIn('double_bookings=0', line)
+        self.assertIn('target=one created=', lines[0])
+        self.assertFalse(Booking.objects.exists())
+        self.assertFalse(Cottage.objects.exists())
+
+
+class AsyncReadsBenchmarkTests(TransactionTestCase):
+    """Test the WSGI and ASGI throughput benchmark."""
+
+    def test_async_reads(self):
+        """Test both servers answer every request."""
+        out = StringIO()
+
+        call_command('benchmark', 'async_reads', sizes='2', stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertIn('server=wsgi requests=200 errors=0', lines[0])
+        self.assertIn('server=asgi requests=200 errors=0', lines[1])
+        self.assertFalse(Cottage.objects.exists())
@@ -0,0 +1,440 @@
+"""
+Tests for the cottage API.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.urls import reverse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.caching import catalogue_version
+from core.models import Amenities, Cottage
+from resort.serializers import CottageSerializer
+
+COTTAGES_URL = reverse('resort:cottage-list')
+
+
+def detail_url(cottage_id):
+    """Create and return a cottage detail URL."""
+    return reverse('resort:cottage-detail', args=[cottage_id])
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    """Create and return a user."""
+    return get_user_model().objects.create_user(
+        email=email,
+        password=password
+    )
+
+
+def create_cottages(user, count, amenities_per_cottage=3):
+    """Create cottages that each have their own amenities."""
+    cottages = []
+    for i in range(count):
+        cottage = Cottage.objects.create(
+            name=f'Cottage {i}',
+            base_capacity=2,
+            price_per_night=Decimal('100.00'),
+            user=user
+        )
+        cottage.amenities.set([
+            Amenities.objects.create(user=user, name=f'Amenity {i}.{j}')
+            for j in range(amenities_per_cottage)
+        ])
+        cottages.append(cottage)
+    return cottages
+
+
+class PublicCottageApiTests(TestCase):
+    """Test unauthenticated API requests for cottages."""
+
+    def setUp(self):
+        # Cached responses outlive the rolled back data of other tests.
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+
+    def test_list_cottages(self):
+        """Test listing cottages with their amenities."""
+        create_cottages(self.user, 2)
+
+        res = self.client.get(COTTAGES_URL)
+
+        cottages = Cottage.objects.order_by('-name', '-id')
+        serializer = CottageSerializer(cottages, many=True)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_retrieve_cottage(self):
+        """Test retrieving a cottage with its amenities."""
+        cottage = create_cottages(self.user, 1)[0]
+
+        res = self.client.get(detail_url(cottage.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, CottageSerializer(cottage).data)
+        self.assertEqual(len(res.data['amenities']), 3)
+
+
+class CottageFilterTests(TestCase):
+    """Test filtering the cottage list."""
+
+    def setUp(self):
+        # Cached responses outlive the rolled back data of other tests.
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.sauna = Amenities.objects.create(user=self.user, name='Sauna')
+        self.wifi = Amenities.objects.create(user=self.user, name='Wi-Fi')
+        self.lake = Cottage.objects.create(
+            name='Lake', base_capacity=2, price_per_night=Decimal('100.00'), user=self.user
+        )
+        self.lake.amenities.set([self.sauna, self.wifi])
+        self.forest = Cottage.objects.create(
+            name='Forest', base_capacity=2, price_per_night=Decimal('100.00'), user=self.user
+        )
+        self.forest.amenities.set([self.wifi])
+        self.villa = Cottage.objects.create(
+            name='Villa', category='luxury', base_capacity=2, price_per_night=Decimal('300.00'), user=self.user
+        )
+        self.villa.amenities.set([self.sauna, self.wifi])
+
+    def listed(self, params):
+        res = self.client.get(COTTAGES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [cottage['id'] for cottage in res.data['results']]
+
+    def test_filter_by_amenities(self):
+        """Test only cottages offering every requested amenity are listed."""
+        self.assertEqual(
+            self.listed({'amenities': f'{self.sauna.id},{self.wifi.id}'}),
+            [self.villa.id, self.lake.id],
+        )
+        self.assertEqual(len(self.listed({'amenities': str(self.wifi.id)})), 3)
+
+    def test_filter_by_category(self):
+        """Test only cottages of the category are listed."""
+        self.assertEqual(self.listed({'category': 'standard'}), [self.lake.id, self.forest.id])
+
+    def test_filter_by_amenities_and_category(self):
+        """Test both filters apply together."""
+        params = {'amenities': str(self.sauna.id), 'category': 'standard'}
+
+        self.assertEqual(self.listed(params), [self.lake.id])
+
+    def test_filter_ignores_assigned_only(self):
+        """Test the amenities-only assigned_only flag does not break the list."""
+        self.assertEqual(len(self.listed({'assigned_only': 1})), 3)
+
+    def test_invalid_amenities(self):
+        """Test non-numeric amenity ids are rejected."""
+        res = self.client.get(COTTAGES_URL, {'amenities': 'sauna'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_amenity_ids_not_exposed(self):
+        """Test the denormalized ids are not part of the API."""
+        res = self.client.get(detail_url(self.lake.id))
+
+        self.assertNotIn('amenity_ids', res.data)
+
+
+class CottageSearchTests(TestCase):
+    """Test searching cottages by party size and price."""
+
+    def setUp(self):
+        # Cached responses outlive the rolled back data of other tests.
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.cabin = Cottage.objects.create(
+            name='Cabin', base_capacity=2, price_per_night=Decimal('80.00'), user=self.user
+        )
+        self.lake = Cottage.objects.create(
+            name='Lake', base_capacity=4, price_per_night=Decimal('120.00'), user=self.user
+        )
+        self.forest = Cottage.objects.create(
+            name='Forest', base_capacity=6, price_per_night=Decimal('120.00'), user=self.user
+        )
+        self.villa = Cottage.objects.create(
+            name='Villa', category='luxury', base_capacity=8, price_per_night=Decimal('300.00'), user=self.user
+        )
+
+    def listed(self, params):
+        res = self.client.get(COTTAGES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [cottage['id'] for cottage in res.data['results']]
+
+    def test_filter_by_min_guests(self):
+        """Test only cottages fitting the party are listed."""
+        self.assertEqual(self.listed({'min_guests': 5}), [self.villa.id, self.forest.id])
+
+    def test_filter_by_price_range(self):
+        """Test the price bounds are inclusive."""
+        params = {'min_price': '80.00', 'max_price': '120'}
+
+        self.assertEqual(self.listed(params), [self.lake.id, self.forest.id, self.cabin.id])
+
+    def test_search_with_category(self):
+        """Test party size, price and category filters apply together."""
+        params = {'category': 'standard', 'min_guests': 3, 'max_price': 200}
+
+        self.assertEqual(self.listed(params), [self.lake.id, self.forest.id])
+
+    def test_sort_by_price(self):
+        """Test cottages are sorted by price with ties broken by id."""
+        self.assertEqual(
+            self.listed({'sort': 'price'}),
+            [self.cabin.id, self.lake.id, self.forest.id, self.villa.id],
+        )
+        self.assertEqual(
+            self.listed({'sort': '-price'}),
+            [self.villa.id, self.forest.id, self.lake.id, self.cabin.id],
+        )
+
+    def test_sort_by_price_pages(self):
+        """Test next links continue the price order from the last cottage."""
+        params = {'sort': 'price', 'min_guests': 2, 'page_size': 1}
+        seen = []
+
+        res = self.client.get(COTTAGES_URL, params)
+        while True:
+            seen += [cottage['id'] for cottage in res.data['results']]
+            if not res.data['next']:
+                break
+            self.assertIn('sort=price', res.data['next'])
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(seen, [self.cabin.id, self.lake.id, self.forest.id, self.villa.id])
+
+    def test_price_page_query_uses_keyset(self):
+        """Test a later page filters on the price of the last cottage."""
+        res = self.client.get(COTTAGES_URL, {'sort': 'price', 'page_size': 2})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(res.data['next'])
+
+        sql = queries.captured_queries[0]['sql']
+        self.assertIn('"price_per_night" > 120', sql.replace('::numeric', ''))
+        self.assertNotIn('OFFSET', sql)
+
+    def test_invalid_price_range(self):
+        """Test a maximum price below the minimum is rejected."""
+        res = self.client.get(COTTAGES_URL, {'min_price': 200, 'max_price': 100})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('max_price', res.data)
+
+    def test_invalid_search_params(self):
+        """Test malformed search parameters are rejected."""
+        for params in ({'min_guests': 0}, {'min_price': 'cheap'}, {'sort': 'rating'}):
+            res = self.client.get(COTTAGES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CottageQueryBudgetTests(TestCase):
+    """Test cottage endpoints use a fixed number of queries."""
+
+    def setUp(self):
+        # Cached responses outlive the rolled back data of other tests.
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+
+    def test_list_query_count_does_not_grow(self):
+        """Test listing cottages prefetches amenities for the whole page."""
+        create_cottages(self.user, 1)
+        with self.assertNumQueries(2):
+            self.client.get(COTTAGES_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_cottages(self.user, 20)
+        with self.assertNumQueries(2):
+            res = self.client.get(COTTAGES_URL)
+
+        self.assertEqual(len(res.data['results']), 21)
+
+    def test_retrieve_query_count(self):
+        """Test retrieving a cottage loads its amenities in one query."""
+        cottage = create_cottages(self.user, 1, amenities_per_cottage=10)[0]
+
+        with self.assertNumQueries(2):
+            self.client.get(detail_url(cottage.id))
+
+
+class AdminCottageApiTests(TestCase):
+    """Test admin API requests for cottages."""
+
+    def setUp(self):
+        # Cached responses outlive the rolled back data of other tests.
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='admin@example.com',
+            password='testpass123',
+            is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_create_cottage_with_amenities(self):
+        """Test creating a cottage counts its amenities in total capacity."""
+        payload = {
+            'name': 'Family House',
+            'base_capacity': 4,
+            'price_per_night': '150.00',
+            'user': self.user.id,
+            'amenities': [
+                {'name': 'Sofa bed', 'additional_capacity': 2, 'user': self.user.id},
+                {'name': 'Wi-Fi', 'user': self.user.id},
+            ],
+        }
+
+        res = self.client.post(COTTAGES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        cottage = Cottage.objects.get(id=res.data['id'])
+        self.assertEqual(cottage.total_capacity, 6)
+        self.assertEqual(res.data['total_capacity'], 6)
+        self.assertEqual(cottage.amenities.count(), 2)
+        self.assertEqual(cottage.amenity_ids, sorted(cottage.amenities.values_list('id', flat=True)))
+
+    def test_create_cottage_reuses_existing_amenities(self):
+        """Test amenities are matched by name and duplicates attached once."""
+        sauna = Amenities.objects.create(user=self.user, name='Sauna', additional_capacity=1)
+        payload = {
+            'name': 'Spa House',
+            'base_capacity': 2,
+            'price_per_night': '150.00',
+            'user': self.user.id,
+            'amenities': [
+                {'name': 'Sauna', 'additional_capacity': 5, 'user': self.user.id},
+                {'name': 'Bunk bed', 'additional_capacity': 2, 'user': self.user.id},
+                {'name': 'Bunk bed', 'additional_capacity': 2, 'user': self.user.id},
+            ],
+        }
+
+        res = self.client.post(COTTAGES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        cottage = Cottage.objects.get(id=res.data['id'])
+        self.assertEqual(cottage.total_capacity, 5)
+        self.assertEqual(cottage.calculate_total_capacity(), 5)
+        self.assertIn(sauna, cottage.amenities.all())
+        self.assertEqual(Amenities.objects.filter(name='Bunk bed').count(), 1)
+
+    def test_create_cottage_query_count_does_not_grow(self):
+        """Test attaching amenities takes the same queries for any number."""
+        def payload(name, count):
+            return {
+                'name': name,
+                'base_capacity': 2,
+                'price_per_night': '150.00',
+                'user': self.user.id,
+                'amenities': [
+                    {'name': f'{name} amenity {i}', 'user': self.user.id}
+                    for i in range(count)
+                ],
+            }
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(COTTAGES_URL, payload('Small', 1), format='json')
+        with CaptureQueriesContext(connection) as large:
+            res = self.client.post(COTTAGES_URL, payload('Large', 20), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['amenities']), 20)
+        self.assertEqual(len(large), len(small))
+
+
+class CottageResponseCacheTests(TestCase):
+    """Test cached cottage reads."""
+
+    def setUp(self):
+        # Cached responses outlive the rolled back data of other tests.
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.cottage = create_cottages(self.user, 1)[0]
+
+    def test_repeated_read_served_from_cache(self):
+        """Test a repeated read returns the same ETag without queries."""
+        first = self.client.get(COTTAGES_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(COTTAGES_URL)
+
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertTrue(first['ETag'].startswith('"'))
+
+    def test_if_none_match_returns_not_modified(self):
+        """Test a matching If-None-Match returns 304 without a body."""
+        first = self.client.get(detail_url(self.cottage.id))
+
+        res = self.client.get(detail_url(self.cottage.id), HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], first['ETag'])
+        self.assertFalse(res.content)
+
+    @override_settings(ALLOWED_HOSTS=['a.example.com', 'b.example.com'])
+    def test_keyed_by_scheme_and_host(self):
+        """Test cached pages keep the links of the host they were asked on."""
+        create_cottages(self.user, 1)
+        params = {'page_size': 1}
+
+        first = self.client.get(COTTAGES_URL, params, HTTP_HOST='a.example.com')
+        other_host = self.client.get(COTTAGES_URL, params, HTTP_HOST='b.example.com')
+        other_scheme = self.client.get(COTTAGES_URL, params, HTTP_HOST='a.example.com', secure=True)
+
+        self.assertTrue(first.data['next'].startswith('http://a.example.com/'))
+        self.assertTrue(other_host.data['next'].startswith('http://b.example.com/'))
+        self.assertTrue(other_scheme.data['next'].startswith('https://a.example.com/'))
+
+    def test_cottage_write_invalidates(self):
+        """Test changing a cottage changes the cached response."""
+        first = self.client.get(detail_url(self.cottage.id))
+        self.cottage.name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cottage.save()
+
+        res = self.client.get(detail_url(self.cottage.id), HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['name'], 'Renamed')
+        self.assertNotEqual(res['ETag'], first['ETag'])
+
+    def test_amenity_write_invalidates(self):
+        """Test changing an amenity changes the cached cottage list."""
+        self.client.get(COTTAGES_URL)
+        amenity = self.cottage.amenities.first()
+        amenity.additional_capacity = 5
+        with self.captureOnCommitCallbacks(execute=True):
+            amenity.save()
+
+        res = self.client.get(COTTAGES_URL)
+
+        self.assertEqual(res.data['results'][0]['total_capacity'], 7)
+
+    def test_version_bumped_after_commit(self):
+        """Test reads during an open write still use the old version."""
+        first = self.client.get(COTTAGES_URL)
+        version = catalogue_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.cottage.name = 'Renamed'
+                self.cottage.save()
+                self.assertEqual(catalogue_version(), version)
+                self.assertEqual(self.client.get(COTTAGES_URL)['ETag'], first['ETag'])
+
+        self.assertNotEqual(catalogue_version(), version)
+        res = self.client.get(COTTAGES_URL)
+        self.assertEqual(res.data['results'][0]['name'], 'Renamed')
@@ -0,0 +1,126 @@
+"""
+Tests for the price quote API.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Cottage, SeasonalRate, WeekdayRate
+from resort.pricing import quote
+
+QUOTE_URL = reverse('resort:quote')
+
+
+class QuoteTests(TestCase):
+    """Test pricing stays with seasonal and weekday rates."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        self.lake = Cottage.objects.create(
+            name='Lake', base_capacity=2, price_per_night=Decimal('100.50'), user=self.user
+        )
+        self.forest = Cottage.objects.create(
+            name='Forest', base_capacity=2, price_per_night=Decimal('80.00'), user=self.user
+        )
+        SeasonalRate.objects.create(
+            cottage=self.lake,
+            start=date(2025, 7, 1),
+            end=date(2025, 9, 1),
+            price_per_night=Decimal('150.00'),
+        )
+        # 2025-06-28 is a Saturday.
+        WeekdayRate.objects.create(cottage=self.lake, weekday=5, adjustment_percent=15)
+        WeekdayRate.objects.create(cottage=self.forest, weekday=0, adjustment_percent=-10)
+        self.client = APIClient()
+
+    def test_base_rate(self):
+        """Test nights without rates cost the cottage price."""
+        totals = quote([self.lake.id], [date(2025, 6, 23)], [date(2025, 6, 25)])
+
+        self.assertEqual(totals, [Decimal('201.00')])
+
+    def test_seasonal_and_weekday_rates(self):
+        """Test each night takes its season's price adjusted for its weekday."""
+        totals = quote(
+            [self.lake.id, self.lake.id, self.forest.id],
+            [date(2025, 6, 28), date(2025, 8, 30), date(2025, 6, 29)],
+            [date(2025, 7, 3), date(2025, 9, 2), date(2025, 7, 1)],
+        )
+
+        self.assertEqual(totals, [
+            # 115.575 rounded up, two base nights and two seasonal nights.
+            Decimal('115.58') + 2 * Decimal('100.50') + 2 * Decimal('150.00'),
+            # Saturday and Sunday in season, then Monday after it.
+            Decimal('172.50') + Decimal('150.00') + Decimal('100.50'),
+            # Sunday, then Monday at 10% off.
+            Decimal('80.00') + Decimal('72.00'),
+        ])
+
+    def test_quote_without_stays(self):
+        """Test quoting nothing returns nothing."""
+        self.assertEqual(quote([], [], []), [])
+
+    def test_missing_cottage(self):
+        """Test quoting a missing cottage raises DoesNotExist."""
+        with self.assertRaises(Cottage.DoesNotExist):
+            quote([self.forest.id + 100], [date(2025, 6, 1)], [date(2025, 6, 2)])
+
+    def test_quote_api(self):
+        """Test the API returns nights and exact totals in request order."""
+        payload = [
+            {'cottage': self.forest.id, 'check_in': '2025-06-29', 'check_out': '2025-07-01'},
+            {'cottage': self.lake.id, 'check_in': '2025-06-23', 'check_out': '2025-06-25'},
+        ]
+
+        with self.assertNumQueries(4):
+            res = self.client.post(QUOTE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['nights'], 2)
+        self.assertEqual(res.data[0]['total'], '152.00')
+        self.assertEqual(res.data[1]['cottage'], self.lake.id)
+        self.assertEqual(res.data[1]['total'], '201.00')
+
+    def test_quote_api_invalid_stays(self):
+        """Test invalid stays are reported by position."""
+        payload = [
+            {'cottage': self.lake.id, 'check_in': '2025-06-23', 'check_out': '2025-06-25'},
+            {'cottage': self.lake.id, 'check_in': '2025-06-25', 'check_out': '2025-06-23'},
+            {'cottage': self.forest.id + 100, 'check_in': '2025-06-23', 'check_out': '2025-06-25'},
+        ]
+
+        res = self.client.post(QUOTE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('check_out', res.data[1])
+        self.assertIn('cottage', res.data[2])
+
+    @override_settings(QUOTE_MAX_STAYS=1)
+    def test_quote_api_too_many_stays(self):
+        """Test requests with more than QUOTE_MAX_STAYS stays are rejected."""
+        stay = {'cottage': self.lake.id, 'check_in': '2025-06-23', 'check_out': '2025-06-25'}
+
+        res = self.client.post(QUOTE_URL, [stay, stay], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(QUOTE_MAX_SPAN_DAYS=30)
+    def test_quote_api_span_too_long(self):
+        """Test stays spread over more than QUOTE_MAX_SPAN_DAYS are rejected."""
+        payload = [
+            {'cottage': self.lake.id, 'check_in': '2025-06-01', 'check_out': '2025-06-02'},
+            {'cottage': self.lake.id, 'check_in': '2025-07-01', 'check_out': '2025-07-02'},
+        ]
+
+        res = self.client.post(QUOTE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
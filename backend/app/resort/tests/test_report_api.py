@@ -0,0 +1,112 @@
+"""
+Tests for the occupancy report API.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Booking, Cottage
+
+REPORT_URL = reverse('resort:occupancy-report')
+
+
+class OccupancyReportApiTests(TestCase):
+    """Test occupancy and revenue reports."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='admin@example.com',
+            password='testpass123',
+            is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.lake = Cottage.objects.create(
+            name='Lake', base_capacity=2, price_per_night=Decimal('100.00'), user=self.user
+        )
+        self.forest = Cottage.objects.create(
+            name='Forest', base_capacity=2, price_per_night=Decimal('50.00'), user=self.user
+        )
+        for cottage, check_in, check_out in (
+                (self.lake, date(2024, 1, 30), date(2024, 2, 3)),
+                (self.forest, date(2024, 2, 10), date(2024, 2, 12)),
+        ):
+            Booking.objects.create(
+                cottage=cottage,
+                user=self.user,
+                check_in=check_in,
+                check_out=check_out,
+                customer_name='Guest',
+                customer_email=f'guest{cottage.id}@example.com',
+            )
+
+    def test_monthly_report(self):
+        """Test nights, rate and revenue per month over all cottages."""
+        res = self.client.get(REPORT_URL, {'start': '2024-01-01', 'end': '2024-04-01'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['cottages'], 2)
+        january, february, march = res.data['results']
+        self.assertEqual(january['period'], date(2024, 1, 1))
+        self.assertEqual(january['occupied_nights'], 2)
+        self.assertEqual(january['available_nights'], 62)
+        self.assertEqual(january['revenue'], Decimal('200.00'))
+        self.assertEqual(february['occupied_nights'], 4)
+        self.assertEqual(february['available_nights'], 58)
+        self.assertEqual(february['occupancy_rate'], round(4 / 58, 4))
+        self.assertEqual(february['revenue'], Decimal('300.00'))
+        self.assertEqual(march['occupied_nights'], 0)
+        self.assertEqual(march['revenue'], Decimal('0.00'))
+
+    def test_yearly_report_for_cottage(self):
+        """Test a partial year for one cottage."""
+        res = self.client.get(REPORT_URL, {
+            'period': 'year', 'start': '2024-01-15', 'end': '2024-02-15', 'cottage': self.forest.id,
+        })
+
+        self.assertEqual(res.data['results'], [{
+            'period': date(2024, 1, 1),
+            'occupied_nights': 2,
+            'available_nights': 31,
+            'occupancy_rate': round(2 / 31, 4),
+            'revenue': Decimal('100.00'),
+        }])
+
+    def test_daily_report(self):
+        """Test day buckets cover every day of the range."""
+        res = self.client.get(REPORT_URL, {'period': 'day', 'start': '2024-02-01', 'end': '2024-02-04'})
+
+        self.assertEqual(
+            [row['occupied_nights'] for row in res.data['results']],
+            [1, 1, 0]
+        )
+
+    def test_defaults_to_current_year_by_month(self):
+        """Test the report covers the current year by month by default."""
+        res = self.client.get(REPORT_URL)
+
+        self.assertEqual(res.data['period'], 'month')
+        self.assertEqual(len(res.data['results']), 12)
+
+    def test_invalid_params(self):
+        """Test reversed dates and unknown cottages are rejected."""
+        res = self.client.get(REPORT_URL, {'start': '2024-02-01', 'end': '2024-01-01'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(REPORT_URL, {'cottage': 0})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_staff_required(self):
+        """Test only staff can read reports."""
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(email='user@example.com', password='testpass123')
+        )
+
+        res = self.client.get(REPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
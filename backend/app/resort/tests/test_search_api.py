@@ -0,0 +1,125 @@
+"""
+Tests for the cottage and amenity search API.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Amenities, Cottage
+
+SEARCH_URL = reverse('resort:search')
+
+
+class SearchTests(TestCase):
+    """Test typeahead search over cottage and amenity names."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        self.lake = Cottage.objects.create(
+            name='Lake House', base_capacity=2, price_per_night=Decimal('100.00'), user=self.user
+        )
+        self.lakeside = Cottage.objects.create(
+            name='Lakeside Villa', category='luxury', base_capacity=4,
+            price_per_night=Decimal('300.00'), user=self.user
+        )
+        self.forest = Cottage.objects.create(
+            name='Forest Cabin', base_capacity=2, price_per_night=Decimal('80.00'), user=self.user
+        )
+        self.sauna = Amenities.objects.create(user=self.user, name='Lake sauna')
+        self.wifi = Amenities.objects.create(user=self.user, name='Wi-Fi')
+        self.client = APIClient()
+
+    def search(self, params):
+        res = self.client.get(SEARCH_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_prefix_search(self):
+        """Test partial words find cottages and amenities."""
+        data = self.search({'q': 'lak'})
+
+        self.assertEqual(
+            [cottage['id'] for cottage in data['cottages']],
+            [self.lake.id, self.lakeside.id],
+        )
+        self.assertEqual([amenity['id'] for amenity in data['amenities']], [self.sauna.id])
+        self.assertIn('rank', data['cottages'][0])
+
+    def test_every_word_must_match(self):
+        """Test each typed word narrows the results."""
+        data = self.search({'q': 'lake vil'})
+
+        self.assertEqual([cottage['id'] for cottage in data['cottages']], [self.lakeside.id])
+        self.assertEqual(data['amenities'], [])
+
+    def test_search_by_category(self):
+        """Test the category of a cottage is searchable."""
+        data = self.search({'q': 'lux'})
+
+        self.assertEqual([cottage['id'] for cottage in data['cottages']], [self.lakeside.id])
+
+    def test_better_matches_first(self):
+        """Test cottages matching more of the query rank higher."""
+        Cottage.objects.create(
+            name='Lake Lake', base_capacity=2, price_per_night=Decimal('90.00'), user=self.user
+        )
+
+        data = self.search({'q': 'lake'})
+
+        self.assertEqual(data['cottages'][0]['name'], 'Lake Lake')
+
+    def test_renamed_cottage(self):
+        """Test the search follows name changes, including bulk updates."""
+        self.forest.name = 'Pine Cabin'
+        self.forest.save()
+        Cottage.objects.filter(pk=self.lake.pk).update(name='Birch House')
+
+        self.assertEqual(self.search({'q': 'forest'})['cottages'], [])
+        self.assertEqual(
+            [cottage['id'] for cottage in self.search({'q': 'pine'})['cottages']],
+            [self.forest.id],
+        )
+        self.assertEqual(
+            [cottage['id'] for cottage in self.search({'q': 'birch'})['cottages']],
+            [self.lake.id],
+        )
+
+    def test_bulk_created_amenities(self):
+        """Test amenities inserted in bulk are searchable."""
+        Amenities.objects.bulk_create([Amenities(user=self.user, name='Hot tub')])
+
+        data = self.search({'q': 'tub'})
+
+        self.assertEqual([amenity['name'] for amenity in data['amenities']], ['Hot tub'])
+
+    def test_limit(self):
+        """Test limit caps the results of each kind."""
+        data = self.search({'q': 'l', 'limit': 1})
+
+        self.assertEqual(len(data['cottages']), 1)
+        self.assertEqual(len(data['amenities']), 1)
+
+    def test_query_operators_ignored(self):
+        """Test tsquery syntax in the input is treated as plain text."""
+        data = self.search({'q': "lake & !'villa':* |"})
+
+        self.assertEqual([cottage['id'] for cottage in data['cottages']], [self.lakeside.id])
+
+    def test_no_words(self):
+        """Test input without letters or digits finds nothing."""
+        data = self.search({'q': '&!'})
+
+        self.assertEqual(data, {'cottages': [], 'amenities': []})
+
+    def test_query_required(self):
+        """Test the search text is required."""
+        res = self.client.get(SEARCH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -7,7 +7,7 @@ from django.urls import (
 )
 from rest_framework.routers import DefaultRouter
 
-from resort import views
+from resort import async_views, views
 
 router = DefaultRouter()
 router.register('cottages', views.CottageViewSet)
@@ -19,4 +19,13 @@ app_name = 'resort'
 urlpatterns = [
     path('', include(router.urls)),
     path('check-availability/', views.CheckAvailabilityView.as_view(), name='check-availability'),
+    path('search-availability/', views.AvailabilitySearchView.as_view(), name='search-availability'),
+    path('quotes/', views.QuoteView.as_view(), name='quote'),
+    path('search/', views.SearchView.as_view(), name='search'),
+    path('reports/occupancy/', views.OccupancyReportView.as_view(), name='occupancy-report'),
+    path('async/cottages/', async_views.cottage_list, name='async-cottage-list'),
+    path('async/cottages/<int:pk>/', async_views.cottage_detail, name='async-cottage-detail'),
+    path('async/amenities/', async_views.amenity_list, name='async-amenities-list'),
+    path('async/booking/', async_views.booking_list, name='async-booking-list'),
+    path('async/check-availability/', async_views.check_availability, name='async-check-availability'),
 ]
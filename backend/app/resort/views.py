@@ -1,35 +1,73 @@
 """
 Views for resort APIs.
 """
+from datetime import timedelta
+
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
     OpenApiParameter,
     OpenApiTypes,
 )
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Abs
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework import (
     viewsets,
     mixins,
     status, generics,
 )
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 
+from core.jobs import enqueue, enqueue_many
 from core.models import (
     Cottage,
     Amenities,
     Booking,
+    CottageOccupancy,
 )
+from core.routing import ReplicaReadMixin
 from resort import serializers
+from resort.caching import CachedReadMixin
+from resort.exports import BOOKING_EXPORT_FIELDS, stream_queryset
+from resort.reports import occupancy_report
+from resort.pagination import KeysetPagination
+from resort.pricing import quote
+from resort.search import search
+from user.authentication import CachedTokenAuthentication
 
 
-class CottageViewSet(viewsets.ModelViewSet):
+@extend_schema_view(
+    list=extend_schema(
+        parameters=[
+            serializers.CottageSearchSerializer,
+            OpenApiParameter(
+                'amenities',
+                OpenApiTypes.STR,
+                description='Comma-separated list of amenity IDs the cottages must all offer',
+            ),
+        ]
+    )
+)
+class CottageViewSet(ReplicaReadMixin, CachedReadMixin, viewsets.ModelViewSet):
     """Manage cottages in the database."""
+    replica_pin_scopes = ('catalogue',)
     serializer_class = serializers.CottageSerializer
     queryset = Cottage.objects.all()
     permission_classes = (AllowAny,)
+    pagination_class = KeysetPagination
+    ordering = ('-name', '-id')
+    orderings = {
+        '-name': ordering,
+        'price': ('price_per_night', 'id'),
+        '-price': ('-price_per_night', '-id'),
+    }
 
     def get_permissions(self):
         """Set permissions based on the action."""
@@ -39,33 +77,41 @@ class CottageViewSet(viewsets.ModelViewSet):
             permission_classes = [AllowAny]
         return [permission() for permission in permission_classes]
 
+    def get_search(self):
+        """Return the validated search parameters of the request."""
+        if not hasattr(self, '_search'):
+            params = serializers.CottageSearchSerializer(data=self.request.query_params)
+            params.is_valid(raise_exception=True)
+            self._search = params.validated_data
+        return self._search
+
+    def get_ordering(self):
+        """Return the sort key of the requested order."""
+        return self.orderings[self.get_search()['sort']]
+
     def _params_to_ints(self, qs):
         """Convert a list of strings to integers."""
-        return [int(str_id) for str_id in qs.split(',')]
+        try:
+            return [int(str_id) for str_id in qs.split(',')]
+        except ValueError:
+            raise ValidationError({'amenities': 'Expected a comma-separated list of amenity IDs.'})
 
-    @extend_schema(
-        parameters=[
-            OpenApiParameter(
-                'amenities',
-                OpenApiTypes.STR,
-                description='Comma-separated list of amenities IDs to filter',
-            ),
-            OpenApiParameter(
-                'category',
-                OpenApiTypes.STR,
-                description='Category of the cottage (e.g. standard, luxury)',
-            ),
-        ]
-    )
     def get_queryset(self):
-        """Filter queryset for user."""
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
-        )
-        queryset = self.queryset
-        if assigned_only:
-            queryset = queryset.filter(cottage__isnull=False)
-        return queryset.order_by('-name').distinct()
+        """Filter cottages by category, amenities, party size and price."""
+        amenities = self.request.query_params.get('amenities')
+        search = self.get_search()
+        queryset = self.queryset.prefetch_related('amenities')
+        if amenities:
+            queryset = queryset.with_amenities(self._params_to_ints(amenities))
+        if 'category' in search:
+            queryset = queryset.filter(category=search['category'])
+        if 'min_guests' in search:
+            queryset = queryset.filter(total_capacity__gte=search['min_guests'])
+        if 'min_price' in search:
+            queryset = queryset.filter(price_per_night__gte=search['min_price'])
+        if 'max_price' in search:
+            queryset = queryset.filter(price_per_night__lte=search['max_price'])
+        return queryset.order_by(*self.get_ordering())
 
 
 class BaseCottageAttrViewSet(mixins.UpdateModelMixin,
@@ -73,8 +119,10 @@ class BaseCottageAttrViewSet(mixins.UpdateModelMixin,
                              mixins.ListModelMixin,
                              viewsets.GenericViewSet):
     """Base viewset for cottage attributes."""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (AllowAny,)
+    pagination_class = KeysetPagination
+    ordering = ('-name', '-id')
 
     def get_permissions(self):
         """Set permissions based on the action."""
@@ -92,30 +140,39 @@ class BaseCottageAttrViewSet(mixins.UpdateModelMixin,
         queryset = self.queryset
         if assigned_only:
             queryset = queryset.filter(cottage__isnull=False)
-        return queryset.order_by('-name').distinct()
+        return queryset.order_by(*self.ordering).distinct()
 
 
-class AmenitiesViewSet(BaseCottageAttrViewSet,
+class AmenitiesViewSet(ReplicaReadMixin,
+                       CachedReadMixin,
+                       BaseCottageAttrViewSet,
+                       mixins.RetrieveModelMixin,
                        mixins.CreateModelMixin):
     """Manage amenities in the database."""
     serializer_class = serializers.AmenitiesSerializer
     queryset = Amenities.objects.all()
+    replica_pin_scopes = ('catalogue',)
 
 
-class BookingViewSet(mixins.UpdateModelMixin,
+class BookingViewSet(ReplicaReadMixin,
+                     mixins.UpdateModelMixin,
                      mixins.DestroyModelMixin,
                      mixins.ListModelMixin,
                      viewsets.GenericViewSet,
                      mixins.CreateModelMixin):
     """Manage booking in the database."""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     serializer_class = serializers.BookingSerializer
     queryset = Booking.objects.all()
+    pagination_class = KeysetPagination
+    ordering = ('-check_in', '-id')
 
     def get_permissions(self):
         """Set permissions based on the action."""
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'bulk', 'update', 'partial_update', 'destroy']:
             permission_classes = [IsAuthenticated]
+        elif self.action == 'export':
+            permission_classes = [IsAdminUser]
         else:
             permission_classes = [AllowAny]
         return [permission() for permission in permission_classes]
@@ -128,34 +185,278 @@ class BookingViewSet(mixins.UpdateModelMixin,
         queryset = self.queryset
         if assigned_only:
             queryset = queryset.filter(cottage__isnull=False)
-        return queryset.order_by('-check_in').distinct()
+        return queryset.order_by(*self.ordering).distinct()
 
+    def perform_create(self, serializer):
+        """Create the booking while holding the cottage lock.
 
-class CheckAvailabilityView(generics.GenericAPIView):
-    serializer_class = serializers.AvailabilityCheckSerializer
+        Confirmation is left to a background job queued with the booking.
+        """
+        with transaction.atomic():
+            Cottage.objects.lock([serializer.validated_data['cottage'].pk])
+            booking = serializer.save()
+            enqueue('confirm_booking', booking_id=booking.pk)
 
-    def post(self, request, *args, **kwargs):
-        serializer = self.get_serializer(data=request.data)
+    def perform_update(self, serializer):
+        """Update the booking while holding the cottage locks."""
+        cottage_ids = [serializer.instance.cottage_id]
+        if 'cottage' in serializer.validated_data:
+            cottage_ids.append(serializer.validated_data['cottage'].pk)
+        with transaction.atomic():
+            Cottage.objects.lock(cottage_ids)
+            serializer.save()
+
+    @extend_schema(
+        request=serializers.BookingSerializer(many=True),
+        responses=serializers.BookingSerializer(many=True),
+    )
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Create a list of bookings, all of them or none."""
+        if isinstance(request.data, list) and len(request.data) > settings.BOOKING_BULK_MAX_SIZE:
+            return Response(
+                {'detail': f'At most {settings.BOOKING_BULK_MAX_SIZE} bookings can be created at once.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        serializer = self.get_serializer(data=request.data, many=True)
         serializer.is_valid(raise_exception=True)
-        cottage_id = serializer.validated_data['cottage']
-        check_in = serializer.validated_data['check_in']
-        check_out = serializer.validated_data['check_out']
 
-        cottage = Cottage.objects.get(id=cottage_id)
+        with transaction.atomic():
+            bookings = Booking.objects.bulk_book(
+                [Booking(**data) for data in serializer.validated_data]
+            )
+            enqueue_many('confirm_booking', [{'booking_id': booking.pk} for booking in bookings])
+        return Response(
+            self.get_serializer(bookings, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @extend_schema(
+        parameters=[serializers.BookingExportSerializer],
+        responses={(200, 'text/csv'): OpenApiTypes.STR, (200, 'application/x-ndjson'): OpenApiTypes.STR},
+    )
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream bookings as CSV or NDJSON, optionally for a cottage and dates."""
+        params = serializers.BookingExportSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        filters = params.validated_data
 
-        overlapping_bookings = Booking.objects.filter(
+        queryset = Booking.objects.order_by('id')
+        if 'cottage' in filters:
+            queryset = queryset.filter(cottage_id=filters['cottage'])
+        if 'start' in filters:
+            queryset = queryset.filter(check_out__gt=filters['start'])
+        if 'end' in filters:
+            queryset = queryset.filter(check_in__lt=filters['end'])
+
+        return stream_queryset(
+            queryset,
+            BOOKING_EXPORT_FIELDS,
+            filters['fmt'],
+            'bookings',
+            settings.EXPORT_CHUNK_SIZE,
+        )
+
+
+def cottage_availability(cottage_id, check_in, check_out):
+    """Return whether the cottage is free for the dates."""
+    available = CottageOccupancy.objects.is_available(cottage_id, check_in, check_out)
+    if available is None:
+        cottage = get_object_or_404(Cottage, id=cottage_id)
+        available = not Booking.objects.filter(
             cottage=cottage,
             check_in__lt=check_out,
             check_out__gt=check_in
+        ).exists()
+    return available
+
+
+def availability_data(available):
+    """Return the availability response body."""
+    if not available:
+        return {
+            'available': False,
+            'message': 'The cottage is not available for the selected dates.'
+        }
+    return {
+        'available': True,
+        'message': 'The cottage is available for the selected dates.'
+    }
+
+
+def availability_suggestions(cottage_id, check_in, check_out, similar=False):
+    """Return the nearest free stays of the same length, and similar cottages.
+
+    Similar cottages are of the same category, fit as many guests and are
+    free for the requested dates; they are only looked up when asked for.
+    """
+    search = timedelta(days=settings.AVAILABILITY_SUGGESTION_DAYS)
+    before, after = Booking.objects.nearest_free_windows(
+        cottage_id,
+        check_in,
+        check_out,
+        earliest=max(check_in - search, timezone.localdate()),
+        latest=check_out + search,
+    )
+    nights = check_out - check_in
+    data = {
+        'alternatives': {
+            name: None if start is None else {'check_in': start, 'check_out': start + nights}
+            for name, start in (('before', before), ('after', after))
+        },
+    }
+    if similar:
+        cottage = get_object_or_404(Cottage, id=cottage_id)
+        cottages = Cottage.objects.available(
+            check_in, check_out, guests=cottage.total_capacity
+        ).filter(
+            category=cottage.category
+        ).exclude(
+            id=cottage.id
+        ).annotate(
+            price_difference=Abs(F('price_per_night') - cottage.price_per_night)
+        ).order_by('price_difference', 'id')[:settings.AVAILABILITY_SIMILAR_LIMIT]
+        data['similar_cottages'] = serializers.SimilarCottageSerializer(cottages, many=True).data
+    return data
+
+
+def availability_result(cottage_id, check_in, check_out, similar=False):
+    """Return the availability response body, with suggestions when booked."""
+    available = cottage_availability(cottage_id, check_in, check_out)
+    data = availability_data(available)
+    if not available:
+        data.update(availability_suggestions(cottage_id, check_in, check_out, similar))
+    return data
+
+
+class CheckAvailabilityView(ReplicaReadMixin, generics.GenericAPIView):
+    authentication_classes = (CachedTokenAuthentication,)
+    serializer_class = serializers.AvailabilityCheckSerializer
+    replica_actions = ('post',)
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        data = availability_result(
+            serializer.validated_data['cottage'],
+            serializer.validated_data['check_in'],
+            serializer.validated_data['check_out'],
+            serializer.validated_data['similar'],
+        )
+
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class AvailabilitySearchView(ReplicaReadMixin, generics.GenericAPIView):
+    """Return every cottage that is free for the dates and fits the guests."""
+    authentication_classes = (CachedTokenAuthentication,)
+    serializer_class = serializers.AvailabilitySearchSerializer
+    replica_actions = ('post',)
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        cottages = Cottage.objects.available(
+            serializer.validated_data['check_in'],
+            serializer.validated_data['check_out'],
+            guests=serializer.validated_data['guests'],
+        ).prefetch_related('amenities').order_by('-name')
+
+        return Response(
+            serializers.CottageSerializer(cottages, many=True).data,
+            status=status.HTTP_200_OK
+        )
+
+
+class QuoteView(ReplicaReadMixin, generics.GenericAPIView):
+    """Price a list of stays with the seasonal and weekday rates."""
+    serializer_class = serializers.StayQuoteSerializer
+    replica_actions = ('post',)
+
+    @extend_schema(
+        request=serializers.StayQuoteSerializer(many=True),
+        responses=serializers.StayQuoteSerializer(many=True),
+    )
+    def post(self, request, *args, **kwargs):
+        if isinstance(request.data, list) and len(request.data) > settings.QUOTE_MAX_STAYS:
+            return Response(
+                {'detail': f'At most {settings.QUOTE_MAX_STAYS} stays can be quoted at once.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        stays = serializer.validated_data
+        if stays:
+            span = max(stay['check_out'] for stay in stays) - min(stay['check_in'] for stay in stays)
+            if span.days > settings.QUOTE_MAX_SPAN_DAYS:
+                return Response(
+                    {'detail': f'Quoted stays must fall within {settings.QUOTE_MAX_SPAN_DAYS} days.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        totals = quote(
+            [stay['cottage'].id for stay in stays],
+            [stay['check_in'] for stay in stays],
+            [stay['check_out'] for stay in stays],
         )
+        for stay, total in zip(stays, totals):
+            stay['nights'] = (stay['check_out'] - stay['check_in']).days
+            stay['total'] = total
+        return Response(self.get_serializer(stays, many=True).data, status=status.HTTP_200_OK)
+
 
-        if overlapping_bookings.exists():
-            return Response({
-                'available': False,
-                'message': 'The cottage is not available for the selected dates.'
-            }, status=status.HTTP_200_OK)
+class OccupancyReportView(ReplicaReadMixin, generics.GenericAPIView):
+    """Report occupancy rate and revenue per day, month or year."""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAdminUser,)
+    serializer_class = serializers.OccupancyReportSerializer
+    replica_actions = ('get',)
+
+    @extend_schema(parameters=[serializers.OccupancyReportSerializer])
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        cottage_id = params.get('cottage')
+        if cottage_id is None:
+            cottages = Cottage.objects.count()
         else:
-            return Response({
-                'available': True,
-                'message': 'The cottage is available for the selected dates.'
-            }, status=status.HTTP_200_OK)
+            get_object_or_404(Cottage, id=cottage_id)
+            cottages = 1
+
+        return Response({
+            'period': params['period'],
+            'start': params['start'],
+            'end': params['end'],
+            'cottages': cottages,
+            'results': occupancy_report(
+                params['start'], params['end'], params['period'], cottages, cottage_id
+            ),
+        }, status=status.HTTP_200_OK)
+
+
+class SearchView(ReplicaReadMixin, generics.GenericAPIView):
+    """Find cottages and amenities by the beginning of their names."""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (AllowAny,)
+    serializer_class = serializers.SearchSerializer
+    replica_actions = ('get',)
+    replica_pin_scopes = ('catalogue',)
+
+    @extend_schema(parameters=[serializers.SearchSerializer])
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        text = serializer.validated_data['q']
+        limit = serializer.validated_data['limit']
+
+        cottages = search(Cottage.objects.all(), text, limit)
+        amenities = search(Amenities.objects.all(), text, limit)
+        return Response({
+            'cottages': serializers.CottageMatchSerializer(cottages, many=True).data,
+            'amenities': serializers.AmenityMatchSerializer(amenities, many=True).data,
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,107 @@
+"""
+Authentication for the APIs.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+
+class TokenCache:
+    """Thread-safe LRU of token keys to authenticated users, with a TTL."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached (user, token) for the key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Cache (user, token) for the key, evicting the oldest entry."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        """Drop the entry of a token key."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_user(self, user_id):
+        """Drop every entry of a user."""
+        with self._lock:
+            for key in [key for key, (_, (user, _)) in self._entries.items() if user.pk == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that remembers token to user lookups.
+
+    Entries are dropped when their token is deleted or their user is saved
+    or deleted in this process. Other processes pick up such changes once
+    the TTL expires.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            cached = super().authenticate_credentials(key)
+            token_cache.set(key, cached)
+        user, token = cached
+        return copy.copy(user), token
+
+    async def aauthenticate(self, request):
+        """Async authenticate() for async views, on a Django request."""
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        """Async authenticate_credentials(), looking tokens up with the async ORM."""
+        cached = token_cache.get(key)
+        if cached is None:
+            model = self.get_model()
+            try:
+                token = await model.objects.select_related('user').aget(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            if not token.user.is_active:
+                raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+            cached = (token.user, token)
+            token_cache.set(key, cached)
+        user, token = cached
+        return copy.copy(user), token
@@ -0,0 +1,22 @@
+"""
+Signal handlers for user authentication.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user.authentication import token_cache
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    """Stop authenticating with a deleted token."""
+    token_cache.discard(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def forget_changed_user(sender, instance, **kwargs):
+    """Reload a user on the next request after it changed."""
+    token_cache.discard_user(instance.pk)
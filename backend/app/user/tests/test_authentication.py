@@ -0,0 +1,97 @@
+"""
+Tests for cached token authentication.
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import TokenCache, token_cache
+
+ME_URL = reverse('user:me')
+
+
+class TokenCacheTests(SimpleTestCase):
+    """Test the token LRU."""
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest unused entry is evicted when full."""
+        cache = TokenCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    @patch('user.authentication.time.monotonic')
+    def test_entries_expire(self, patched_monotonic):
+        """Test entries are dropped after the TTL."""
+        cache = TokenCache(maxsize=2, ttl=60)
+        patched_monotonic.return_value = 100
+        cache.set('a', 1)
+
+        patched_monotonic.return_value = 159
+        self.assertEqual(cache.get('a'), 1)
+        patched_monotonic.return_value = 161
+        self.assertIsNone(cache.get('a'))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating API requests with cached tokens."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            name='Test Name',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeated_requests_skip_token_query(self):
+        """Test only the first request looks the token up."""
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token stops authenticating."""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test a deactivated user stops authenticating."""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_updated_user_reloaded(self):
+        """Test a user update is visible on the next request."""
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'New Name'})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New Name')
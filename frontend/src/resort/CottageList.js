@@ -5,19 +5,18 @@ import {useNavigate} from 'react-router-dom';
 
 const CottageList = () => {
     const [cottages, setCottages] = useState([]);
-    const [currentPage, setCurrentPage] = useState(1);
-    const [hasMore, setHasMore] = useState(false);
+    const [nextUrl, setNextUrl] = useState(null);
     const pageSize = 20;
     const navigate = useNavigate();
 
-    const fetchCottages = async (page) => {
+    const fetchCottages = async (url) => {
         try {
-            const response = await fetch(`/api/resort/cottages/?page=${page}&page_size=${pageSize}`);
+            const response = await fetch(url);
             const data = await response.json();
 
-            if (Array.isArray(data)) {
-                setCottages(prevCottages => [...prevCottages, ...data]);
-                setHasMore(data.length === pageSize);
+            if (Array.isArray(data.results)) {
+                setCottages(prevCottages => [...prevCottages, ...data.results]);
+                setNextUrl(data.next ? new URL(data.next).pathname + new URL(data.next).search : null);
             } else {
                 throw new Error("Unexpected response format");
             }
@@ -27,11 +26,11 @@ const CottageList = () => {
     };
 
     useEffect(() => {
-        fetchCottages(currentPage);
-    }, [currentPage]);
+        fetchCottages(`/api/resort/cottages/?page_size=${pageSize}`);
+    }, []);
 
     const loadMore = () => {
-        setCurrentPage(prevPage => prevPage + 1);
+        fetchCottages(nextUrl);
     };
 
     const handleMoreInfo = (id) => {
@@ -51,7 +50,7 @@ const CottageList = () => {
                     />
                 ))}
             </div>
-            {hasMore && (
+            {nextUrl && (
                 <button className="load-more" onClick={loadMore}>
                     Show More
                 </button>